@@ -0,0 +1,625 @@
+#!/usr/bin/env python3
+"""
+Benchmarks reproducibles de los scripts del proyecto (sin GPU).
+
+Ejecutan el código real de codigo/ contra un sustituto de Wan2.1
+(benchmarks/wan_falso: generate.py y un paquete wan con modelos de juguete
+en numpy), así que miden el coste propio de los scripts y no el del modelo:
+    lanzamiento_t2v / lanzamiento_i2v  generar_video_t2v/i2v completos; el
+        sobrecoste es el tiempo total menos el de las etapas del modelo
+        (telemetría del subproceso)
+    mascara_a_video      convertir_mascara_imagen_a_video en los
+        Escenario_*/*.mp4 (sin caché de máscaras y con ella), frente a la
+        conversión anterior con ffmpeg
+        (H.264 con pérdidas, solo si ffmpeg está instalado)
+    procesar_video_base  frames por segundo y memoria pico al recorrer
+        procesar_video_base en los Escenario_*/*.mp4 y en un clip 5 veces
+        más largo
+    descubrimiento_salida  ruta_temporal + publicar_salida en un directorio
+        con muchos videos
+    sonda_video          metadatos de los Escenario_*/*.mp4 con sondear_video
+        (primer sondeo y repetido desde la memoria)
+    seguimiento_mascara  frames por segundo de seguir_mascara en los
+        Escenario_*/*.mp4 con cada método (flujo óptico y plantilla)
+    sondeo_gpu           obtener_info_gpus en un proceso nuevo
+    arranque             --help y validación de argumentos de los wrappers
+        en un proceso nuevo; falla si importan torch, numpy o cv2 o si
+        superan su presupuesto fijo (PRESUPUESTOS)
+
+Los resultados se guardan en JSON y se comparan con la línea base
+(benchmarks/linea_base.json): una métrica es una regresión si empeora más
+que la tolerancia. Las métricas *_fps son mejores cuanto más altas; el
+resto (*_s, *_ms, *_mb) cuanto más bajas.
+
+Uso:
+    python benchmarks/ejecutar_benchmarks.py
+    python benchmarks/ejecutar_benchmarks.py --solo lanzamiento_t2v sondeo_gpu
+    python benchmarks/ejecutar_benchmarks.py --guardar_linea_base
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+
+RAIZ = Path(__file__).resolve().parent.parent
+CODIGO = RAIZ / "codigo"
+WAN_FALSO = Path(__file__).resolve().parent / "wan_falso"
+LINEA_BASE = Path(__file__).resolve().parent / "linea_base.json"
+RESULTADOS = Path(__file__).resolve().parent / "resultados"
+
+VERSION_RESULTADOS = 1
+
+# Parámetros de las generaciones de juguete (pequeños para que sean rápidas)
+FRAMES_LANZAMIENTO = 17
+PASOS_LANZAMIENTO = 10
+
+# fps del clip largo de procesar_video_base (los de los escenarios)
+FPS_VIDEO_LARGO = 16
+
+sys.path.insert(0, str(CODIGO))
+
+
+@contextmanager
+def silenciar():
+    """Redirige stdout/stderr (también los de los subprocesos) a /dev/null."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    copias = [os.dup(1), os.dup(2)]
+    nulo = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(nulo, 1)
+        os.dup2(nulo, 2)
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(copias[0], 1)
+        os.dup2(copias[1], 2)
+        for fd in copias + [nulo]:
+            os.close(fd)
+
+
+def videos_escenario():
+    """Videos de los Escenario_* del repositorio, ordenados."""
+    return sorted(RAIZ.glob("Escenario_*/*.mp4"))
+
+
+def medir(funcion, repeticiones):
+    """
+    Ejecuta una función varias veces.
+
+    Returns:
+        Tupla (mediana de segundos, último valor devuelto)
+    """
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return statistics.median(tiempos), resultado
+
+
+def _lanzamiento(modo, repeticiones):
+    """Mide generar_video_t2v/i2v contra el generate.py sustituto."""
+    import generar_video
+    from telemetria import ruta_telemetria
+
+    generar_video.encontrar_repositorio_wan = lambda: WAN_FALSO
+    metricas = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        salida = Path(directorio) / f"{modo}.mp4"
+        if modo == "t2v":
+            llamar = lambda: generar_video.generar_video_t2v(
+                "Una botella sobre una mesa", str(salida), f"{directorio}/Wan2.1-T2V-1.3B",
+                frame_num=FRAMES_LANZAMIENTO, semilla=0, sample_steps=PASOS_LANZAMIENTO)
+        else:
+            imagen = sorted(RAIZ.glob("Escenario_*/frame_1.png"))[0]
+            llamar = lambda: generar_video.generar_video_i2v(
+                str(imagen), "La cámara se acerca", str(salida), f"{directorio}/Wan2.1-I2V-14B-480P",
+                frame_num=FRAMES_LANZAMIENTO, semilla=0, sample_steps=PASOS_LANZAMIENTO)
+
+        tiempos, etapas = [], []
+        for _ in range(repeticiones):
+            with silenciar():
+                inicio = time.perf_counter()
+                exito = llamar()
+                tiempos.append(time.perf_counter() - inicio)
+            if not exito:
+                raise RuntimeError(f"generar_video_{modo} falló con el generate.py sustituto")
+            registro = json.loads(ruta_telemetria(salida).read_text(encoding="utf-8"))
+            etapas.append(sum(registro["etapas"].values()))
+
+    total = statistics.median(tiempos)
+    metricas[f"{modo}.total_s"] = total
+    metricas[f"{modo}.etapas_s"] = statistics.median(etapas)
+    metricas[f"{modo}.sobrecoste_s"] = statistics.median(t - e for t, e in zip(tiempos, etapas))
+    return metricas
+
+
+def bench_lanzamiento_t2v(repeticiones):
+    """Construcción del comando y lanzamiento de T2V."""
+    return _lanzamiento("t2v", repeticiones)
+
+
+def bench_lanzamiento_i2v(repeticiones):
+    """Construcción del comando y lanzamiento de I2V."""
+    return _lanzamiento("i2v", repeticiones)
+
+
+def _mascara_ffmpeg_anterior(mascara, video, salida):
+    """
+    Conversión anterior de la máscara: PNG redimensionado, ffmpeg -loop 1 y
+    H.264 4:2:0 con -crf 23, más la relectura del video para contar frames.
+    """
+    import cv2
+    from sonda_video import sondear_video
+
+    info = sondear_video(video)
+    captura = cv2.VideoCapture(str(video))
+    while captura.grab():
+        pass
+    captura.release()
+    imagen = cv2.resize(cv2.imread(str(mascara), cv2.IMREAD_GRAYSCALE),
+                        (info["ancho"], info["alto"]), interpolation=cv2.INTER_LINEAR)
+    temporal = Path(salida).with_suffix(".png")
+    cv2.imwrite(str(temporal), imagen)
+    subprocess.run(["ffmpeg", "-y", "-loop", "1", "-i", str(temporal), "-t", str(info["duracion"]),
+                    "-vf", f"scale={info['ancho']}:{info['alto']},fps={info['fps']}",
+                    "-pix_fmt", "yuv420p", "-c:v", "libx264", "-preset", "fast", "-crf", "23",
+                    str(salida)], check=True, capture_output=True)
+    temporal.unlink()
+    captura = cv2.VideoCapture(str(salida))
+    captura.get(cv2.CAP_PROP_FRAME_COUNT)
+    captura.release()
+    return Path(salida)
+
+
+def _pixeles_distintos(ruta, pila):
+    """Fracción de píxeles del video que no coinciden con la pila exacta."""
+    import cv2
+
+    captura = cv2.VideoCapture(str(ruta))
+    distintos = total = 0
+    for esperado in pila:
+        ret, frame = captura.read()
+        if not ret:
+            break
+        distintos += int((frame[..., 0] != esperado).sum())
+        total += esperado.size
+    captura.release()
+    return distintos / total if total else 1.0
+
+
+def bench_mascara_a_video(repeticiones):
+    """
+    convertir_mascara_imagen_a_video con la máscara de recursos/ en cada
+    escenario, y la conversión anterior con ffmpeg (si está instalado):
+    tiempo y fracción de píxeles que cambian respecto a la máscara exacta.
+    """
+    from cache_mascaras import CacheMascaras
+    from generar_video_con_mascara import convertir_mascara_imagen_a_video
+    from mascara_video import pila_mascara
+    from sonda_video import sondear_video
+
+    metricas = {}
+    with tempfile.TemporaryDirectory() as directorio:
+        mascara = Path(directorio) / "mascara.png"
+        shutil.copy(RAIZ / "recursos" / "mascara_producto.png", mascara)
+        cache = CacheMascaras(Path(directorio) / "cache")
+        for video in videos_escenario():
+            info = sondear_video(video)
+            pila = pila_mascara(mascara, info["ancho"], info["alto"], info["frames"])
+
+            def convertir(vaciar):
+                if vaciar:
+                    for entrada, _, _ in cache.cache.entradas():
+                        shutil.rmtree(entrada)
+                with silenciar():
+                    ruta = convertir_mascara_imagen_a_video(mascara, video, cache)
+                if ruta is None:
+                    raise RuntimeError(f"convertir_mascara_imagen_a_video falló con {video}")
+                return ruta
+
+            segundos, ruta = medir(lambda: convertir(vaciar=True), repeticiones)
+            metricas[f"mascara_a_video.{video.stem}_s"] = segundos
+            metricas[f"mascara_a_video.{video.stem}_distintos"] = _pixeles_distintos(ruta, pila)
+            segundos, _ = medir(lambda: convertir(vaciar=False), repeticiones)
+            metricas[f"mascara_a_video.{video.stem}_cache_ms"] = segundos * 1000
+
+            if shutil.which("ffmpeg"):
+                anterior = Path(directorio) / "anterior.mp4"
+                segundos, _ = medir(lambda: _mascara_ffmpeg_anterior(mascara, video, anterior),
+                                    repeticiones)
+                metricas[f"mascara_a_video.{video.stem}_anterior_s"] = segundos
+                metricas[f"mascara_a_video.{video.stem}_anterior_distintos"] = \
+                    _pixeles_distintos(anterior, pila)
+    return metricas
+
+
+def reiniciar_pico_memoria():
+    """
+    Reinicia el pico de memoria residente del proceso y devuelve la actual (MB).
+
+    ru_maxrss no sirve en un proceso lanzado con spawn: en Linux conserva el
+    pico del proceso padre anterior al exec. VmHWM se puede reiniciar
+    escribiendo 5 en /proc/self/clear_refs.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as archivo:
+            archivo.write("5")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return _leer_status("VmRSS")
+
+
+def pico_memoria_mb():
+    """Pico de memoria residente del proceso (MB) desde el último reinicio."""
+    try:
+        return _leer_status("VmHWM")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _leer_status(campo):
+    """Lee un campo en kB de /proc/self/status y lo devuelve en MB."""
+    with open("/proc/self/status") as archivo:
+        for linea in archivo:
+            if linea.startswith(campo + ":"):
+                return int(linea.split()[1]) / 1024
+    raise OSError(f"{campo} no está en /proc/self/status")
+
+
+def _procesar_en_proceso(video, cola):
+    """Ejecuta procesar_video_base en un proceso limpio y mide su memoria pico."""
+    sys.path.insert(0, str(CODIGO))
+    from generar_video_con_mascara import procesar_video_base
+    import cv2  # El wrapper lo importa al usarlo: se deja fuera de la medida
+
+    base = reiniciar_pico_memoria()
+    with silenciar():
+        inicio = time.perf_counter()
+        frames, _, _ = procesar_video_base(video)
+        leidos = sum(1 for _ in frames)
+        segundos = time.perf_counter() - inicio
+    cola.put((leidos, segundos, pico_memoria_mb() - base))
+
+
+def _video_largo(origen, destino, vueltas):
+    """Escribe un video con los frames de origen repetidos varias veces (mp4v)."""
+    import cv2
+
+    captura = cv2.VideoCapture(str(origen))
+    frames = []
+    while True:
+        ret, frame = captura.read()
+        if not ret:
+            break
+        frames.append(frame)
+    captura.release()
+    alto, ancho = frames[0].shape[:2]
+    escritor = cv2.VideoWriter(str(destino), cv2.VideoWriter_fourcc(*"mp4v"),
+                               FPS_VIDEO_LARGO, (ancho, alto))
+    for _ in range(vueltas):
+        for frame in frames:
+            escritor.write(frame)
+    escritor.release()
+    return Path(destino)
+
+
+def bench_procesar_video_base(repeticiones, vueltas_largo=5):
+    """
+    Frames por segundo y memoria pico de procesar_video_base en cada
+    escenario y en un clip largo (el primero repetido), donde la memoria
+    debe ser la misma que en los cortos.
+    """
+    contexto = multiprocessing.get_context("spawn")
+    metricas = {}
+    videos = videos_escenario()
+    directorio = tempfile.TemporaryDirectory()
+    if videos:
+        largo = Path(directorio.name) / f"largo_x{vueltas_largo}.mp4"
+        videos.append(_video_largo(videos[0], largo, vueltas_largo))
+    for video in videos:
+        medidas = []
+        for _ in range(repeticiones):
+            cola = contexto.Queue()
+            proceso = contexto.Process(target=_procesar_en_proceso, args=(str(video), cola))
+            proceso.start()
+            proceso.join()
+            if proceso.exitcode != 0:
+                raise RuntimeError(f"procesar_video_base terminó con código {proceso.exitcode} en {video}")
+            medidas.append(cola.get())
+        frames = medidas[0][0]
+        metricas[f"procesar_video_base.{video.stem}_fps"] = frames / statistics.median(m[1] for m in medidas)
+        metricas[f"procesar_video_base.{video.stem}_pico_mb"] = statistics.median(m[2] for m in medidas)
+    directorio.cleanup()
+    return metricas
+
+
+def bench_descubrimiento_salida(repeticiones, existentes=1000, publicaciones=200):
+    """ruta_temporal + publicar_salida en un directorio con muchos videos."""
+    from ejecucion_wan import publicar_salida, ruta_temporal
+
+    with tempfile.TemporaryDirectory() as directorio:
+        for i in range(existentes):
+            (Path(directorio) / f"video_{i:05d}.mp4").write_bytes(b"\0")
+
+        def publicar():
+            for i in range(publicaciones):
+                salida = Path(directorio) / f"salida_{i}.mp4"
+                temporal = ruta_temporal(salida)
+                temporal.write_bytes(b"\0" * 1024)
+                publicar_salida(temporal, salida)
+
+        segundos, _ = medir(publicar, repeticiones)
+    return {"descubrimiento_salida.publicar_ms": segundos / publicaciones * 1000}
+
+
+def bench_sonda_video(repeticiones):
+    """sondear_video en cada escenario, sin memoria previa y con ella."""
+    import sonda_video
+    import cv2  # La primera importación de OpenCV no forma parte del sondeo
+
+    videos = videos_escenario()
+    if not videos:
+        return {}, "no hay videos Escenario_*/*.mp4"
+
+    def sondear_todos():
+        sonda_video._sondeos.clear()
+        for video in videos:
+            sonda_video.sondear_video(video)
+
+    segundos, _ = medir(sondear_todos, repeticiones)
+    repetido, _ = medir(lambda: [sonda_video.sondear_video(v) for v in videos], repeticiones)
+    return {
+        "sonda_video.sondeo_ms": segundos / len(videos) * 1000,
+        "sonda_video.memorizado_ms": repetido / len(videos) * 1000,
+    }
+
+
+def bench_seguimiento_mascara(repeticiones):
+    """seguir_mascara con la máscara de recursos/ en cada escenario y con cada método."""
+    from seguimiento_mascara import METODOS_SEGUIMIENTO, seguir_mascara
+    import cv2  # La primera importación de OpenCV no forma parte del seguimiento
+
+    videos = videos_escenario()
+    if not videos:
+        return {}, "no hay videos Escenario_*/*.mp4"
+
+    mascara = RAIZ / "recursos" / "mascara_producto.png"
+    metricas = {}
+    for video in videos:
+        for metodo in METODOS_SEGUIMIENTO:
+            segundos, (pila, _) = medir(lambda: seguir_mascara(video, mascara, metodo), repeticiones)
+            metricas[f"seguimiento_mascara.{video.stem}_{metodo}_fps"] = len(pila) / segundos
+    return metricas
+
+
+def bench_sondeo_gpu(repeticiones):
+    """obtener_info_gpus en un proceso nuevo (incluye las importaciones que arrastra)."""
+    codigo = f"import sys; sys.path.insert(0, {str(CODIGO)!r}); " \
+             "from seleccionar_gpu import obtener_info_gpus; obtener_info_gpus()"
+    segundos, _ = medir(lambda: subprocess.run([sys.executable, "-c", codigo], check=True,
+                                               capture_output=True), repeticiones)
+    return {"sondeo_gpu.proceso_nuevo_s": segundos}
+
+
+# Módulos que --help y la validación de argumentos no deben importar
+MODULOS_PESADOS = ("torch", "numpy", "cv2", "PIL", "imageio")
+
+# Llamadas que deben fallar o terminar antes de comprobar el entorno
+ARRANQUES = {
+    "t2v_ayuda": ("generar_video.py", ["--help"]),
+    "t2v_validacion": ("generar_video.py", ["--modo", "t2v"]),
+    "mascara_ayuda": ("generar_video_con_mascara.py", ["--help"]),
+    "mascara_validacion": ("generar_video_con_mascara.py", ["--prompt", "Playa"]),
+}
+
+# Tiempo máximo (s) de cada arranque, independiente de la línea base
+PRESUPUESTOS = {f"arranque.{nombre}_s": 1.0 for nombre in ARRANQUES}
+
+
+def _arrancar(script, argumentos):
+    """
+    Ejecuta un script en un proceso nuevo y devuelve los módulos pesados
+    que llegó a importar (el script debe terminar con SystemExit).
+    """
+    codigo = (
+        "import json, runpy, sys\n"
+        f"sys.argv = [{script!r}] + {argumentos!r}\n"
+        f"sys.path.insert(0, {str(CODIGO)!r})\n"
+        "try:\n"
+        f"    runpy.run_path({str(CODIGO / script)!r}, run_name='__main__')\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        f"print(json.dumps([m for m in {MODULOS_PESADOS!r} if m in sys.modules]))\n"
+    )
+    proceso = subprocess.run([sys.executable, "-c", codigo], check=True,
+                             capture_output=True, text=True)
+    return json.loads(proceso.stdout.strip().splitlines()[-1])
+
+
+def bench_arranque(repeticiones):
+    """--help y validación de argumentos de los wrappers en un proceso nuevo."""
+    metricas = {}
+    for nombre, (script, argumentos) in ARRANQUES.items():
+        segundos, importados = medir(lambda: _arrancar(script, argumentos), repeticiones)
+        if importados:
+            raise RuntimeError(f"{nombre} importa {', '.join(importados)}")
+        metricas[f"arranque.{nombre}_s"] = segundos
+    return metricas
+
+
+BENCHMARKS = {
+    "arranque": bench_arranque,
+    "lanzamiento_t2v": bench_lanzamiento_t2v,
+    "lanzamiento_i2v": bench_lanzamiento_i2v,
+    "mascara_a_video": bench_mascara_a_video,
+    "procesar_video_base": bench_procesar_video_base,
+    "descubrimiento_salida": bench_descubrimiento_salida,
+    "sonda_video": bench_sonda_video,
+    "seguimiento_mascara": bench_seguimiento_mascara,
+    "sondeo_gpu": bench_sondeo_gpu,
+}
+
+
+def mayor_es_mejor(metrica):
+    """True para las métricas de rendimiento (frames por segundo)."""
+    return metrica.endswith("_fps")
+
+
+def comparar(metricas, linea_base, tolerancia):
+    """
+    Compara las métricas con la línea base.
+
+    Args:
+        metricas: Diccionario {métrica: valor}
+        linea_base: Diccionario {métrica: valor} de referencia
+        tolerancia: Empeoramiento relativo admitido (0.3 = 30 %)
+
+    Returns:
+        Diccionario {métrica: {actual, base, cambio, regresion}}; cambio es
+        el empeoramiento relativo (negativo si mejora)
+    """
+    comparacion = {}
+    for metrica, actual in metricas.items():
+        base = linea_base.get(metrica)
+        if not base:
+            continue
+        cambio = (base - actual) / base if mayor_es_mejor(metrica) else (actual - base) / base
+        comparacion[metrica] = {
+            "actual": actual,
+            "base": base,
+            "cambio": cambio,
+            "regresion": cambio > tolerancia,
+        }
+    return comparacion
+
+
+def presupuestos_excedidos(metricas):
+    """Métricas que superan su presupuesto fijo (PRESUPUESTOS)."""
+    return {m: (metricas[m], limite) for m, limite in PRESUPUESTOS.items()
+            if m in metricas and metricas[m] > limite}
+
+
+def imprimir_comparacion(metricas, comparacion):
+    """Muestra cada métrica con su cambio respecto a la línea base."""
+    print(f"\n  {'Métrica':<56} {'Actual':>10} {'Base':>10} {'Cambio':>8}")
+    for metrica, actual in metricas.items():
+        if metrica not in comparacion:
+            print(f"  {metrica:<56} {actual:>10.3f} {'-':>10} {'-':>8}")
+            continue
+        fila = comparacion[metrica]
+        marca = "✗" if fila["regresion"] else " "
+        print(f"{marca} {metrica:<56} {actual:>10.3f} {fila['base']:>10.3f} {fila['cambio']:>+8.0%}")
+
+
+def ejecutar(nombres, repeticiones):
+    """
+    Ejecuta los benchmarks indicados.
+
+    Returns:
+        Tupla (métricas, notas de los benchmarks omitidos o fallidos)
+    """
+    metricas, notas = {}, {}
+    for nombre in nombres:
+        print(f"→ {nombre}...")
+        inicio = time.perf_counter()
+        try:
+            resultado = BENCHMARKS[nombre](repeticiones)
+        except Exception as e:
+            notas[nombre] = f"error: {e}"
+            print(f"  ✗ {e}")
+            continue
+        if isinstance(resultado, tuple):
+            resultado, notas[nombre] = resultado
+            print(f"  ⚠ Omitido: {notas[nombre]}")
+        metricas.update(resultado)
+        print(f"  ✓ {len(resultado)} métricas en {time.perf_counter() - inicio:.1f} s")
+    return metricas, notas
+
+
+def main():
+    """Función principal de los benchmarks."""
+    parser = argparse.ArgumentParser(
+        description="Benchmarks de los scripts de generación con un Wan2.1 sustituto (CPU)"
+    )
+    parser.add_argument("--solo", nargs="+", choices=list(BENCHMARKS), default=None,
+                       help="Benchmarks a ejecutar (default: todos)")
+    parser.add_argument("--repeticiones", type=int, default=3,
+                       help="Repeticiones de cada medida (se usa la mediana)")
+    parser.add_argument("--salida", type=str, default=None,
+                       help="JSON de resultados (default: benchmarks/resultados/<fecha>.json)")
+    parser.add_argument("--linea_base", type=str, default=str(LINEA_BASE),
+                       help="JSON de la línea base con la que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.3,
+                       help="Empeoramiento relativo admitido antes de marcar una regresión")
+    parser.add_argument("--guardar_linea_base", action="store_true",
+                       help="Guardar las métricas como nueva línea base")
+    args = parser.parse_args()
+
+    metricas, notas = ejecutar(args.solo or list(BENCHMARKS), args.repeticiones)
+
+    linea_base = {}
+    if Path(args.linea_base).exists():
+        linea_base = json.loads(Path(args.linea_base).read_text(encoding="utf-8"))["metricas"]
+    comparacion = comparar(metricas, linea_base, args.tolerancia)
+    imprimir_comparacion(metricas, comparacion)
+
+    resultados = {
+        "version": VERSION_RESULTADOS,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "entorno": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "repeticiones": args.repeticiones,
+        "metricas": metricas,
+        "notas": notas,
+        "tolerancia": args.tolerancia,
+        "comparacion": comparacion,
+    }
+    salida = Path(args.salida) if args.salida else RESULTADOS / f"{datetime.now():%Y%m%d_%H%M%S}.json"
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(resultados, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\n✓ Resultados guardados en {salida}")
+
+    if args.guardar_linea_base:
+        Path(args.linea_base).write_text(json.dumps(
+            {k: resultados[k] for k in ("version", "fecha", "entorno", "repeticiones", "metricas")},
+            indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"✓ Línea base actualizada: {args.linea_base}")
+        return 0
+
+    excedidos = presupuestos_excedidos(metricas)
+    for metrica, (valor, limite) in excedidos.items():
+        print(f"✗ {metrica}: {valor:.3f} s supera el presupuesto de {limite:.3f} s")
+    regresiones = [m for m, fila in comparacion.items() if fila["regresion"]]
+    if regresiones:
+        print(f"✗ {len(regresiones)} regresiones (más de un {args.tolerancia:.0%} peor que la línea base)")
+    if excedidos or regresiones:
+        return 1
+    if linea_base:
+        print("✓ Sin regresiones respecto a la línea base")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
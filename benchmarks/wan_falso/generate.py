@@ -0,0 +1,55 @@
+"""
+Sustituto de generate.py de Wan2.1 para los benchmarks.
+
+Acepta los mismos argumentos que los scripts del proyecto pasan a
+generate.py, ejecuta los pipelines de juguete del paquete wan de este
+directorio y guarda el video con --save_file.
+"""
+
+import argparse
+
+import numpy as np
+
+import wan
+from wan.utils.utils import cache_video
+
+
+SIZE_CONFIGS = {"832*480": (832, 480), "480*832": (480, 832), "1280*720": (1280, 720), "720*1280": (720, 1280)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--task", default="t2v-1.3B")
+    parser.add_argument("--size", default="832*480")
+    parser.add_argument("--ckpt_dir")
+    parser.add_argument("--prompt", default="")
+    parser.add_argument("--image")
+    parser.add_argument("--frame_num", type=int, default=81)
+    parser.add_argument("--base_seed", type=int, default=0)
+    parser.add_argument("--sample_steps", type=int, default=None)
+    parser.add_argument("--sample_shift", type=float, default=None)
+    parser.add_argument("--sample_guide_scale", type=float, default=5.0)
+    parser.add_argument("--save_file", required=True)
+    args, _ = parser.parse_known_args()
+
+    if args.task.startswith("i2v"):
+        from PIL import Image
+        pipeline = wan.WanI2V()
+        video = pipeline.generate(args.prompt, Image.open(args.image).convert("RGB"),
+                                  max_area=np.prod(SIZE_CONFIGS[args.size]),
+                                  frame_num=args.frame_num, sampling_steps=args.sample_steps or 40,
+                                  shift=args.sample_shift or 3.0,
+                                  guide_scale=args.sample_guide_scale, seed=args.base_seed)
+    else:
+        pipeline = wan.WanT2V()
+        video = pipeline.generate(args.prompt, size=SIZE_CONFIGS[args.size],
+                                  frame_num=args.frame_num, sampling_steps=args.sample_steps or 50,
+                                  shift=args.sample_shift or 5.0,
+                                  guide_scale=args.sample_guide_scale, seed=args.base_seed)
+
+    cache_video(tensor=video[None], save_file=args.save_file, fps=16, nrow=1,
+                normalize=True, value_range=(-1, 1))
+
+
+if __name__ == "__main__":
+    main()
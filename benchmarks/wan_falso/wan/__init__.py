@@ -0,0 +1,9 @@
+"""
+Sustituto mínimo del paquete wan de Wan2.1 para los benchmarks.
+
+Tiene la misma estructura de módulos y clases que los parches del proyecto
+(telemetria.py, vae_por_tramos.py, cachés) esperan encontrar, pero los
+modelos son operaciones de numpy sobre tensores pequeños.
+"""
+
+from .pipeline import WanI2V, WanT2V
@@ -0,0 +1,28 @@
+"""VAE de juguete con la interfaz de WanVAE (compresión 4x8x8)."""
+
+import numpy as np
+
+
+class WanVAE:
+
+    def __init__(self, z_dim=16):
+        self.z_dim = z_dim
+        generador = np.random.default_rng(0)
+        self.proyeccion = generador.standard_normal((z_dim, 3), dtype=np.float32) / np.sqrt(z_dim)
+
+    def encode(self, videos):
+        latentes = []
+        for video in videos:
+            c, t, h, w = video.shape
+            reducido = video[:, ::4, ::8, ::8]
+            latentes.append(np.einsum("zc,cthw->zthw", self.proyeccion, reducido).astype(np.float32))
+        return latentes
+
+    def decode(self, zs):
+        videos = []
+        for z in zs:
+            rgb = np.tanh(np.einsum("zc,zthw->cthw", self.proyeccion, z))
+            rgb = rgb.repeat(8, axis=2).repeat(8, axis=3)
+            primero, resto = rgb[:, :1], rgb[:, 1:].repeat(4, axis=1)
+            videos.append(np.concatenate([primero, resto], axis=1).astype(np.float32))
+        return videos
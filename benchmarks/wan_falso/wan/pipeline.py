@@ -0,0 +1,59 @@
+"""Pipelines T2V e I2V de juguete: un 'DiT' lineal sobre latentes pequeños."""
+
+import numpy as np
+
+from .modules.t5 import T5EncoderModel
+from .modules.vae import WanVAE
+from .utils.fm_solvers_unipc import FlowUniPCMultistepScheduler
+
+
+class WanT2V:
+
+    def __init__(self, z_dim=16, **kwargs):
+        generador = np.random.default_rng(0)
+        self.text_encoder = T5EncoderModel()
+        self.vae = WanVAE(z_dim)
+        self.pesos = generador.standard_normal((z_dim, z_dim), dtype=np.float32) / np.sqrt(z_dim)
+        self.z_dim = z_dim
+
+    def _modelo(self, x, t, contexto):
+        return np.einsum("ij,jthw->ithw", self.pesos, x) * (1 + 1e-3 * t) + contexto.mean()
+
+    def _denoising(self, forma, contexto, contexto_nulo, pasos, guia, shift, semilla, condicion=None):
+        generador = np.random.default_rng(semilla)
+        x = generador.standard_normal(forma, dtype=np.float32)
+        scheduler = FlowUniPCMultistepScheduler()
+        scheduler.set_timesteps(pasos, shift=shift)
+        for t in scheduler.timesteps:
+            entrada = x if condicion is None else x + 0.1 * condicion
+            cond = self._modelo(entrada, t, contexto)
+            incond = self._modelo(entrada, t, contexto_nulo)
+            x = scheduler.step(incond + guia * (cond - incond), t, x)[0]
+        return x
+
+    def generate(self, prompt, size=(832, 480), frame_num=81, shift=5.0, sampling_steps=50,
+                 guide_scale=5.0, seed=0, **kwargs):
+        contexto = self.text_encoder([prompt])[0]
+        contexto_nulo = self.text_encoder([""])[0]
+        forma = (self.z_dim, (frame_num - 1) // 4 + 1, size[1] // 8, size[0] // 8)
+        x = self._denoising(forma, contexto, contexto_nulo, sampling_steps, guide_scale, shift, seed)
+        return self.vae.decode([x])[0]
+
+
+class WanI2V(WanT2V):
+
+    def generate(self, prompt, img, max_area=832 * 480, frame_num=81, shift=3.0,
+                 sampling_steps=40, guide_scale=5.0, seed=0, **kwargs):
+        imagen = np.asarray(img, dtype=np.float32).transpose(2, 0, 1) / 127.5 - 1
+        alto, ancho = imagen.shape[1:]
+        escala = np.sqrt(max_area / (alto * ancho))
+        alto, ancho = int(alto * escala) // 16 * 16, int(ancho * escala) // 16 * 16
+        contexto = self.text_encoder([prompt])[0]
+        contexto_nulo = self.text_encoder([""])[0]
+        video = np.zeros((3, frame_num, alto, ancho), dtype=np.float32)
+        fuente = imagen[:, ::max(1, imagen.shape[1] // alto), ::max(1, imagen.shape[2] // ancho)]
+        video[:, 0] = fuente[:, :alto, :ancho]
+        condicion = self.vae.encode([video])[0]
+        x = self._denoising(condicion.shape, contexto, contexto_nulo, sampling_steps, guide_scale,
+                            shift, seed, condicion)
+        return self.vae.decode([x])[0]
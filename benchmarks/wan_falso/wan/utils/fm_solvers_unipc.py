@@ -0,0 +1,17 @@
+"""Scheduler de flow matching de juguete con la interfaz del de Wan2.1."""
+
+import numpy as np
+
+
+class FlowUniPCMultistepScheduler:
+
+    def set_timesteps(self, num_inference_steps, device=None, shift=1.0):
+        sigmas = np.linspace(1.0, 0.0, num_inference_steps + 1)
+        self.sigmas = shift * sigmas / (1 + (shift - 1) * sigmas)
+        self.timesteps = self.sigmas[:-1] * 1000
+        self._indice = 0
+
+    def step(self, model_output, timestep, sample, return_dict=False, generator=None):
+        dt = self.sigmas[self._indice + 1] - self.sigmas[self._indice]
+        self._indice += 1
+        return (sample + dt * model_output,)
@@ -0,0 +1,17 @@
+"""cache_video de juguete: escribe el video con OpenCV."""
+
+import cv2
+import numpy as np
+
+
+def cache_video(tensor, save_file=None, fps=30, suffix=".mp4", nrow=8, normalize=True,
+                value_range=(-1, 1), retry=5):
+    video = np.clip(tensor[0], *value_range)
+    video = ((video - value_range[0]) / (value_range[1] - value_range[0]) * 255).astype(np.uint8)
+    frames = video.transpose(1, 2, 3, 0)
+    alto, ancho = frames.shape[1:3]
+    escritor = cv2.VideoWriter(save_file, cv2.VideoWriter_fourcc(*"mp4v"), fps, (ancho, alto))
+    for frame in frames:
+        escritor.write(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+    escritor.release()
+    return save_file
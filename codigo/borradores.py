@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Modo borrador/final para revisar prompts antes de gastar un render completo.
+
+generar_video.py --borrador genera una versión rápida del trabajo (modelo
+1.3B, menos pasos, menos frames y solver dpm++), la reduce a una vista
+previa pequeña y escribe un manifiesto con la semilla y los ajustes
+exactos del render final. generar_video.py --finalizar <manifiesto>
+vuelve a generar ese trabajo a calidad completa con la misma semilla.
+
+Wan2.1 no tiene un checkpoint I2V 1.3B, así que el borrador I2V usa el
+checkpoint I2V indicado a 480p y con menos pasos. El modelo 1.3B solo
+admite 480p: la reducción de resolución de la vista previa se hace al
+final con ffmpeg.
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import json
+import os
+import random
+import shutil
+import subprocess
+import time
+from pathlib import Path
+
+from cache_disco import hash_archivo
+
+
+VERSION_MANIFIESTO = 1
+
+CKPT_BORRADOR_T2V = "/app/models/Wan2.1-T2V-1.3B"
+
+# Ajustes del borrador: pocos pasos con un solver rápido
+PASOS_BORRADOR = 20
+SOLVER_BORRADOR = "dpm++"
+FRAMES_BORRADOR_T2V = 33
+
+# Ancho de la vista previa (el alto se ajusta para mantener la proporción)
+ANCHO_VISTA_PREVIA = 416
+
+
+def elegir_semilla(semilla=None):
+    """Devuelve la semilla indicada o una aleatoria que quedará fijada en el manifiesto."""
+    if semilla is None or semilla < 0:
+        return random.randint(0, 2**31 - 1)
+    return semilla
+
+
+def ruta_vista_previa(salida):
+    """Ruta de la vista previa del borrador: <salida>_borrador.mp4."""
+    salida = Path(salida)
+    return salida.with_name(f"{salida.stem}_borrador.mp4")
+
+
+def ruta_manifiesto(salida):
+    """Ruta del manifiesto del borrador: <salida>_borrador.json."""
+    salida = Path(salida)
+    return salida.with_name(f"{salida.stem}_borrador.json")
+
+
+def ajustes_borrador(modo, ckpt_final):
+    """
+    Ajustes de generación del borrador.
+
+    Args:
+        modo: 't2v' o 'i2v'
+        ckpt_final: Checkpoint del render final
+
+    Returns:
+        Diccionario con ckpt_dir, resolucion, frame_num, sample_steps y sample_solver
+    """
+    if modo == "t2v":
+        return {
+            "ckpt_dir": CKPT_BORRADOR_T2V if Path(CKPT_BORRADOR_T2V).exists() else ckpt_final,
+            "resolucion": "832x480",
+            "frame_num": FRAMES_BORRADOR_T2V,
+            "sample_steps": PASOS_BORRADOR,
+            "sample_solver": SOLVER_BORRADOR,
+        }
+    # I2V: la máscara de Wan2.1 está fijada a 81 frames
+    return {
+        "ckpt_dir": ckpt_final,
+        "resolucion": "832x480",
+        "frame_num": 81,
+        "sample_steps": PASOS_BORRADOR,
+        "sample_solver": SOLVER_BORRADOR,
+    }
+
+
+def crear_vista_previa(video, vista_previa, ancho=ANCHO_VISTA_PREVIA):
+    """
+    Reduce el video del borrador a una vista previa pequeña.
+
+    Si ffmpeg no está disponible o falla, el video del borrador se usa tal cual.
+
+    Args:
+        video: Video generado (se elimina al terminar)
+        vista_previa: Ruta de la vista previa
+
+    Returns:
+        True si la vista previa quedó escrita
+    """
+    video = Path(video)
+    vista_previa = Path(vista_previa)
+    if shutil.which("ffmpeg"):
+        temporal = vista_previa.with_name(f".{vista_previa.stem}.tmp-{os.getpid()}.mp4")
+        resultado = subprocess.run(
+            ["ffmpeg", "-y", "-loglevel", "error", "-i", str(video),
+             "-vf", f"scale={ancho}:-2", "-c:v", "libx264", "-crf", "28",
+             "-preset", "veryfast", "-pix_fmt", "yuv420p", "-an", str(temporal)],
+        )
+        if resultado.returncode == 0 and temporal.exists():
+            os.replace(temporal, vista_previa)
+            video.unlink()
+            return True
+        if temporal.exists():
+            temporal.unlink()
+        print("⚠ No se pudo reducir el borrador con ffmpeg; se guarda a 480p")
+    if not video.exists():
+        return False
+    os.replace(video, vista_previa)
+    return True
+
+
+def escribir_manifiesto(ruta, modo, prompt, semilla, final, borrador, imagen_referencia=None):
+    """
+    Escribe el manifiesto que usa --finalizar.
+
+    Args:
+        ruta: Ruta del manifiesto
+        modo: 't2v' o 'i2v'
+        prompt: Prompt del trabajo
+        semilla: Semilla compartida por borrador y render final
+        final: Ajustes del render final (salida, ckpt_dir, resolucion, frame_num, ...)
+        borrador: Ajustes del borrador y ruta de la vista previa
+        imagen_referencia: Imagen de I2V (se guarda también su hash)
+    """
+    manifiesto = {
+        "version": VERSION_MANIFIESTO,
+        "creado": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "modo": modo,
+        "prompt": prompt,
+        "semilla": semilla,
+        "final": final,
+        "borrador": borrador,
+    }
+    if imagen_referencia:
+        manifiesto["imagen_referencia"] = str(Path(imagen_referencia).resolve())
+        manifiesto["imagen_sha256"] = hash_archivo(imagen_referencia)
+
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    temporal = ruta.with_name(f".{ruta.name}.tmp-{os.getpid()}")
+    temporal.write_text(json.dumps(manifiesto, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(temporal, ruta)
+
+
+def leer_manifiesto(ruta):
+    """
+    Lee y valida un manifiesto de borrador.
+
+    Args:
+        ruta: Ruta del manifiesto
+
+    Returns:
+        Diccionario del manifiesto
+
+    Raises:
+        ValueError: Si el manifiesto no es válido o la imagen de referencia cambió
+    """
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            manifiesto = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"No se pudo leer el manifiesto {ruta}: {e}")
+
+    if manifiesto.get("version") != VERSION_MANIFIESTO:
+        raise ValueError(f"Versión de manifiesto no soportada: {manifiesto.get('version')}")
+    for clave in ("modo", "prompt", "semilla", "final"):
+        if clave not in manifiesto:
+            raise ValueError(f"Falta '{clave}' en el manifiesto")
+
+    if manifiesto["modo"] == "i2v":
+        imagen = manifiesto.get("imagen_referencia")
+        if not imagen or not Path(imagen).exists():
+            raise ValueError(f"Imagen de referencia no encontrada: {imagen}")
+        if hash_archivo(imagen) != manifiesto.get("imagen_sha256"):
+            raise ValueError(f"La imagen de referencia cambió desde el borrador: {imagen}")
+
+    return manifiesto
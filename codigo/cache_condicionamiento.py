@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Caché de condicionamiento para los pipelines de Wan 2.1.
+
+Guarda en disco las salidas del encoder de texto umt5-xxl (prompt y prompt
+negativo) y, para I2V, las características CLIP de la imagen de referencia
+y su latente de condicionamiento del VAE. Los tensores se guardan con
+torch.save y se leen con torch.load(mmap=True), así que un acierto no
+copia el archivo completo en memoria.
+
+Un acierto evita además cargar los pesos del encoder correspondiente: el
+T5 y el CLIP del pipeline se sustituyen por T5Diferido y CLIPDiferido, que
+solo cargan el modelo real la primera vez que una entrada no está en caché.
+
+Uso:
+    from cache_disco import CacheDisco, directorio_cache_por_defecto
+    cache = CacheDisco(directorio_cache_por_defecto() / "t5", limite_gb=2)
+    with t5_con_cache(cache):
+        pipeline = wan.WanT2V(...)
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import hashlib
+import os
+from contextlib import contextmanager
+
+
+# Módulos de Wan2.1 que construyen un T5EncoderModel en su __init__
+MODULOS_CON_T5 = [
+    "wan.text2video",
+    "wan.image2video",
+    "wan.first_last_frame2video",
+    "wan.vace",
+]
+
+# Módulos de Wan2.1 que construyen un CLIPModel y codifican una imagen con el VAE
+MODULOS_CON_IMAGEN = [
+    "wan.image2video",
+    "wan.first_last_frame2video",
+]
+
+
+def _identificador_archivo(ruta):
+    """Identifica un checkpoint por su ruta y tamaño (sin leer su contenido)."""
+    ruta = os.path.abspath(str(ruta))
+    try:
+        return f"{ruta}:{os.path.getsize(ruta)}"
+    except OSError:
+        return ruta
+
+
+def _hash_tensor(tensor):
+    """Hash SHA-256 del contenido de un tensor (se copia a CPU en float32)."""
+    datos = tensor.detach().float().cpu().contiguous().numpy()
+    sha = hashlib.sha256(str(tuple(datos.shape)).encode("utf-8"))
+    sha.update(datos.tobytes())
+    return sha.hexdigest()
+
+
+def _parchear(modulos, nombre, fabrica):
+    """
+    Sustituye un atributo en varios módulos de Wan2.1.
+
+    Returns:
+        Diccionario {módulo: valor original} para restaurarlo después
+    """
+    import importlib
+
+    originales = {}
+    for nombre_modulo in modulos:
+        try:
+            modulo = importlib.import_module(nombre_modulo)
+        except ImportError:
+            continue
+        if hasattr(modulo, nombre):
+            originales[modulo] = getattr(modulo, nombre)
+            setattr(modulo, nombre, fabrica)
+    return originales
+
+
+def _restaurar(originales, nombre):
+    """Deshace _parchear."""
+    for modulo, original in originales.items():
+        setattr(modulo, nombre, original)
+
+
+class _ModeloDiferido:
+    """
+    Sustituye al atributo .model de un encoder hasta que se cargan sus pesos.
+
+    Los pipelines llaman a encoder.model.to(device) y .cpu() antes y después
+    de codificar; aquí solo se recuerda el dispositivo para aplicarlo si el
+    modelo llega a cargarse.
+    """
+
+    def __init__(self, encoder):
+        self._encoder = encoder
+
+    def to(self, dispositivo, *args, **kwargs):
+        self._encoder._dispositivo_modelo = dispositivo
+        return self
+
+    def cpu(self):
+        return self.to("cpu")
+
+    def parameters(self):
+        return iter(())
+
+
+class T5Diferido:
+    """
+    Sustituto de wan.modules.t5.T5EncoderModel con caché en disco.
+
+    Se llama igual que el original: encoder(textos, dispositivo) devuelve
+    una lista de tensores [longitud, dim], uno por texto.
+    """
+
+    def __init__(self, cache, *args, **kwargs):
+        """
+        Args:
+            cache: CacheDisco donde guardar los embeddings
+            *args, **kwargs: Argumentos de T5EncoderModel
+        """
+        self._cache = cache
+        self._args = args
+        self._kwargs = kwargs
+        self._real = None
+        self._dispositivo_modelo = kwargs.get("device")
+
+        self.text_len = kwargs.get("text_len")
+        self.dtype = kwargs.get("dtype")
+        self.checkpoint_path = kwargs.get("checkpoint_path")
+        self.tokenizer_path = kwargs.get("tokenizer_path")
+        self.model = _ModeloDiferido(self)
+
+    @property
+    def cargado(self):
+        """True si ya se cargaron los pesos reales del T5."""
+        return self._real is not None
+
+    def _cargar(self):
+        """Carga el T5EncoderModel real (solo ocurre con el primer fallo)."""
+        from wan.modules.t5 import T5EncoderModel
+
+        print("  Caché T5: cargando encoder de texto (texto no cacheado)...")
+        self._real = T5EncoderModel(*self._args, **self._kwargs)
+        if self._dispositivo_modelo is not None:
+            self._real.model.to(self._dispositivo_modelo)
+        self.model = self._real.model
+        self.tokenizer = self._real.tokenizer
+
+    def clave(self, texto):
+        """Clave de caché de un texto: (checkpoint, tokenizer, texto, dtype)."""
+        return self._cache.calcular_clave(
+            "t5",
+            _identificador_archivo(self.checkpoint_path),
+            str(self.tokenizer_path),
+            texto,
+            str(self.dtype),
+            self.text_len,
+        )
+
+    def __call__(self, textos, dispositivo):
+        import torch
+
+        resultados = []
+        for texto in textos:
+            clave = self.clave(texto)
+            entrada = self._cache.obtener(clave)
+
+            if entrada is not None:
+                contexto = torch.load(entrada / "contexto.pt", mmap=True, weights_only=True)
+            else:
+                if self._real is None:
+                    self._cargar()
+                contexto = self._real([texto], dispositivo)[0]
+                contexto_cpu = contexto.detach().to("cpu").contiguous()
+                self._cache.guardar(
+                    clave, lambda tmp: torch.save(contexto_cpu, tmp / "contexto.pt"))
+
+            resultados.append(contexto.to(dispositivo))
+
+        return resultados
+
+
+@contextmanager
+def t5_con_cache(cache):
+    """
+    Hace que los pipelines creados dentro del bloque usen T5Diferido.
+
+    Args:
+        cache: CacheDisco donde guardar los embeddings de texto
+
+    Yields:
+        Lista de los T5Diferido creados dentro del bloque
+    """
+    creados = []
+
+    def fabrica(*args, **kwargs):
+        encoder = T5Diferido(cache, *args, **kwargs)
+        creados.append(encoder)
+        return encoder
+
+    originales = _parchear(MODULOS_CON_T5, "T5EncoderModel", fabrica)
+    try:
+        yield creados
+    finally:
+        _restaurar(originales, "T5EncoderModel")
+
+
+class CLIPDiferido:
+    """
+    Sustituto de wan.modules.clip.CLIPModel con caché en disco.
+
+    Solo implementa lo que usan los pipelines I2V: clip.model.to()/.cpu()
+    y clip.visual(videos). La clave es el contenido de la imagen de entrada
+    y el checkpoint de CLIP.
+    """
+
+    def __init__(self, cache, *args, **kwargs):
+        """
+        Args:
+            cache: CacheDisco donde guardar las características CLIP
+            *args, **kwargs: Argumentos de CLIPModel
+        """
+        self._cache = cache
+        self._args = args
+        self._kwargs = kwargs
+        self._real = None
+        self._dispositivo_modelo = None
+
+        self.dtype = kwargs.get("dtype")
+        self.checkpoint_path = kwargs.get("checkpoint_path")
+        self.model = _ModeloDiferido(self)
+
+    @property
+    def cargado(self):
+        """True si ya se cargaron los pesos reales de CLIP."""
+        return self._real is not None
+
+    def _cargar(self):
+        """Carga el CLIPModel real (solo ocurre con el primer fallo)."""
+        from wan.modules.clip import CLIPModel
+
+        print("  Caché CLIP: cargando encoder de imagen (imagen no cacheada)...")
+        self._real = CLIPModel(*self._args, **self._kwargs)
+        if self._dispositivo_modelo is not None:
+            self._real.model.to(self._dispositivo_modelo)
+        self.model = self._real.model
+        self.transforms = self._real.transforms
+
+    def visual(self, videos):
+        import torch
+
+        clave = self._cache.calcular_clave(
+            "clip",
+            _identificador_archivo(self.checkpoint_path),
+            str(self.dtype),
+            [_hash_tensor(u) for u in videos],
+        )
+        entrada = self._cache.obtener(clave)
+        if entrada is not None:
+            dispositivo = videos[0].device
+            return torch.load(entrada / "clip.pt", mmap=True, weights_only=True).to(dispositivo)
+
+        if self._real is None:
+            self._cargar()
+        salida = self._real.visual(videos)
+        salida_cpu = salida.detach().to("cpu").contiguous()
+        self._cache.guardar(clave, lambda tmp: torch.save(salida_cpu, tmp / "clip.pt"))
+        return salida
+
+
+class VAEConCache:
+    """
+    Envuelve un WanVAE y cachea el latente de condicionamiento de I2V.
+
+    En I2V el VAE codifica un video cuyo primer frame es la imagen de
+    referencia redimensionada y el resto son ceros. Solo esas entradas se
+    cachean (clave: imagen, número de frames, tamaño y checkpoint del VAE);
+    cualquier otra llamada se pasa al VAE real sin cambios.
+    """
+
+    def __init__(self, vae, cache, vae_pth=None):
+        """
+        Args:
+            vae: WanVAE real
+            cache: CacheDisco donde guardar los latentes
+            vae_pth: Ruta al checkpoint del VAE (forma parte de la clave)
+        """
+        self._vae = vae
+        self._cache = cache
+        self._vae_pth = vae_pth
+
+    def __getattr__(self, nombre):
+        return getattr(self._vae, nombre)
+
+    def _es_condicionamiento_i2v(self, video):
+        """True si el video es [imagen, 0, 0, ...] como en WanI2V.generate."""
+        import torch
+
+        return (video.dim() == 4 and video.shape[1] > 1
+                and torch.count_nonzero(video[:, 1:]).item() == 0)
+
+    def encode(self, videos):
+        import torch
+
+        resultados = []
+        for video in videos:
+            if not self._es_condicionamiento_i2v(video):
+                resultados.append(self._vae.encode([video])[0])
+                continue
+
+            primer_frame = video[:, 0]
+            clave = self._cache.calcular_clave(
+                "vae_i2v",
+                _identificador_archivo(self._vae_pth),
+                _hash_tensor(primer_frame),
+                tuple(video.shape),
+            )
+            entrada = self._cache.obtener(clave)
+            if entrada is not None:
+                latente = torch.load(entrada / "latente.pt", mmap=True, weights_only=True)
+                resultados.append(latente.to(video.device))
+                continue
+
+            latente = self._vae.encode([video])[0]
+            latente_cpu = latente.detach().to("cpu").contiguous()
+            imagen_cpu = primer_frame.detach().float().cpu()
+
+            def escribir(tmp):
+                torch.save(latente_cpu, tmp / "latente.pt")
+                _guardar_imagen(imagen_cpu, tmp / "imagen.png")
+
+            self._cache.guardar(clave, escribir)
+            resultados.append(latente)
+
+        return resultados
+
+
+def _guardar_imagen(tensor, ruta):
+    """Guarda un tensor [3, H, W] en rango [-1, 1] como PNG."""
+    from PIL import Image
+
+    datos = ((tensor.clamp(-1, 1) + 1) * 127.5).round().byte()
+    Image.fromarray(datos.permute(1, 2, 0).numpy()).save(ruta)
+
+
+@contextmanager
+def imagen_con_cache(cache):
+    """
+    Hace que los pipelines I2V creados dentro del bloque cacheen la imagen.
+
+    El CLIP se sustituye por CLIPDiferido y el VAE se envuelve con
+    VAEConCache, de modo que las imágenes de referencia repetidas no pasan
+    de nuevo por el encoder CLIP ni por el encoder del VAE.
+
+    Args:
+        cache: CacheDisco donde guardar las características y latentes
+
+    Yields:
+        Lista de los CLIPDiferido creados dentro del bloque
+    """
+    creados = []
+
+    def fabrica_clip(*args, **kwargs):
+        encoder = CLIPDiferido(cache, *args, **kwargs)
+        creados.append(encoder)
+        return encoder
+
+    def fabrica_vae(*args, **kwargs):
+        from wan.modules.vae import WanVAE
+        return VAEConCache(WanVAE(*args, **kwargs), cache, kwargs.get("vae_pth"))
+
+    originales_clip = _parchear(MODULOS_CON_IMAGEN, "CLIPModel", fabrica_clip)
+    originales_vae = _parchear(MODULOS_CON_IMAGEN, "WanVAE", fabrica_vae)
+    try:
+        yield creados
+    finally:
+        _restaurar(originales_clip, "CLIPModel")
+        _restaurar(originales_vae, "WanVAE")
+
+
+def resumen_cache(cache, nombre):
+    """Imprime los aciertos y fallos de una caché."""
+    total = cache.aciertos + cache.fallos
+    if total:
+        print(f"  Caché {nombre}: {cache.aciertos}/{total} aciertos")
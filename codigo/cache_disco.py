@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Caché en disco direccionada por contenido, con expulsión LRU por tamaño.
+
+Cada entrada es un directorio cuyo nombre es el hash SHA-256 de su clave,
+por lo que una entrada puede contener varios archivos (tensores, imágenes,
+videos...). Las entradas se escriben primero en un directorio temporal y
+se publican con un rename atómico, de modo que varios procesos pueden usar
+la misma caché sin ver entradas a medio escribir.
+
+Uso:
+    cache = CacheDisco(directorio_cache_por_defecto() / "t5", limite_gb=2)
+    clave = cache.calcular_clave("t5", prompt, "bf16")
+    entrada = cache.obtener(clave)
+    if entrada is None:
+        entrada = cache.guardar(clave, lambda tmp: escribir_archivos(tmp))
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+
+def directorio_cache_por_defecto():
+    """
+    Devuelve el directorio raíz de las cachés de generación.
+
+    Se usa WAN_CACHE_DIR si está definida; si no, /app/.cache/wan_video dentro
+    del contenedor (volumen persistente) o ~/.cache/wan_video fuera de él.
+
+    Returns:
+        Path del directorio raíz de caché
+    """
+    if os.environ.get("WAN_CACHE_DIR"):
+        return Path(os.environ["WAN_CACHE_DIR"])
+    if Path("/app/.cache").is_dir():
+        return Path("/app/.cache/wan_video")
+    return Path.home() / ".cache" / "wan_video"
+
+
+def hash_archivo(ruta, tamano_bloque=1 << 20):
+    """
+    Calcula el hash SHA-256 del contenido de un archivo.
+
+    Args:
+        ruta: Ruta al archivo
+        tamano_bloque: Bytes leídos por iteración
+
+    Returns:
+        Hash hexadecimal del contenido
+    """
+    sha = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(tamano_bloque), b""):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def _tamano_directorio(ruta):
+    """Suma el tamaño en bytes de todos los archivos bajo un directorio."""
+    total = 0
+    for raiz, _, archivos in os.walk(ruta):
+        for nombre in archivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, nombre))
+            except OSError:
+                pass
+    return total
+
+
+class CacheDisco:
+    """Almacén de entradas en disco con clave por contenido y límite de tamaño."""
+
+    def __init__(self, directorio, limite_gb=10.0):
+        """
+        Args:
+            directorio: Directorio de la caché (se crea si no existe)
+            limite_gb: Tamaño máximo total; al superarlo se expulsan las
+                entradas usadas hace más tiempo
+        """
+        self.directorio = Path(directorio)
+        self.limite_bytes = int(limite_gb * (1024**3))
+        self.aciertos = 0
+        self.fallos = 0
+        self.directorio.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def calcular_clave(*partes):
+        """
+        Calcula la clave de una entrada a partir de sus partes.
+
+        Args:
+            *partes: Valores serializables a JSON que identifican la entrada
+
+        Returns:
+            Hash SHA-256 hexadecimal
+        """
+        datos = json.dumps(partes, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+    def ruta_entrada(self, clave):
+        """Ruta del directorio de una entrada (exista o no)."""
+        return self.directorio / clave[:2] / clave
+
+    def obtener(self, clave):
+        """
+        Busca una entrada y la marca como usada recientemente.
+
+        Args:
+            clave: Clave de la entrada
+
+        Returns:
+            Path del directorio de la entrada, o None si no está en caché
+        """
+        ruta = self.ruta_entrada(clave)
+        if not ruta.is_dir():
+            self.fallos += 1
+            return None
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        self.aciertos += 1
+        return ruta
+
+    def guardar(self, clave, escribir):
+        """
+        Crea una entrada de forma atómica.
+
+        Args:
+            clave: Clave de la entrada
+            escribir: Función que recibe un directorio temporal y escribe en
+                él los archivos de la entrada
+
+        Returns:
+            Path del directorio definitivo de la entrada
+        """
+        ruta = self.ruta_entrada(clave)
+        temporal = self.directorio / "tmp" / f"{clave}.{os.getpid()}.{uuid.uuid4().hex}"
+        temporal.mkdir(parents=True)
+        try:
+            escribir(temporal)
+            ruta.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.rename(temporal, ruta)
+            except OSError:
+                # Otro proceso publicó la misma entrada mientras tanto
+                if not ruta.is_dir():
+                    raise
+                shutil.rmtree(temporal, ignore_errors=True)
+        except BaseException:
+            shutil.rmtree(temporal, ignore_errors=True)
+            raise
+
+        self.limpiar()
+        return ruta
+
+    def entradas(self):
+        """
+        Lista las entradas de la caché.
+
+        Returns:
+            Lista de tuplas (ruta, tamaño en bytes, último uso)
+        """
+        resultado = []
+        for prefijo in self.directorio.iterdir():
+            if prefijo.name == "tmp" or not prefijo.is_dir():
+                continue
+            for entrada in prefijo.iterdir():
+                try:
+                    resultado.append((entrada, _tamano_directorio(entrada), entrada.stat().st_mtime))
+                except OSError:
+                    pass
+        return resultado
+
+    def tamano_total(self):
+        """Tamaño total en bytes de las entradas de la caché."""
+        return sum(tamano for _, tamano, _ in self.entradas())
+
+    def limpiar(self):
+        """
+        Expulsa las entradas usadas hace más tiempo hasta respetar el límite.
+
+        Returns:
+            Número de entradas eliminadas
+        """
+        entradas = self.entradas()
+        total = sum(tamano for _, tamano, _ in entradas)
+        eliminadas = 0
+
+        for ruta, tamano, _ in sorted(entradas, key=lambda e: e[2]):
+            if total <= self.limite_bytes:
+                break
+            shutil.rmtree(ruta, ignore_errors=True)
+            total -= tamano
+            eliminadas += 1
+
+        return eliminadas
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Caché de videos de máscara: una máscara de imagen se convierte una sola vez.
+
+Para VACE con generate.py una máscara PNG/JPG tiene que convertirse en un
+video con el tamaño, los fps y el número de frames del video base
+(mascara_video.py). El video depende solo de esos datos, así que se guarda
+en una CacheDisco indexada por el hash del contenido de la imagen, la
+geometría del video base y los parámetros de codificación: volver a editar
+con la misma máscara no cuesta nada y no se escriben copias junto a la
+máscara original.
+
+Las máscaras que siguen al producto (seguimiento_mascara.py) se guardan en
+la misma caché, indexadas además por el contenido del video base y los
+parámetros del seguimiento: el flujo óptico se calcula una sola vez.
+
+El directorio de la caché es, por orden:
+    WAN_CACHE_MASCARAS si está definida
+    /dev/shm/wan_video/mascaras si /dev/shm (tmpfs) tiene sitio para el límite
+    <directorio de cachés>/mascaras (ver cache_disco.directorio_cache_por_defecto)
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import os
+import shutil
+from pathlib import Path
+
+from cache_disco import CacheDisco, directorio_cache_por_defecto, hash_archivo
+from mascara_video import escribir_pila, parametros_codificacion, pila_mascara
+from seguimiento_mascara import (CIERRE_POR_DEFECTO, DIFUMINADO_POR_DEFECTO, MARGEN_POR_DEFECTO,
+                                 imprimir_informe, seguir_mascara)
+from sonda_video import sondear_video
+
+
+LIMITE_CACHE_MASCARAS_GB = 0.5
+
+VARIABLE_DIRECTORIO = "WAN_CACHE_MASCARAS"
+
+NOMBRE_VIDEO = "mascara"
+
+TMPFS = Path("/dev/shm")
+
+
+def directorio_cache_mascaras(limite_gb=LIMITE_CACHE_MASCARAS_GB):
+    """
+    Directorio de la caché de máscaras (WAN_CACHE_MASCARAS, tmpfs o disco).
+
+    Args:
+        limite_gb: Tamaño máximo de la caché; /dev/shm solo se usa si tiene
+            al menos ese espacio libre (en Docker suele ser de 64 MB)
+
+    Returns:
+        Path del directorio
+    """
+    if os.environ.get(VARIABLE_DIRECTORIO):
+        return Path(os.environ[VARIABLE_DIRECTORIO])
+    try:
+        if os.access(TMPFS, os.W_OK) and shutil.disk_usage(TMPFS).free >= limite_gb * 1024**3:
+            return TMPFS / "wan_video" / "mascaras"
+    except OSError:
+        pass
+    return directorio_cache_por_defecto() / "mascaras"
+
+
+class CacheMascaras:
+    """Videos de máscara indexados por máscara, geometría y codificación."""
+
+    def __init__(self, directorio=None, limite_gb=LIMITE_CACHE_MASCARAS_GB):
+        """
+        Args:
+            directorio: Directorio de la caché (None = directorio_cache_mascaras())
+            limite_gb: Tamaño máximo; se expulsan primero los videos usados hace más tiempo
+        """
+        self.cache = CacheDisco(directorio or directorio_cache_mascaras(limite_gb), limite_gb)
+
+    @staticmethod
+    def clave(ruta_mascara, info_base):
+        """
+        Clave de un video de máscara.
+
+        Args:
+            ruta_mascara: Imagen de máscara (cuenta su contenido, no su ruta)
+            info_base: Metadatos del video base (ver sonda_video.sondear_video)
+        """
+        return CacheDisco.calcular_clave(
+            "mascara_video",
+            hash_archivo(ruta_mascara),
+            info_base["ancho"],
+            info_base["alto"],
+            round(info_base["fps"], 3),
+            info_base["frames"],
+            parametros_codificacion(),
+        )
+
+    def video_mascara(self, ruta_mascara, info_base):
+        """
+        Video de máscara de una imagen para un video base, creándolo si no está.
+
+        Args:
+            ruta_mascara: Imagen de máscara
+            info_base: Metadatos del video base
+
+        Returns:
+            Tupla (ruta del video en la caché, True si ya estaba)
+        """
+        clave = self.clave(ruta_mascara, info_base)
+        return self._video(
+            clave,
+            lambda: pila_mascara(ruta_mascara, info_base["ancho"], info_base["alto"],
+                                 info_base["frames"]),
+            info_base["fps"],
+        )
+
+    def video_seguido(self, ruta_mascara, ruta_video, metodo="dis", procesos=None,
+                      cierre=CIERRE_POR_DEFECTO, margen=MARGEN_POR_DEFECTO,
+                      difuminado=DIFUMINADO_POR_DEFECTO):
+        """
+        Video de una máscara que sigue al producto, creándolo si no está.
+
+        Args:
+            ruta_mascara: Imagen de máscara del primer frame
+            ruta_video: Video base (cuenta su contenido, no su ruta)
+            metodo: Método de seguimiento (ver seguimiento_mascara.py)
+            procesos: Procesos del pool (no forma parte de la clave)
+            cierre, margen, difuminado: Posproceso de seguir_mascara()
+
+        Returns:
+            Tupla (ruta del video en la caché, True si ya estaba)
+        """
+        clave = CacheDisco.calcular_clave(
+            "mascara_seguida",
+            hash_archivo(ruta_mascara),
+            hash_archivo(ruta_video),
+            metodo,
+            cierre,
+            margen,
+            float(difuminado),
+            parametros_codificacion(),
+        )
+
+        def construir():
+            pila, informe = seguir_mascara(ruta_video, ruta_mascara, metodo, procesos,
+                                           cierre, margen, difuminado)
+            imprimir_informe(informe)
+            return pila
+
+        return self._video(clave, construir, sondear_video(ruta_video)["fps"])
+
+    def _video(self, clave, construir, fps):
+        """
+        Busca un video de máscara o lo escribe con la pila que devuelve construir().
+
+        Returns:
+            Tupla (ruta del video en la caché, True si ya estaba)
+        """
+        video = _video_de_entrada(self.cache.obtener(clave))
+        if video is not None:
+            return video, True
+
+        def escribir(directorio):
+            escribir_pila(construir(), directorio / f"{NOMBRE_VIDEO}.mp4", fps)
+
+        return _video_de_entrada(self.cache.guardar(clave, escribir)), False
+
+
+def _video_de_entrada(entrada):
+    """Video de una entrada de la caché (.mp4 o .avi según el codificador), o None."""
+    if entrada is None:
+        return None
+    return next(iter(sorted(entrada.glob(f"{NOMBRE_VIDEO}.*"))), None)
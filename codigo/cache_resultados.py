@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Caché de resultados: evita volver a generar un video idéntico.
+
+Un clip I2V con el modelo 14B cuesta decenas de minutos de GPU y es común
+volver a enviar exactamente el mismo prompt, imagen y ajustes. Cada video
+generado se guarda en una CacheDisco indexada por un hash canónico de la
+tarea, el checkpoint, el tamaño, los frames, los parámetros de muestreo,
+la semilla y el contenido de los archivos de entrada. Si el mismo trabajo
+se vuelve a pedir, el MP4 se enlaza en la salida en milisegundos.
+
+Solo se cachean trabajos con semilla fija: con una semilla aleatoria dos
+ejecuciones no producen el mismo video.
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+from cache_disco import CacheDisco, hash_archivo
+from ejecucion_wan import publicar_salida, ruta_temporal
+from motor_wan import valores_por_defecto
+
+
+LIMITE_CACHE_RESULTADOS_GB = 50.0
+
+# Archivos de entrada que forman parte de la clave (por contenido)
+ARCHIVOS_ENTRADA = ("imagen", "video_base", "mascara")
+
+NOMBRE_VIDEO = "video.mp4"
+
+
+def clave_resultado(trabajo):
+    """
+    Calcula la clave canónica de un trabajo.
+
+    Los valores que no indica el trabajo se completan con los mismos
+    defaults que usa generate.py, de modo que pedir explícitamente un valor
+    por defecto da la misma clave que no pedirlo.
+
+    Args:
+        trabajo: Diccionario del trabajo (ver motor_wan.py)
+
+    Returns:
+        Hash SHA-256, o None si el trabajo no tiene semilla fija
+    """
+    if trabajo.get("semilla") is None or trabajo["semilla"] < 0:
+        return None
+
+    trabajo = valores_por_defecto(dict(trabajo))
+    partes = {
+        "task": trabajo["task"],
+        "ckpt": str(Path(trabajo["ckpt_dir"]).resolve()),
+        "size": trabajo["size"],
+        "prompt": trabajo["prompt"],
+        "frame_num": int(trabajo["frame_num"]),
+        "sample_guide_scale": float(trabajo["sample_guide_scale"]),
+        "sample_shift": float(trabajo["sample_shift"]),
+        "sample_steps": int(trabajo["sample_steps"]),
+        "sample_solver": trabajo["sample_solver"],
+        "semilla": int(trabajo["semilla"]),
+        "entradas": {
+            clave: hash_archivo(trabajo[clave])
+            for clave in ARCHIVOS_ENTRADA if trabajo.get(clave)
+        },
+    }
+    # La caché de pasos cambia el resultado; sin ella la clave no varía
+    if trabajo.get("cache_pasos") is not None:
+        partes["cache_pasos"] = float(trabajo["cache_pasos"])
+    return CacheDisco.calcular_clave("resultado", partes)
+
+
+def _enlazar(origen, destino):
+    """Enlaza (o copia, si no es posible) un archivo en su destino de forma atómica."""
+    temporal = ruta_temporal(destino)
+    try:
+        os.link(origen, temporal)
+    except OSError:
+        shutil.copyfile(origen, temporal)
+    return publicar_salida(temporal, destino)
+
+
+class CacheResultados:
+    """Videos generados indexados por la clave canónica de su trabajo."""
+
+    def __init__(self, directorio, limite_gb=LIMITE_CACHE_RESULTADOS_GB):
+        """
+        Args:
+            directorio: Directorio de la caché de resultados
+            limite_gb: Tamaño máximo; se expulsan primero los videos usados hace más tiempo
+        """
+        self.cache = CacheDisco(directorio, limite_gb)
+
+    def recuperar(self, trabajo, salida):
+        """
+        Copia en la salida el video de un trabajo idéntico, si existe.
+
+        Args:
+            trabajo: Diccionario del trabajo
+            salida: Ruta final del video
+
+        Returns:
+            True si el video se sirvió desde la caché
+        """
+        inicio = time.perf_counter()
+        clave = clave_resultado(trabajo)
+        if clave is None:
+            return False
+        entrada = self.cache.obtener(clave)
+        if entrada is None or not (entrada / NOMBRE_VIDEO).exists():
+            return False
+        if not _enlazar(entrada / NOMBRE_VIDEO, salida):
+            return False
+        print(f"✓ Resultado recuperado de la caché en {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        print(f"  (trabajo idéntico ya generado; clave {clave[:12]})")
+        return True
+
+    def almacenar(self, trabajo, salida):
+        """
+        Guarda el video de un trabajo recién generado.
+
+        Args:
+            trabajo: Diccionario del trabajo
+            salida: Video generado
+
+        Returns:
+            True si el video se guardó en la caché
+        """
+        clave = clave_resultado(trabajo)
+        if clave is None or not Path(salida).exists():
+            return False
+
+        def escribir(directorio):
+            try:
+                os.link(salida, directorio / NOMBRE_VIDEO)
+            except OSError:
+                shutil.copyfile(salida, directorio / NOMBRE_VIDEO)
+            metadatos = {k: v for k, v in trabajo.items() if k != "salida"}
+            (directorio / "trabajo.json").write_text(
+                json.dumps(metadatos, ensure_ascii=False, indent=2, default=str), encoding="utf-8")
+
+        self.cache.guardar(clave, escribir)
+        return True
+
+
+def abrir_cache_resultados(dir_cache, semilla):
+    """
+    Devuelve la caché de resultados, o None si no se puede usar.
+
+    Args:
+        dir_cache: Directorio raíz de las cachés (None = cachés desactivadas)
+        semilla: Semilla del trabajo (sin semilla fija no se cachea)
+
+    Returns:
+        CacheResultados o None
+    """
+    if dir_cache is None:
+        return None
+    if semilla is None or semilla < 0:
+        print("ℹ Sin --semilla fija el resultado no se guarda en la caché de resultados")
+        return None
+    return CacheResultados(Path(dir_cache) / "resultados")
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Cola persistente de trabajos de generación en SQLite.
+
+La usa servidor_http.py para que los trabajos enviados sobrevivan a un
+reinicio del contenedor (docker-compose usa restart: unless-stopped).
+Cada trabajo pasa por los estados:
+
+    pendiente -> en_curso -> completado | error
+
+Al arrancar, los trabajos que quedaron en_curso (el proceso murió a mitad)
+vuelven a pendiente para ejecutarse de nuevo.
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+
+ESTADOS = ("pendiente", "en_curso", "completado", "error")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id TEXT PRIMARY KEY,
+    estado TEXT NOT NULL,
+    modo TEXT NOT NULL,
+    parametros TEXT NOT NULL,
+    salida TEXT,
+    error TEXT,
+    gpu TEXT,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    creado REAL NOT NULL,
+    iniciado REAL,
+    terminado REAL
+);
+CREATE INDEX IF NOT EXISTS trabajos_estado ON trabajos (estado, creado);
+"""
+
+
+class ColaTrabajos:
+    """Cola FIFO de trabajos guardada en una base de datos SQLite."""
+
+    def __init__(self, ruta_db):
+        """
+        Args:
+            ruta_db: Archivo SQLite (se crea si no existe)
+        """
+        self.ruta_db = Path(ruta_db)
+        self.ruta_db.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(str(self.ruta_db), check_same_thread=False,
+                                         isolation_level=None)
+        self._conexion.row_factory = sqlite3.Row
+        # WAL permite leer el estado mientras otro hilo escribe
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.executescript(ESQUEMA)
+
+    def cerrar(self):
+        """Cierra la conexión con la base de datos."""
+        with self._lock:
+            self._conexion.close()
+
+    def crear(self, modo, parametros):
+        """
+        Añade un trabajo pendiente a la cola.
+
+        Args:
+            modo: 't2v', 'i2v' o 'mv2v'
+            parametros: Diccionario con los parámetros del trabajo
+
+        Returns:
+            Identificador del trabajo
+        """
+        id_trabajo = uuid.uuid4().hex
+        with self._lock:
+            self._conexion.execute(
+                "INSERT INTO trabajos (id, estado, modo, parametros, creado) VALUES (?, 'pendiente', ?, ?, ?)",
+                (id_trabajo, modo, json.dumps(parametros, ensure_ascii=False), time.time()),
+            )
+        return id_trabajo
+
+    def obtener(self, id_trabajo):
+        """
+        Devuelve un trabajo como diccionario, o None si no existe.
+
+        Args:
+            id_trabajo: Identificador del trabajo
+        """
+        with self._lock:
+            fila = self._conexion.execute("SELECT * FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone()
+        return self._a_diccionario(fila) if fila else None
+
+    def contar(self, *estados):
+        """
+        Cuenta los trabajos en los estados indicados.
+
+        Args:
+            estados: Estados a contar (ver ESTADOS)
+
+        Returns:
+            Número de trabajos
+        """
+        marcas = ",".join("?" for _ in estados)
+        with self._lock:
+            return self._conexion.execute(
+                f"SELECT COUNT(*) FROM trabajos WHERE estado IN ({marcas})", estados
+            ).fetchone()[0]
+
+    def tomar_siguiente(self, gpu=None):
+        """
+        Marca como en_curso el trabajo pendiente más antiguo y lo devuelve.
+
+        Args:
+            gpu: GPU asignada al trabajo (solo informativo)
+
+        Returns:
+            Diccionario del trabajo, o None si no hay pendientes
+        """
+        with self._lock:
+            self._conexion.execute("BEGIN IMMEDIATE")
+            try:
+                fila = self._conexion.execute(
+                    "SELECT * FROM trabajos WHERE estado = 'pendiente' ORDER BY creado LIMIT 1"
+                ).fetchone()
+                if fila is None:
+                    self._conexion.execute("COMMIT")
+                    return None
+                self._conexion.execute(
+                    "UPDATE trabajos SET estado = 'en_curso', gpu = ?, iniciado = ?, "
+                    "intentos = intentos + 1 WHERE id = ?",
+                    (None if gpu is None else str(gpu), time.time(), fila["id"]),
+                )
+                self._conexion.execute("COMMIT")
+            except BaseException:
+                self._conexion.execute("ROLLBACK")
+                raise
+        return self.obtener(fila["id"])
+
+    def completar(self, id_trabajo, salida):
+        """Marca un trabajo como completado con la ruta de su video."""
+        self._terminar(id_trabajo, "completado", salida=str(salida))
+
+    def fallar(self, id_trabajo, error):
+        """Marca un trabajo como fallido con un mensaje de error."""
+        self._terminar(id_trabajo, "error", error=str(error))
+
+    def recuperar_interrumpidos(self):
+        """
+        Devuelve a pendiente los trabajos que quedaron en_curso.
+
+        Returns:
+            Número de trabajos recuperados
+        """
+        with self._lock:
+            cursor = self._conexion.execute(
+                "UPDATE trabajos SET estado = 'pendiente', gpu = NULL, iniciado = NULL "
+                "WHERE estado = 'en_curso'"
+            )
+            return cursor.rowcount
+
+    def _terminar(self, id_trabajo, estado, salida=None, error=None):
+        with self._lock:
+            self._conexion.execute(
+                "UPDATE trabajos SET estado = ?, salida = ?, error = ?, terminado = ? WHERE id = ?",
+                (estado, salida, error, time.time(), id_trabajo),
+            )
+
+    @staticmethod
+    def _a_diccionario(fila):
+        trabajo = dict(fila)
+        trabajo["parametros"] = json.loads(trabajo["parametros"])
+        return trabajo
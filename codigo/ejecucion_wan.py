@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Ejecución de generate.py de Wan2.1 con salida determinista.
+
+generate.py guarda el video con un nombre basado en la fecha dentro del
+directorio del repositorio Wan2.1, así que buscar "el MP4 más reciente"
+no es fiable cuando hay varias generaciones a la vez. Aquí cada trabajo
+recibe su propio --save_file temporal junto a la salida final y, al
+terminar, el archivo se publica con un rename atómico.
+
+Mientras corre, el lanzador emite eventos de cada etapa (telemetria.py) que
+se muestran como progreso y se guardan en <salida>_telemetria.json junto
+con la memoria muestreada del subproceso.
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import os
+import subprocess
+import uuid
+from pathlib import Path
+
+
+def ruta_temporal(salida):
+    """
+    Devuelve una ruta temporal única en el mismo directorio que la salida.
+
+    Al estar en el mismo sistema de archivos, el rename final es atómico.
+    Se conserva la extensión porque Wan2.1 elige el formato a partir de ella.
+
+    Args:
+        salida: Ruta final del video
+
+    Returns:
+        Path temporal (el directorio se crea si no existe)
+    """
+    salida = Path(salida).resolve()
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    return salida.parent / f".{salida.stem}.tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}{salida.suffix}"
+
+
+def publicar_salida(temporal, salida):
+    """
+    Mueve el archivo temporal a su ruta final de forma atómica.
+
+    Args:
+        temporal: Archivo temporal ya escrito
+        salida: Ruta final
+
+    Returns:
+        True si el archivo se publicó, False si el temporal no existe o está vacío
+    """
+    temporal = Path(temporal)
+    if not temporal.exists() or temporal.stat().st_size == 0:
+        if temporal.exists():
+            temporal.unlink()
+        return False
+    os.replace(temporal, Path(salida).resolve())
+    return True
+
+
+def ejecutar_generate(comando, repo_path, salida):
+    """
+    Ejecuta generate.py guardando el resultado exactamente en la salida.
+
+    Además del video escribe <stem>_telemetria.json junto a la salida con
+    el tiempo de cada etapa y la memoria del proceso (RSS de todo el árbol
+    y GPU, ver muestreo_memoria.py), también si la generación falla.
+
+    Args:
+        comando: Comando de generate.py (sin --save_file)
+        repo_path: Repositorio Wan2.1 (directorio de trabajo del proceso)
+        salida: Ruta final del video
+
+    Returns:
+        True si la generación terminó y el video quedó en la salida
+    """
+    from muestreo_memoria import MuestreadorMemoria, imprimir_resumen
+    from telemetria import (RegistroTelemetria, VARIABLE_EVENTOS, imprimir_evento,
+                            ruta_telemetria, seguir_eventos)
+
+    temporal = ruta_temporal(salida)
+    eventos = temporal.with_name(f"{temporal.stem}.eventos.jsonl")
+    comando = list(comando) + ["--save_file", str(temporal)]
+    registro = RegistroTelemetria([imprimir_evento])
+    registro.emitir({"tipo": "inicio", "comando": comando})
+
+    env = os.environ.copy()
+    env['PYTORCH_CUDA_ALLOC_CONF'] = 'expandable_segments:True'
+    env[VARIABLE_EVENTOS] = str(eventos)
+    try:
+        with subprocess.Popen(comando, cwd=str(repo_path), env=env) as proceso:
+            try:
+                with seguir_eventos(eventos, registro.emitir), \
+                        MuestreadorMemoria(proceso.pid) as muestreador:
+                    proceso.wait()
+            except BaseException:
+                proceso.kill()
+                raise
+    except BaseException:
+        if temporal.exists():
+            temporal.unlink()
+        raise
+    finally:
+        if eventos.exists():
+            eventos.unlink()
+
+    memoria = muestreador.resumen()
+    imprimir_resumen(memoria)
+
+    error = None
+    if proceso.returncode != 0:
+        if temporal.exists():
+            temporal.unlink()
+        error = "Error durante la generación"
+    elif not publicar_salida(temporal, salida):
+        error = f"Error: generate.py terminó pero no escribió el video (esperado en {temporal})"
+
+    registro.emitir({"tipo": "fin", "exito": error is None, "salida": str(salida), "error": error})
+    registro.guardar(ruta_telemetria(salida), salida=str(salida), comando=comando,
+                     exito=error is None, codigo_salida=proceso.returncode, memoria=memoria)
+    return error is None
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Lectura de videos frame a frame con memoria acotada.
+
+FuenteFrames decodifica un video bajo demanda, sin guardar la lista de
+frames: la memoria no depende de la duración del clip. Opcionalmente
+ajusta cada frame al formato del modelo mientras decodifica:
+    - tamaño (832x480 o 480x832 según la orientación, cv2.INTER_AREA)
+    - fps (16): se eligen los frames de origen más cercanos a cada
+      instante de salida; los descartados solo se demultiplexan (grab())
+    - número de frames (81)
+
+Para acceso aleatorio, volcar() escribe los frames en un .npy en disco
+(uint8, N x alto x ancho x 3, BGR) y lo devuelve mapeado en memoria; los
+tramos y la conversión a RGB son vistas de ese mapa, sin copias (la vista
+RGB es solo para NumPy/OpenCV; para torch, ver CANALES_RGB).
+
+Uso:
+    fuente = FuenteFrames.para_wan("video_base.mp4")
+    for frame in fuente:              # frames BGR de 832x480 a 16 fps
+        ...
+    frames = fuente.volcar("/tmp/base.npy")
+    for tramo in tramos(a_rgb(frames), 81):
+        ...
+
+    python fuente_frames.py video.mp4 --wan --volcar base.npy
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+from sonda_video import sondear_video
+
+
+# Formato de entrada del modelo (Wan2.1 a 480p)
+ANCHO_WAN = 832
+ALTO_WAN = 480
+FPS_WAN = 16
+FRAMES_WAN = 81
+
+# Orden de canales BGR -> RGB para indexar un tensor (torch no admite la
+# vista de a_rgb(), que tiene stride negativo)
+CANALES_RGB = [2, 1, 0]
+
+
+class FuenteFrames:
+    """
+    Frames de un video decodificados bajo demanda.
+
+    Se puede recorrer varias veces; cada recorrido vuelve a abrir el video.
+    """
+
+    def __init__(self, ruta, tamano=None, fps=None, frames=None):
+        """
+        Args:
+            ruta: Ruta al video
+            tamano: (ancho, alto) de salida (None = el del video)
+            fps: fps de salida (None = los del video, sin remuestrear)
+            frames: Máximo de frames de salida (None = todos)
+
+        Raises:
+            FileNotFoundError: Si el video no existe
+            ValueError: Si no se puede leer como video
+        """
+        self.ruta = Path(ruta)
+        self.info = sondear_video(self.ruta)
+        self.tamano = tuple(tamano) if tamano else (self.info["ancho"], self.info["alto"])
+        self.fps = fps or self.info["fps"]
+        self.maximo = frames
+
+    @classmethod
+    def para_wan(cls, ruta, frames=FRAMES_WAN):
+        """Fuente ajustada a la entrada de Wan2.1: 832x480 (o 480x832 si es vertical), 16 fps."""
+        info = sondear_video(ruta)
+        tamano = (ALTO_WAN, ANCHO_WAN) if info["alto"] > info["ancho"] else (ANCHO_WAN, ALTO_WAN)
+        return cls(ruta, tamano, FPS_WAN, frames)
+
+    def indices(self):
+        """Índices de los frames de origen que forman la salida (según los metadatos)."""
+        total = self.info["frames"]
+        fps_origen = self.info["fps"]
+        if not fps_origen or math.isclose(self.fps, fps_origen):
+            indices = range(total)
+        else:
+            salida = int((total - 1) * self.fps / fps_origen) + 1 if total else 0
+            indices = [min(total - 1, int(i * fps_origen / self.fps + 0.5)) for i in range(salida)]
+        return indices[:self.maximo] if self.maximo is not None else indices
+
+    def __len__(self):
+        return len(self.indices())
+
+    def __iter__(self):
+        """
+        Yields:
+            Frames BGR uint8 (alto, ancho, 3). Con más fps de salida que de
+            origen un mismo frame se entrega repetido (el mismo array)
+        """
+        import cv2
+
+        captura = cv2.VideoCapture(str(self.ruta))
+        if not captura.isOpened():
+            raise ValueError(f"No se pudo abrir el video: {self.ruta}")
+        try:
+            actual, frame = -1, None
+            for indice in self.indices():
+                if indice != actual:
+                    while actual < indice:
+                        if not captura.grab():
+                            return
+                        actual += 1
+                    ok, frame = captura.retrieve()
+                    if not ok:
+                        return
+                    if (frame.shape[1], frame.shape[0]) != self.tamano:
+                        frame = cv2.resize(frame, self.tamano, interpolation=cv2.INTER_AREA)
+                yield frame
+        finally:
+            captura.release()
+
+    def volcar(self, ruta):
+        """
+        Escribe los frames en un .npy y lo devuelve mapeado en memoria.
+
+        Los frames se copian uno a uno al mapa, así que el pico de memoria
+        es el de un frame más las páginas del mapa que el sistema aún no
+        ha escrito a disco.
+
+        Args:
+            ruta: Archivo .npy de destino
+
+        Returns:
+            np.memmap de solo lectura (N, alto, ancho, 3) en BGR
+        """
+        import numpy as np
+
+        ruta = Path(ruta)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ancho, alto = self.tamano
+        mapa = np.lib.format.open_memmap(ruta, mode="w+", dtype=np.uint8,
+                                         shape=(len(self), alto, ancho, 3))
+        escritos = 0
+        for escritos, frame in enumerate(self, 1):
+            mapa[escritos - 1] = frame
+        mapa.flush()
+        del mapa
+
+        frames = np.load(ruta, mmap_mode="r")
+        # Los metadatos pueden prometer más frames de los que se decodifican
+        return frames[:escritos]
+
+
+def abrir_frames(ruta):
+    """Abre un .npy escrito por FuenteFrames.volcar() (mapeado, solo lectura)."""
+    import numpy as np
+
+    return np.load(ruta, mmap_mode="r")
+
+
+def a_rgb(frames):
+    """
+    Vista RGB de frames BGR (mismo buffer, sin copiar).
+
+    La vista tiene stride negativo en el eje de canales: sirve para NumPy y
+    OpenCV, pero torch.from_numpy() la rechaza. Para un tensor, convertir
+    los frames BGR y reordenar en el lado de torch:
+    torch.from_numpy(frames)[..., CANALES_RGB].
+    """
+    return frames[..., ::-1]
+
+
+def tramos(frames, longitud, solape=0):
+    """
+    Divide una pila de frames en tramos consecutivos (vistas, sin copiar).
+
+    Args:
+        frames: Array (N, alto, ancho, 3)
+        longitud: Frames de cada tramo
+        solape: Frames compartidos entre tramos consecutivos
+
+    Yields:
+        Vistas frames[inicio:inicio + longitud]; el último puede ser más corto
+    """
+    if not 0 <= solape < longitud:
+        raise ValueError("El solape debe ser menor que la longitud del tramo")
+    for inicio in range(0, max(len(frames) - solape, 1), longitud - solape):
+        yield frames[inicio:inicio + longitud]
+
+
+def main():
+    """Lee un video con FuenteFrames y muestra el ritmo de decodificación."""
+    parser = argparse.ArgumentParser(
+        description="Lectura de un video frame a frame con memoria acotada"
+    )
+    parser.add_argument("video", type=str, help="Video a leer")
+    parser.add_argument("--wan", action="store_true",
+                       help=f"Ajustar a la entrada del modelo ({ANCHO_WAN}x{ALTO_WAN}, "
+                            f"{FPS_WAN} fps, {FRAMES_WAN} frames)")
+    parser.add_argument("--volcar", type=str, default=None, metavar="NPY",
+                       help="Escribir los frames en un .npy mapeado en memoria")
+    args = parser.parse_args()
+
+    try:
+        fuente = FuenteFrames.para_wan(args.video) if args.wan else FuenteFrames(args.video)
+        inicio = time.perf_counter()
+        if args.volcar:
+            frames = fuente.volcar(args.volcar)
+            leidos = len(frames)
+        else:
+            leidos = sum(1 for _ in fuente)
+        segundos = time.perf_counter() - inicio
+    except (OSError, ValueError) as e:
+        print(f"✗ Error: {e}")
+        sys.exit(1)
+
+    ancho, alto = fuente.tamano
+    print(f"✓ {leidos} frames de {ancho}x{alto} a {fuente.fps:g} fps "
+          f"en {segundos:.2f} s ({leidos / segundos:.1f} frames/s)")
+    if args.volcar:
+        print(f"✓ Frames volcados en {args.volcar}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,15 +9,28 @@ Este script proporciona una interfaz simple para generar videos a partir de:
 Uso:
     python generar_video.py --modo t2v --prompt "Descripción del video" --salida video.mp4
     python generar_video.py --modo i2v --imagen_referencia imagen.png --prompt "Descripción" --salida video.mp4
+    python generar_video.py --lote trabajos.jsonl
 
 Autor: Práctica académica - Generación de Video con Wan 2.1
 """
 
 import argparse
+import importlib.util
+import json
 import os
 import sys
 from pathlib import Path
-import torch
+
+from borradores import (ajustes_borrador, crear_vista_previa, elegir_semilla, escribir_manifiesto,
+                        leer_manifiesto, ruta_manifiesto, ruta_vista_previa)
+from cache_disco import directorio_cache_por_defecto
+from cache_resultados import CacheResultados, abrir_cache_resultados
+from ejecucion_wan import ejecutar_generate
+from lanzador_generate import construir_prefijo
+from lanzamiento_distribuido import PARALELISMOS, preparar_lanzamiento
+from planificador_memoria import imprimir_plan, memoria_libre_gpu, planificar
+from seleccionar_gpu import obtener_info_gpus
+from servidor_generacion import generar_en_servidor
 
 
 def verificar_entorno():
@@ -25,12 +38,12 @@ def verificar_entorno():
     errores = []
     
     # Verificar PyTorch
-    try:
-        import torch
-        if not torch.cuda.is_available():
-            print("⚠ Advertencia: CUDA no disponible. La generación será muy lenta en CPU.")
-    except ImportError:
+    # Sin importar torch: tarda segundos y la GPU se consulta con nvidia-smi
+    # para no crear un contexto CUDA en este proceso (lo usa solo el hijo)
+    if importlib.util.find_spec("torch") is None:
         errores.append("PyTorch no está instalado. Ejecuta: pip install torch")
+    elif not obtener_info_gpus():
+        print("⚠ Advertencia: CUDA no disponible. La generación será muy lenta en CPU.")
     
     # Verificar repositorio Wan2.1
     possible_paths = [
@@ -70,7 +83,10 @@ def encontrar_repositorio_wan():
 
 
 def generar_video_t2v(prompt, salida, ckpt_dir, resolucion="832x480", 
-                      offload_model=False, t5_cpu=False, sample_guide_scale=7.5):
+                      offload_model=False, t5_cpu=False, sample_guide_scale=7.5,
+                      servidor=None, dir_cache=None, gpus=1, paralelismo="ulysses",
+                      frame_num=None, semilla=None, sample_steps=None, sample_solver=None,
+                      cache_pasos=None, perfil=False):
     """
     Genera un video a partir de texto usando el modelo T2V.
     
@@ -82,6 +98,19 @@ def generar_video_t2v(prompt, salida, ckpt_dir, resolucion="832x480",
         offload_model: Si True, usa offloading para reducir memoria GPU
         t5_cpu: Si True, ejecuta el encoder T5 en CPU
         sample_guide_scale: Escala de guía para el sampling
+        servidor: Socket de un servidor de generación (servidor_generacion.py).
+            Si está disponible, el trabajo se envía allí en lugar de lanzar generate.py
+        dir_cache: Directorio raíz de las cachés de condicionamiento y de resultados (None = sin caché)
+        gpus: Número de GPUs entre las que repartir el clip (torchrun + FSDP)
+        paralelismo: Paralelismo de secuencia con varias GPUs: 'ulysses' o 'ring'
+        frame_num: Número de frames a generar (default: 81)
+        semilla: Semilla de generación (None = aleatoria). Con semilla fija y
+            caché activa, un trabajo idéntico ya generado se sirve desde la caché
+        sample_steps: Pasos de muestreo (None = default de generate.py)
+        sample_solver: Solver de muestreo: 'unipc' o 'dpm++' (None = 'unipc')
+        cache_pasos: Umbral de la caché de pasos del DiT (None = desactivada, ver cache_pasos.py)
+        perfil: Si True, perfila la generación con torch.profiler y cProfile
+            y deja la traza y el resumen junto a la salida (ver perfil.py)
     """
     print(f"\nGenerando video T2V...")
     print(f"  Prompt: {prompt}")
@@ -121,10 +150,46 @@ def generar_video_t2v(prompt, salida, ckpt_dir, resolucion="832x480",
             task = "t2v-14B"
             size_default = "1280*720" if resolucion == "1280x720" else "832*480"
         
+        trabajo = {
+            "modo": "t2v",
+            "task": task,
+            "size": size_default,
+            "ckpt_dir": str(ckpt_dir),
+            "prompt": prompt,
+            "salida": salida,
+            "offload_model": offload_model,
+            "t5_cpu": t5_cpu,
+            "semilla": semilla,
+        }
+        if frame_num is not None:
+            trabajo["frame_num"] = frame_num
+        if sample_steps is not None:
+            trabajo["sample_steps"] = sample_steps
+        if sample_solver is not None:
+            trabajo["sample_solver"] = sample_solver
+        if cache_pasos is not None:
+            trabajo["cache_pasos"] = cache_pasos
+        if task == "t2v-1.3B":
+            trabajo["sample_guide_scale"] = sample_guide_scale
+            trabajo["sample_shift"] = 8
+        
+        # Un trabajo idéntico ya generado se sirve desde la caché de resultados
+        # (salvo con perfil, que necesita ejecutar la generación)
+        cache_resultados = abrir_cache_resultados(dir_cache, semilla)
+        if cache_resultados and not perfil and cache_resultados.recuperar(trabajo, salida):
+            return True
+        
+        # Usar el servidor de generación si hay uno disponible
+        if servidor and gpus <= 1 and not perfil:
+            exito = generar_en_servidor(servidor, trabajo)
+            if exito is not None:
+                if exito and cache_resultados:
+                    cache_resultados.almacenar(trabajo, salida)
+                return exito
+        
         # Construir comando
         comando = [
-            sys.executable,
-            str(generate_script),
+            *construir_prefijo(generate_script, dir_cache, cache_pasos, salida if perfil else None),
             "--task", task,
             "--size", size_default,
             "--ckpt_dir", str(ckpt_dir),
@@ -138,37 +203,28 @@ def generar_video_t2v(prompt, salida, ckpt_dir, resolucion="832x480",
         if t5_cpu:
             comando.append("--t5_cpu")
         
+        if frame_num is not None:
+            comando.extend(["--frame_num", str(frame_num)])
+        
+        if semilla is not None:
+            comando.extend(["--base_seed", str(semilla)])
+        
+        if sample_steps is not None:
+            comando.extend(["--sample_steps", str(sample_steps)])
+        
+        if sample_solver is not None:
+            comando.extend(["--sample_solver", sample_solver])
+        
         if task == "t2v-1.3B":
             comando.extend(["--sample_guide_scale", str(sample_guide_scale)])
             comando.extend(["--sample_shift", "8"])
         
-        # Limpiar memoria GPU antes de ejecutar
-        print("\nLimpiando memoria GPU...")
-        try:
-            import torch
-            torch.cuda.empty_cache()
-            print("✓ Memoria GPU limpiada")
-        except:
-            pass
-        
         # Ejecutar generación
-        print("\nEjecutando generación (esto puede tomar varios minutos)...")
-        print(f"Comando: {' '.join(comando)}")
-        
-        import subprocess
-        import os
-        env = os.environ.copy()
-        env['PYTORCH_CUDA_ALLOC_CONF'] = 'expandable_segments:True'
-        resultado = subprocess.run(comando, cwd=str(repo_path), env=env)
-        
-        if resultado.returncode == 0:
-            print(f"\n✓ Video generado exitosamente")
-            print(f"  Nota: El video se guarda en el directorio del repositorio Wan2.1")
-            print(f"  Busca el archivo de salida y muévelo a: {salida}")
-            return True
-        else:
-            print("\n✗ Error durante la generación")
-            return False
+        comando = preparar_lanzamiento(comando, task, size_default, frame_num, gpus, paralelismo)
+        exito = ejecutar_generate(comando, repo_path, salida)
+        if exito and cache_resultados:
+            cache_resultados.almacenar(trabajo, salida)
+        return exito
             
     except Exception as e:
         print(f"\n✗ Error: {e}")
@@ -181,7 +237,9 @@ def generar_video_t2v(prompt, salida, ckpt_dir, resolucion="832x480",
 
 
 def generar_video_i2v(imagen_referencia, prompt, salida, ckpt_dir, resolucion="832x480",
-                      offload_model=False, t5_cpu=False, frame_num=None):
+                      offload_model=False, t5_cpu=False, frame_num=None, servidor=None,
+                      dir_cache=None, gpus=1, paralelismo="ulysses", semilla=None,
+                      sample_steps=None, sample_solver=None, cache_pasos=None, perfil=False):
     """
     Genera un video a partir de una imagen de referencia usando el modelo I2V.
     
@@ -193,6 +251,19 @@ def generar_video_i2v(imagen_referencia, prompt, salida, ckpt_dir, resolucion="8
         resolucion: Resolución del video
         offload_model: Si True, usa offloading para reducir memoria GPU
         t5_cpu: Si True, ejecuta el encoder T5 en CPU
+        frame_num: Número de frames a generar (default: 81)
+        servidor: Socket de un servidor de generación (servidor_generacion.py).
+            Si está disponible, el trabajo se envía allí en lugar de lanzar generate.py
+        dir_cache: Directorio raíz de las cachés de condicionamiento y de resultados (None = sin caché)
+        gpus: Número de GPUs entre las que repartir el clip (torchrun + FSDP)
+        paralelismo: Paralelismo de secuencia con varias GPUs: 'ulysses' o 'ring'
+        semilla: Semilla de generación (None = aleatoria). Con semilla fija y
+            caché activa, un trabajo idéntico ya generado se sirve desde la caché
+        sample_steps: Pasos de muestreo (None = default de generate.py)
+        sample_solver: Solver de muestreo: 'unipc' o 'dpm++' (None = 'unipc')
+        cache_pasos: Umbral de la caché de pasos del DiT (None = desactivada, ver cache_pasos.py)
+        perfil: Si True, perfila la generación con torch.profiler y cProfile
+            y deja la traza y el resumen junto a la salida (ver perfil.py)
     """
     print(f"\nGenerando video I2V...")
     print(f"  Imagen de referencia: {imagen_referencia}")
@@ -272,10 +343,43 @@ def generar_video_i2v(imagen_referencia, prompt, salida, ckpt_dir, resolucion="8
         else:
             size_default = "832*480"
         
+        trabajo = {
+            "modo": "i2v",
+            "task": task,
+            "size": size_default,
+            "ckpt_dir": str(ckpt_dir),
+            "prompt": prompt,
+            "imagen": str(imagen_referencia),
+            "salida": salida,
+            "frame_num": frame_num if frame_num is not None else 81,
+            "offload_model": offload_model,
+            "t5_cpu": t5_cpu,
+            "semilla": semilla,
+        }
+        if sample_steps is not None:
+            trabajo["sample_steps"] = sample_steps
+        if sample_solver is not None:
+            trabajo["sample_solver"] = sample_solver
+        if cache_pasos is not None:
+            trabajo["cache_pasos"] = cache_pasos
+        
+        # Un trabajo idéntico ya generado se sirve desde la caché de resultados
+        # (salvo con perfil, que necesita ejecutar la generación)
+        cache_resultados = abrir_cache_resultados(dir_cache, semilla)
+        if cache_resultados and not perfil and cache_resultados.recuperar(trabajo, salida):
+            return True
+        
+        # Usar el servidor de generación si hay uno disponible
+        if servidor and gpus <= 1 and not perfil:
+            exito = generar_en_servidor(servidor, trabajo)
+            if exito is not None:
+                if exito and cache_resultados:
+                    cache_resultados.almacenar(trabajo, salida)
+                return exito
+        
         # Construir comando para I2V
         comando = [
-            sys.executable,
-            str(generate_script),
+            *construir_prefijo(generate_script, dir_cache, cache_pasos, salida if perfil else None),
             "--task", task,
             "--size", size_default,
             "--ckpt_dir", str(ckpt_dir),
@@ -304,33 +408,21 @@ def generar_video_i2v(imagen_referencia, prompt, salida, ckpt_dir, resolucion="8
             if offload_model or t5_cpu:
                 print("ℹ Usando 81 frames (requerido por I2V) con optimizaciones de memoria activas")
         
-        # Limpiar memoria GPU antes de ejecutar
-        print("\nLimpiando memoria GPU...")
-        try:
-            import torch
-            torch.cuda.empty_cache()
-            print("✓ Memoria GPU limpiada")
-        except:
-            pass
+        if semilla is not None:
+            comando.extend(["--base_seed", str(semilla)])
         
-        # Ejecutar generación
-        print("\nEjecutando generación I2V (esto puede tomar varios minutos)...")
-        print(f"Comando: {' '.join(comando)}")
+        if sample_steps is not None:
+            comando.extend(["--sample_steps", str(sample_steps)])
         
-        import subprocess
-        import os
-        env = os.environ.copy()
-        env['PYTORCH_CUDA_ALLOC_CONF'] = 'expandable_segments:True'
-        resultado = subprocess.run(comando, cwd=str(repo_path), env=env)
+        if sample_solver is not None:
+            comando.extend(["--sample_solver", sample_solver])
         
-        if resultado.returncode == 0:
-            print(f"\n✓ Video generado exitosamente")
-            print(f"  Nota: El video se guarda en el directorio del repositorio Wan2.1")
-            print(f"  Busca el archivo de salida y muévelo a: {salida}")
-            return True
-        else:
-            print("\n✗ Error durante la generación")
-            return False
+        # Ejecutar generación
+        comando = preparar_lanzamiento(comando, task, size_default, frame_num, gpus, paralelismo)
+        exito = ejecutar_generate(comando, repo_path, salida)
+        if exito and cache_resultados:
+            cache_resultados.almacenar(trabajo, salida)
+        return exito
             
     except Exception as e:
         print(f"\n✗ Error: {e}")
@@ -342,6 +434,429 @@ def generar_video_i2v(imagen_referencia, prompt, salida, ckpt_dir, resolucion="8
         return False
 
 
+RESOLUCIONES = ("832x480", "1280x720")
+
+# Checkpoints por defecto de cada modo (los mismos que usa main())
+CKPT_POR_DEFECTO = {
+    ("t2v", "832x480"): "/app/models/Wan2.1-T2V-1.3B",
+    ("t2v", "1280x720"): "/app/models/Wan2.1-T2V-1.3B",
+    ("i2v", "832x480"): "/app/models/Wan2.1-I2V-14B-480P",
+    ("i2v", "1280x720"): "/app/models/Wan2.1-I2V-14B-720P",
+    ("vace", "832x480"): "/app/models/Wan2.1-VACE-14B",
+    ("vace", "1280x720"): "/app/models/Wan2.1-VACE-14B",
+}
+
+
+def determinar_tarea(modo, ckpt_dir, resolucion="832x480"):
+    """
+    Determina la tarea y el tamaño de generate.py para un modo y checkpoint.
+
+    Sigue las mismas reglas que generar_video_t2v, generar_video_i2v y
+    generar_video_mv2v.
+
+    Args:
+        modo: 't2v', 'i2v' o 'vace'
+        ckpt_dir: Directorio del checkpoint
+        resolucion: "832x480" o "1280x720"
+
+    Returns:
+        Tupla (task, size), por ejemplo ("t2v-1.3B", "832*480")
+    """
+    ckpt_str = str(ckpt_dir)
+    es_1_3b = "1.3B" in ckpt_str or "1_3B" in ckpt_str
+
+    if modo == "t2v":
+        if es_1_3b:
+            return "t2v-1.3B", "832*480"
+        return "t2v-14B", "1280*720" if resolucion == "1280x720" else "832*480"
+
+    if modo == "i2v":
+        return "i2v-14B", "1280*720" if resolucion == "1280x720" else "832*480"
+
+    if modo == "vace":
+        if es_1_3b:
+            return "vace-1.3B", "480*832" if resolucion == "832x480" else "832*480"
+        return "vace-14B", "1280*720" if resolucion == "1280x720" else "832*480"
+
+    raise ValueError(f"Modo desconocido: {modo}")
+
+
+def preparar_trabajo_lote(entrada, offload_model=False, t5_cpu=False,
+                          sin_optimizaciones=False, memoria_libre_gb=None):
+    """
+    Convierte una línea del archivo de lote en un trabajo para MotorWan.
+
+    Cada línea es un objeto JSON con las claves modo, prompt y salida, y
+    opcionalmente ckpt_dir, resolucion, imagen_referencia (I2V), video_base
+    y mascara (VACE), frame_num, semilla, sample_guide_scale, sample_shift,
+    sample_steps, sample_solver, cache_pasos, offload_model y t5_cpu.
+
+    Args:
+        entrada: Diccionario leído del archivo de lote
+        offload_model: Valor por defecto si la entrada no lo indica
+        t5_cpu: Valor por defecto si la entrada no lo indica
+        sin_optimizaciones: Si True, no se activan optimizaciones de memoria
+        memoria_libre_gb: Memoria libre de la GPU para planificador_memoria.py
+            (None = optimizaciones fijas para los modelos 14B)
+
+    Returns:
+        Diccionario del trabajo (ver motor_wan.py)
+
+    Raises:
+        ValueError: Si la entrada no es un objeto o tiene valores inválidos
+    """
+    if not isinstance(entrada, dict):
+        raise ValueError(f"La línea debe ser un objeto JSON, no {type(entrada).__name__}")
+    modo = entrada.get("modo")
+    if modo not in ("t2v", "i2v", "vace"):
+        raise ValueError(f"Modo inválido: {modo!r} (usa t2v, i2v o vace)")
+    if not entrada.get("prompt"):
+        raise ValueError("Falta el prompt")
+    if not entrada.get("salida"):
+        raise ValueError("Falta la salida")
+
+    resolucion = entrada.get("resolucion", "832x480")
+    if resolucion not in RESOLUCIONES:
+        raise ValueError(f"Resolución inválida: {resolucion!r} (usa {' o '.join(RESOLUCIONES)})")
+    # VaceWanModel redefine forward, así que el parche de cache_pasos.py no le afecta
+    if modo == "vace" and entrada.get("cache_pasos") is not None:
+        raise ValueError("cache_pasos no está soportado en trabajos vace")
+    ckpt_dir = entrada.get("ckpt_dir") or CKPT_POR_DEFECTO[(modo, resolucion)]
+    task, size = determinar_tarea(modo, ckpt_dir, resolucion)
+
+    trabajo = {
+        "modo": modo,
+        "task": task,
+        "size": size,
+        "ckpt_dir": str(Path(ckpt_dir)),
+        "prompt": entrada["prompt"],
+        "salida": str(Path(entrada["salida"]).resolve()),
+        "offload_model": entrada.get("offload_model", offload_model),
+        "t5_cpu": entrada.get("t5_cpu", t5_cpu),
+    }
+    for clave in ("frame_num", "semilla", "sample_guide_scale", "sample_shift",
+                  "sample_steps", "sample_solver", "cache_pasos"):
+        if entrada.get(clave) is not None:
+            trabajo[clave] = entrada[clave]
+
+    # Mismos ajustes que generar_video_t2v para el modelo 1.3B
+    if task == "t2v-1.3B":
+        trabajo.setdefault("sample_guide_scale", 7.5)
+        trabajo.setdefault("sample_shift", 8)
+
+    # Optimizaciones de memoria automáticas si el trabajo no las fija. A
+    # diferencia de main(), en un lote no se cambian resolución ni frames
+    if (not sin_optimizaciones and "offload_model" not in entrada and "t5_cpu" not in entrada
+            and not offload_model and not t5_cpu):
+        if memoria_libre_gb is not None:
+            plan = planificar(task, size, trabajo.get("frame_num", 81), memoria_libre_gb,
+                              permitir_reducir=False, sample_steps=trabajo.get("sample_steps"))
+            trabajo["offload_model"] = plan["offload_model"]
+            trabajo["t5_cpu"] = plan["t5_cpu"]
+        elif "14B" in task:
+            trabajo["offload_model"] = True
+            trabajo["t5_cpu"] = True
+
+    if modo == "i2v":
+        imagen = entrada.get("imagen_referencia") or entrada.get("imagen")
+        if not imagen or not Path(imagen).exists():
+            raise ValueError(f"Imagen de referencia no encontrada: {imagen}")
+        trabajo["imagen"] = str(Path(imagen).resolve())
+
+    if modo == "vace":
+        video_base = entrada.get("video_base")
+        mascara = entrada.get("mascara")
+        if not video_base or not Path(video_base).exists():
+            raise ValueError(f"Video base no encontrado: {video_base}")
+        if not mascara or not Path(mascara).exists():
+            raise ValueError(f"Máscara no encontrada: {mascara}")
+        # Una máscara de imagen se pasa tal cual: el motor la convierte en tensor
+        trabajo["video_base"] = str(Path(video_base).resolve())
+        trabajo["mascara"] = str(Path(mascara).resolve())
+        trabajo.setdefault("frame_num", 81)
+
+    return trabajo
+
+
+def generar_lote(ruta_lote, ruta_resultados=None, offload_model=False, t5_cpu=False,
+                 sin_optimizaciones=False, dir_cache=None, cache_pasos=None):
+    """
+    Genera todos los trabajos de un archivo JSONL reutilizando el modelo cargado.
+
+    Los trabajos se agrupan por checkpoint, de modo que cada modelo se carga
+    una sola vez. Por cada trabajo se escribe una línea JSON en el archivo de
+    resultados con la salida, la semilla y los tiempos.
+
+    Args:
+        ruta_lote: Archivo JSONL con un trabajo por línea
+        ruta_resultados: Archivo JSONL de resultados
+            (default: <lote>_resultados.jsonl junto al lote)
+        offload_model: Valor por defecto de offload_model para los trabajos
+        t5_cpu: Valor por defecto de t5_cpu para los trabajos
+        sin_optimizaciones: Si True, no se activan optimizaciones de memoria
+        dir_cache: Directorio raíz de las cachés de condicionamiento y de resultados (None = sin caché)
+        cache_pasos: Umbral de la caché de pasos para los trabajos t2v e i2v que no lo indiquen
+
+    Returns:
+        True si todos los trabajos terminaron correctamente
+    """
+    ruta_lote = Path(ruta_lote)
+    if not ruta_lote.exists():
+        print(f"✗ Error: Archivo de lote no encontrado: {ruta_lote}")
+        return False
+
+    if ruta_resultados is None:
+        ruta_resultados = ruta_lote.with_name(f"{ruta_lote.stem}_resultados.jsonl")
+    ruta_resultados = Path(ruta_resultados)
+    ruta_resultados.parent.mkdir(parents=True, exist_ok=True)
+
+    repo_path = encontrar_repositorio_wan()
+    if repo_path is None:
+        print("✗ Error: Repositorio Wan2.1 no encontrado.")
+        return False
+
+    memoria_libre_gb = None if sin_optimizaciones else memoria_libre_gpu()
+
+    # Leer y validar todos los trabajos antes de cargar ningún modelo
+    trabajos = []
+    errores = []
+    with open(ruta_lote, encoding="utf-8") as f:
+        for numero, linea in enumerate(f, start=1):
+            linea = linea.strip()
+            if not linea or linea.startswith("#"):
+                continue
+            try:
+                trabajo = preparar_trabajo_lote(json.loads(linea), offload_model,
+                                                t5_cpu, sin_optimizaciones, memoria_libre_gb)
+                trabajo["linea"] = numero
+                if cache_pasos is not None and trabajo["modo"] != "vace":
+                    trabajo.setdefault("cache_pasos", cache_pasos)
+                trabajos.append(trabajo)
+            except ValueError as e:
+                errores.append({"linea": numero, "exito": False, "error": str(e)})
+                print(f"✗ Línea {numero}: {e}")
+
+    # Agrupar por checkpoint para cargar cada modelo una sola vez
+    trabajos.sort(key=lambda t: (t["task"], t["ckpt_dir"], t["t5_cpu"], t["linea"]))
+    grupos = len({(t["task"], t["ckpt_dir"], t["t5_cpu"]) for t in trabajos})
+
+    print(f"\nLote: {len(trabajos)} trabajos válidos en {grupos} checkpoint(s)")
+    print(f"  Resultados: {ruta_resultados}")
+
+    from motor_wan import MotorWan
+    motor = MotorWan(repo_path, dir_cache=dir_cache)
+    cache_resultados = CacheResultados(Path(dir_cache) / "resultados") if dir_cache else None
+    exitosos = 0
+
+    with open(ruta_resultados, "w", encoding="utf-8") as salida_resultados:
+        for registro in errores:
+            salida_resultados.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+        for i, trabajo in enumerate(trabajos, start=1):
+            print(f"\n[{i}/{len(trabajos)}] {trabajo['modo'].upper()} ({trabajo['task']}): {trabajo['prompt'][:60]}")
+            if cache_resultados and cache_resultados.recuperar(trabajo, trabajo["salida"]):
+                resultado = {"exito": True, "salida": trabajo["salida"], "semilla": trabajo["semilla"],
+                             "tiempo_carga": 0.0, "tiempo_trabajo": 0.0, "error": None, "cache": True}
+            else:
+                resultado = motor.generar(trabajo)
+                if resultado["exito"] and cache_resultados:
+                    cache_resultados.almacenar(trabajo, resultado["salida"])
+            registro = {
+                "linea": trabajo["linea"],
+                "modo": trabajo["modo"],
+                "task": trabajo["task"],
+                "ckpt_dir": trabajo["ckpt_dir"],
+                "prompt": trabajo["prompt"],
+                **resultado,
+            }
+            salida_resultados.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            salida_resultados.flush()
+
+            if resultado["exito"]:
+                exitosos += 1
+                print(f"✓ {resultado['salida']} (semilla {resultado['semilla']}, "
+                      f"carga {resultado['tiempo_carga']:.1f} s, generación {resultado['tiempo_trabajo']:.1f} s)")
+
+    motor.liberar()
+    print(f"\n✓ Lote completado: {exitosos}/{len(trabajos) + len(errores)} trabajos exitosos")
+    return exitosos == len(trabajos) + len(errores)
+
+
+def generar_variaciones_cli(args, dir_cache):
+    """
+    Ejecuta --semillas / --num_variaciones con variaciones_semilla.py.
+
+    Args:
+        args: Argumentos de main()
+        dir_cache: Directorio raíz de las cachés (None = sin caché)
+
+    Returns:
+        True si todas las variaciones se generaron
+    """
+    from variaciones_semilla import generar_semillas, generar_variaciones, parsear_semillas
+
+    try:
+        if args.semillas:
+            semillas = parsear_semillas(args.semillas)
+        else:
+            semillas = generar_semillas(args.num_variaciones, args.semilla)
+        entrada = {
+            "modo": args.modo,
+            "prompt": args.prompt,
+            "salida": args.salida,
+            "ckpt_dir": args.ckpt_dir,
+            "resolucion": args.resolucion,
+            "imagen_referencia": args.imagen_referencia,
+            "frame_num": args.frame_num,
+            "offload_model": args.offload_model,
+            "t5_cpu": args.t5_cpu,
+            "sample_steps": args.sample_steps,
+            "sample_solver": args.sample_solver,
+        }
+        # Como en generar_video_t2v, la escala de guía solo se pasa al 1.3B
+        # (el 14B usa la de generate.py)
+        if determinar_tarea(args.modo, args.ckpt_dir, args.resolucion)[0] == "t2v-1.3B":
+            entrada["sample_guide_scale"] = args.sample_guide_scale
+        trabajo = preparar_trabajo_lote(entrada, sin_optimizaciones=True)
+    except ValueError as e:
+        print(f"✗ Error: {e}")
+        return False
+
+    repo_path = encontrar_repositorio_wan()
+    if repo_path is None:
+        print("✗ Error: Repositorio Wan2.1 no encontrado.")
+        return False
+
+    print(f"\nGenerando {len(semillas)} variaciones ({trabajo['task']}): {', '.join(map(str, semillas))}")
+    resultados = generar_variaciones(trabajo, semillas, repo_path, dir_cache, args.semillas_por_lote)
+    return all(r["exito"] for r in resultados)
+
+
+def aplicar_plan_memoria(args):
+    """
+    Ajusta offload_model, t5_cpu, resolución y frames con el planificador de memoria.
+
+    Se elige la configuración más rápida que cabe en la GPU con más memoria
+    libre. Si no se detecta ninguna GPU, se mantiene la regla fija de
+    activar las optimizaciones para los modelos 14B.
+
+    Args:
+        args: Argumentos de main() (se modifican en el sitio)
+    """
+    task, size = determinar_tarea(args.modo, args.ckpt_dir, args.resolucion)
+    memoria_libre_gb = memoria_libre_gpu()
+
+    if memoria_libre_gb is None:
+        if "14B" in task:
+            print("ℹ Activando optimizaciones de memoria automáticamente para el modelo 14B")
+            print("  (usa --sin_optimizaciones si tu GPU tiene suficiente memoria)")
+            args.offload_model = True
+            args.t5_cpu = True
+        return
+
+    frame_num = args.frame_num or 81
+    plan = planificar(task, size, frame_num, memoria_libre_gb, sample_steps=args.sample_steps)
+    imprimir_plan(plan, memoria_libre_gb)
+
+    args.offload_model = plan["offload_model"]
+    args.t5_cpu = plan["t5_cpu"]
+    if plan["frame_num"] != frame_num:
+        args.frame_num = plan["frame_num"]
+        print(f"⚠ Se generarán {args.frame_num} frames para que el trabajo quepa en memoria")
+    if plan["size"] != size:
+        args.resolucion = plan["size"].replace("*", "x")
+        print(f"⚠ Se usará la resolución {args.resolucion} para que el trabajo quepa en memoria")
+    print("  (usa --sin_optimizaciones, --offload_model o --t5_cpu para fijarlo a mano)")
+
+
+def preparar_borrador(args):
+    """
+    Cambia los argumentos de main() por los ajustes rápidos del borrador.
+
+    Los ajustes del render final (los indicados en la línea de comandos) se
+    devuelven para guardarlos en el manifiesto. La semilla se fija aquí para
+    que el render final use la misma.
+
+    Args:
+        args: Argumentos de main() (se modifican en el sitio)
+
+    Returns:
+        Diccionario con los ajustes del render final
+    """
+    final = {
+        "salida": str(Path(args.salida).resolve()),
+        "ckpt_dir": args.ckpt_dir,
+        "resolucion": args.resolucion,
+        "frame_num": args.frame_num,
+        "sample_steps": args.sample_steps,
+        "sample_solver": args.sample_solver,
+    }
+    if args.modo == "t2v":
+        final["sample_guide_scale"] = args.sample_guide_scale
+
+    args.semilla = elegir_semilla(args.semilla)
+    for clave, valor in ajustes_borrador(args.modo, args.ckpt_dir).items():
+        setattr(args, clave, valor)
+    salida = Path(final["salida"])
+    args.salida = str(salida.with_name(f"{salida.stem}_borrador_480p.mp4"))
+
+    print(f"ℹ Borrador: {args.ckpt_dir}, {args.sample_steps} pasos ({args.sample_solver}), "
+          f"{args.frame_num} frames, semilla {args.semilla}")
+    return final
+
+
+def terminar_borrador(args, final):
+    """
+    Reduce el borrador a una vista previa y escribe su manifiesto.
+
+    Args:
+        args: Argumentos de main() con los ajustes del borrador
+        final: Ajustes del render final devueltos por preparar_borrador()
+    """
+    vista_previa = ruta_vista_previa(final["salida"])
+    crear_vista_previa(args.salida, vista_previa)
+    borrador = {
+        "vista_previa": str(vista_previa),
+        "ckpt_dir": args.ckpt_dir,
+        "resolucion": args.resolucion,
+        "frame_num": args.frame_num,
+        "sample_steps": args.sample_steps,
+        "sample_solver": args.sample_solver,
+    }
+    manifiesto = ruta_manifiesto(final["salida"])
+    escribir_manifiesto(manifiesto, args.modo, args.prompt, args.semilla, final, borrador,
+                        args.imagen_referencia if args.modo == "i2v" else None)
+
+    print("\n✓ Borrador completado")
+    print(f"  Vista previa: {vista_previa}")
+    print(f"  Manifiesto: {manifiesto}")
+    print(f"  Render final: python generar_video.py --finalizar {manifiesto}")
+
+
+def aplicar_manifiesto(args, manifiesto):
+    """
+    Copia en los argumentos de main() el trabajo final de un manifiesto de borrador.
+
+    Las opciones de hardware (--offload_model, --t5_cpu, --gpus, --servidor)
+    se toman de la línea de comandos actual.
+
+    Args:
+        args: Argumentos de main() (se modifican en el sitio)
+        manifiesto: Diccionario leído con borradores.leer_manifiesto()
+    """
+    final = manifiesto["final"]
+    args.modo = manifiesto["modo"]
+    args.prompt = manifiesto["prompt"]
+    args.semilla = manifiesto["semilla"]
+    args.imagen_referencia = manifiesto.get("imagen_referencia")
+    for clave in ("salida", "ckpt_dir", "resolucion", "frame_num", "sample_steps",
+                  "sample_solver", "sample_guide_scale"):
+        if clave in final:
+            setattr(args, clave, final[clave])
+
+    print(f"ℹ Render final del borrador ({args.modo.upper()}, semilla {args.semilla}): {args.prompt[:60]}")
+
+
 def main():
     """Función principal del script."""
     parser = argparse.ArgumentParser(
@@ -358,12 +873,39 @@ Ejemplos de uso:
 
   # Con opciones de optimización de memoria
   python generar_video.py --modo t2v --prompt "Video" --salida video.mp4 --offload_model --t5_cpu
+
+  # Generar un lote de trabajos (t2v, i2v y vace) cargando cada modelo una sola vez
+  python generar_video.py --lote trabajos.jsonl --resultados_lote resultados/lote.jsonl
+
+  # Borrador rápido (1.3B, pocos pasos) con vista previa y manifiesto; luego el render final
+  python generar_video.py --modo t2v --prompt "Video" --salida video.mp4 --borrador
+  python generar_video.py --finalizar video_borrador.json
+
+  # Saltar pasos de denoising casi idénticos reutilizando el residuo del DiT
+  python generar_video.py --modo t2v --prompt "Video" --salida video.mp4 --cache_pasos 0.1
+
+  # Perfilar la generación (traza Chrome/Perfetto y resumen junto a la salida)
+  python generar_video.py --modo t2v --prompt "Video" --salida video.mp4 --perfil
+
+  # Generar 41 frames e interpolar a 81 con flujo óptico, comparando con el render nativo
+  python generar_video.py --modo t2v --prompt "Video" --salida video.mp4 --interpolar 2 --comparar_nativo --semilla 42
+
+  # Probar 8 semillas del mismo prompt (video_seed<N>.mp4) cargando el modelo una vez
+  python generar_video.py --modo t2v --prompt "Video" --salida video.mp4 --num_variaciones 8 --semilla 100
+
+  # Repartir un clip 720p del modelo 14B entre 4 GPUs
+  python generar_video.py --modo t2v --prompt "Video" --salida video.mp4 \
+      --ckpt_dir /app/models/Wan2.1-T2V-14B --resolucion 1280x720 --gpus 4 --paralelismo ulysses
+
+  # Usando un servidor de generación con el modelo ya cargado
+  python servidor_generacion.py --task t2v-1.3B --ckpt_dir /app/models/Wan2.1-T2V-1.3B &
+  python generar_video.py --modo t2v --prompt "Video" --salida video.mp4 --servidor /tmp/wan_generacion.sock
         """
     )
     
-    parser.add_argument("--modo", type=str, choices=["t2v", "i2v"], required=True,
+    parser.add_argument("--modo", type=str, choices=["t2v", "i2v"], default=None,
                        help="Modo de generación: 't2v' (texto a video) o 'i2v' (imagen a video)")
-    parser.add_argument("--prompt", type=str, required=True,
+    parser.add_argument("--prompt", type=str, default=None,
                        help="Descripción textual del video deseado")
     parser.add_argument("--imagen_referencia", type=str, default=None,
                        help="Ruta a imagen de referencia (requerido para modo I2V)")
@@ -372,25 +914,114 @@ Ejemplos de uso:
     parser.add_argument("--ckpt_dir", type=str, default=None,
                        help="Directorio donde están los checkpoints del modelo. Para I2V se requiere el modelo 14B.")
     parser.add_argument("--resolucion", type=str, default="832x480",
-                       choices=["832x480", "1280x720"],
+                       choices=RESOLUCIONES,
                        help="Resolución del video generado")
     parser.add_argument("--offload_model", action="store_true",
                        help="Usar offloading de modelo para reducir uso de memoria GPU (recomendado para modelo 14B)")
     parser.add_argument("--t5_cpu", action="store_true",
                        help="Ejecutar encoder T5 en CPU en lugar de GPU (recomendado para modelo 14B)")
+    parser.add_argument("--cache_pasos", type=float, default=None, metavar="UMBRAL",
+                       help="Reutilizar el residuo del DiT en los pasos de denoising cuya entrada apenas cambia "
+                            "(ej: 0.1; más alto = más rápido y menos fiel). Ver cache_pasos.py")
     parser.add_argument("--sin_optimizaciones", action="store_true",
-                       help="Desactivar optimizaciones automáticas de memoria (solo para GPUs muy grandes)")
+                       help="Desactivar el planificador de memoria: no se activan --offload_model ni --t5_cpu "
+                            "ni se reducen resolución o frames automáticamente")
     parser.add_argument("--sample_guide_scale", type=float, default=7.5,
                        help="Escala de guía para el sampling (solo para modelo 1.3B)")
+    parser.add_argument("--sample_steps", type=int, default=None,
+                       help="Pasos de muestreo (default: los de generate.py, 50 en T2V y 40 en I2V)")
+    parser.add_argument("--sample_solver", type=str, default=None, choices=["unipc", "dpm++"],
+                       help="Solver de muestreo (default: unipc)")
     parser.add_argument("--frame_num", type=int, default=None,
                        help="Número de frames a generar (default: 81. NOTA: I2V requiere 81 frames, usar otro número puede causar errores)")
+    parser.add_argument("--perfil", action="store_true",
+                       help="Perfilar la generación con torch.profiler y cProfile: escribe "
+                            "<salida>_perfil_traza.json (Chrome/Perfetto) y <salida>_perfil.txt (top-N)")
+    parser.add_argument("--interpolar", type=int, default=None, metavar="FACTOR",
+                       help="Generar (frame_num - 1) / FACTOR + 1 frames e interpolar el resto en CPU con "
+                            "flujo óptico (ej: 2 = 41 frames generados para 81). Solo T2V")
+    parser.add_argument("--comparar_nativo", action="store_true",
+                       help="Con --interpolar, generar también el video nativo con la misma semilla "
+                            "y escribir un informe de calidad y tiempo")
+    parser.add_argument("--semilla", type=int, default=None,
+                       help="Semilla de generación (default: aleatoria). Con semilla fija, un trabajo "
+                            "idéntico ya generado se recupera de la caché de resultados")
+    parser.add_argument("--semillas", type=str, default=None,
+                       help="Generar una variación por semilla (ej: 1,2,3 o 10-14) en un solo proceso. "
+                            "Las salidas se escriben en <salida>_seed<N>.mp4")
+    parser.add_argument("--num_variaciones", type=int, default=None,
+                       help="Generar K variaciones con semillas consecutivas desde --semilla (o aleatorias)")
+    parser.add_argument("--semillas_por_lote", type=int, default=None,
+                       help="Semillas que comparten cada forward del DiT en T2V (default: según la memoria libre)")
+    parser.add_argument("--borrador", action="store_true",
+                       help="Generar un borrador rápido (modelo 1.3B en T2V, menos pasos y frames, solver dpm++) "
+                            "con una vista previa <salida>_borrador.mp4 y un manifiesto <salida>_borrador.json")
+    parser.add_argument("--finalizar", type=str, default=None,
+                       help="Manifiesto de un borrador: genera el video final a calidad completa con la misma semilla")
+    parser.add_argument("--servidor", type=str, default=os.environ.get("WAN_SERVIDOR_SOCKET"),
+                       help="Socket de un servidor de generación (servidor_generacion.py) con el modelo ya cargado. "
+                            "Si no responde, se lanza generate.py como siempre")
+    parser.add_argument("--gpus", type=int, default=1,
+                       help="Repartir un mismo clip entre N GPUs (torchrun + FSDP). "
+                            "Si la configuración no es válida se usa una sola GPU")
+    parser.add_argument("--paralelismo", type=str, default="ulysses", choices=PARALELISMOS,
+                       help="Paralelismo de secuencia con --gpus > 1: 'ulysses' (reparte cabezas de atención) "
+                            "o 'ring' (reparte la secuencia)")
+    parser.add_argument("--lote", type=str, default=None,
+                       help="Archivo JSONL con un trabajo por línea (t2v, i2v o vace). "
+                            "Los trabajos se agrupan por checkpoint y cada modelo se carga una sola vez")
+    parser.add_argument("--resultados_lote", type=str, default=None,
+                       help="Archivo JSONL donde escribir un resultado por trabajo del lote "
+                            "(default: <lote>_resultados.jsonl)")
+    parser.add_argument("--dir_cache", type=str, default=None,
+                       help="Directorio de las cachés de condicionamiento (default: WAN_CACHE_DIR, "
+                            "/app/.cache/wan_video o ~/.cache/wan_video)")
+    parser.add_argument("--sin_cache", action="store_true",
+                       help="No usar las cachés (embeddings de texto e imagen y videos ya generados)")
     
     args = parser.parse_args()
     
+    if args.borrador and (args.lote or args.finalizar or args.semillas or args.num_variaciones):
+        parser.error("--borrador no se puede combinar con --lote, --finalizar, --semillas ni --num_variaciones")
+
+    # Las variaciones se muestrean con variaciones_semilla.py, que no aplica
+    # la caché de pasos ni la interpolación
+    if (args.semillas or args.num_variaciones) and (args.cache_pasos is not None or args.interpolar):
+        parser.error("--cache_pasos e --interpolar no se pueden combinar con --semillas ni --num_variaciones")
+
+    # Con varias GPUs Wan sustituye forward en cada instancia del modelo
+    # (usp_dit_forward) y la caché de pasos, que parchea la clase, no actuaría
+    if args.cache_pasos is not None and args.gpus > 1:
+        parser.error("--cache_pasos no se puede combinar con --gpus > 1")
+
+    if args.finalizar:
+        if args.lote:
+            parser.error("--finalizar no se puede combinar con --lote")
+        try:
+            aplicar_manifiesto(args, leer_manifiesto(args.finalizar))
+        except ValueError as e:
+            print(f"✗ Error: {e}")
+            sys.exit(1)
+    
+    if not args.lote and (not args.modo or not args.prompt):
+        parser.error("--modo y --prompt son requeridos (salvo con --lote o --finalizar)")
+    
     # Verificar entorno
     if not verificar_entorno():
         sys.exit(1)
     
+    dir_cache = None
+    if not args.sin_cache:
+        dir_cache = args.dir_cache or str(directorio_cache_por_defecto())
+    
+    # Modo lote: todos los trabajos en este proceso
+    if args.lote:
+        if args.perfil:
+            print("⚠ --perfil no se aplica al modo lote (los trabajos se ejecutan en este proceso)")
+        exito = generar_lote(args.lote, args.resultados_lote, args.offload_model,
+                             args.t5_cpu, args.sin_optimizaciones, dir_cache, args.cache_pasos)
+        sys.exit(0 if exito else 1)
+    
     # Crear directorio de salida si no existe
     salida_path = Path(args.salida)
     salida_path.parent.mkdir(parents=True, exist_ok=True)
@@ -411,41 +1042,91 @@ Ejemplos de uso:
                 args.ckpt_dir = "/app/models/Wan2.1-I2V-14B-480P"
             print(f"ℹ Usando checkpoint de I2V por defecto: {args.ckpt_dir}")
             print("  (I2V requiere un checkpoint específico, diferente de T2V)")
-            # El modelo 14B es muy grande, usar optimizaciones de memoria por defecto
-            if not args.sin_optimizaciones and not args.offload_model and not args.t5_cpu:
-                print("ℹ Activando optimizaciones de memoria automáticamente para el modelo 14B")
-                print("  (usa --sin_optimizaciones si tu GPU tiene suficiente memoria)")
-                args.offload_model = True
-                args.t5_cpu = True
         else:
             # T2V puede usar 1.3B o 14B
             args.ckpt_dir = "/app/models/Wan2.1-T2V-1.3B"
             print("ℹ Usando modelo 1.3B por defecto para T2V")
     
+    # Borrador: se guardan los ajustes finales y se generan los rápidos
+    final = preparar_borrador(args) if args.borrador else None
+    
+    # Elegir optimizaciones de memoria según la GPU (salvo que se fijen a mano).
+    # Con varias GPUs el modelo se reparte con FSDP y no se planifica
+    if not args.sin_optimizaciones and not args.offload_model and not args.t5_cpu and args.gpus <= 1:
+        aplicar_plan_memoria(args)
+    
+    # Barrido de semillas: todas las variaciones en este proceso
+    if args.semillas or args.num_variaciones:
+        if args.perfil:
+            print("⚠ --perfil no se aplica al barrido de semillas")
+        exito = generar_variaciones_cli(args, dir_cache)
+        sys.exit(0 if exito else 1)
+    
     # Generar video según el modo
-    if args.modo == "t2v":
-        exito = generar_video_t2v(
-            args.prompt,
-            args.salida,
-            args.ckpt_dir,
-            args.resolucion,
-            args.offload_model,
-            args.t5_cpu,
-            args.sample_guide_scale
-        )
-    else:  # i2v
-        exito = generar_video_i2v(
+    def generar(salida, frame_num):
+        if args.modo == "t2v":
+            return generar_video_t2v(
+                args.prompt,
+                salida,
+                args.ckpt_dir,
+                args.resolucion,
+                args.offload_model,
+                args.t5_cpu,
+                args.sample_guide_scale,
+                servidor=args.servidor,
+                dir_cache=dir_cache,
+                gpus=args.gpus,
+                paralelismo=args.paralelismo,
+                frame_num=frame_num,
+                semilla=args.semilla,
+                sample_steps=args.sample_steps,
+                sample_solver=args.sample_solver,
+                cache_pasos=args.cache_pasos,
+                perfil=args.perfil
+            )
+        return generar_video_i2v(
             args.imagen_referencia,
             args.prompt,
-            args.salida,
+            salida,
             args.ckpt_dir,
             args.resolucion,
             args.offload_model,
             args.t5_cpu,
-            args.frame_num
+            frame_num,
+            servidor=args.servidor,
+            dir_cache=dir_cache,
+            gpus=args.gpus,
+            paralelismo=args.paralelismo,
+            semilla=args.semilla,
+            sample_steps=args.sample_steps,
+            sample_solver=args.sample_solver,
+            cache_pasos=args.cache_pasos,
+            perfil=args.perfil
         )
     
-    if exito:
+    if args.interpolar and args.modo == "i2v":
+        # La máscara de I2V de Wan2.1 está fijada a 81 frames
+        print("⚠ --interpolar no está disponible en I2V (Wan2.1 fija 81 frames); se genera el video completo")
+        args.interpolar = None
+    
+    if args.interpolar:
+        from interpolacion_temporal import generar_interpolado
+        if args.comparar_nativo:
+            # El video reducido y el nativo deben salir de la misma semilla
+            args.semilla = elegir_semilla(args.semilla)
+            print(f"ℹ Semilla de la comparación: {args.semilla}")
+        try:
+            exito = generar_interpolado(generar, args.salida, args.frame_num or 81, args.interpolar,
+                                        comparar_nativo=args.comparar_nativo)
+        except ValueError as e:
+            print(f"✗ Error: {e}")
+            sys.exit(1)
+    else:
+        exito = generar(args.salida, args.frame_num)
+    
+    if exito and final:
+        terminar_borrador(args, final)
+    elif exito:
         print("\n✓ Proceso completado")
         print(f"  Video guardado en: {args.salida}")
     else:
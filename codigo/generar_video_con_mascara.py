@@ -16,30 +16,43 @@ Uso:
         --prompt "Editar fondo manteniendo producto" \\
         --salida video_editado.mp4
 
+Con --seguimiento {dis,farneback,plantilla} la máscara de imagen se toma
+como la del primer frame y se propaga a todo el video base, de modo que
+cubre el producto aunque se mueva (ver seguimiento_mascara.py).
+
 Autor: Práctica académica - Generación de Video con Wan 2.1
 """
 
 import argparse
+import importlib.util
 import os
 import sys
 from pathlib import Path
-import numpy as np
-from PIL import Image
-import cv2
-import subprocess
-import time
+
+from cache_disco import directorio_cache_por_defecto
+from cache_mascaras import CacheMascaras
+from cache_resultados import abrir_cache_resultados
+from ejecucion_wan import ejecutar_generate
+from fuente_frames import FuenteFrames
+from lanzador_generate import construir_prefijo
+from lanzamiento_distribuido import PARALELISMOS, preparar_lanzamiento
+from mascara_video import es_imagen
+from seguimiento_mascara import METODOS_SEGUIMIENTO
+from seleccionar_gpu import obtener_info_gpus
+from servidor_generacion import generar_en_servidor
+from sonda_video import sondear_video
 
 
 def verificar_entorno():
     """Verifica que el entorno esté correctamente configurado."""
     errores = []
     
-    try:
-        import torch
-        if not torch.cuda.is_available():
-            print("⚠ Advertencia: CUDA no disponible. La generación será muy lenta en CPU.")
-    except ImportError:
+    # Sin importar torch: tarda segundos y la GPU se consulta con nvidia-smi
+    # para no crear un contexto CUDA en este proceso (lo usa solo el hijo)
+    if importlib.util.find_spec("torch") is None:
         errores.append("PyTorch no está instalado")
+    elif not obtener_info_gpus():
+        print("⚠ Advertencia: CUDA no disponible. La generación será muy lenta en CPU.")
     
     # Check multiple possible paths for Wan2.1
     possible_paths = [
@@ -75,6 +88,9 @@ def cargar_mascara(ruta_mascara):
     Returns:
         Máscara procesada como array numpy
     """
+    import numpy as np
+    from PIL import Image
+    
     if not Path(ruta_mascara).exists():
         print(f"✗ Error: Máscara no encontrada: {ruta_mascara}")
         return None
@@ -93,128 +109,64 @@ def cargar_mascara(ruta_mascara):
         return None
 
 
-def convertir_mascara_imagen_a_video(ruta_mascara_imagen, ruta_video_base):
+def convertir_mascara_imagen_a_video(ruta_mascara_imagen, ruta_video_base, cache=None):
     """
     Convierte una máscara de imagen estática a un video de máscara
     con las mismas dimensiones y duración que el video base.
     
+    La pila de frames se construye en memoria a partir de un solo frame
+    (mascara_video.pila_mascara) y se escribe sin pérdidas, de modo que
+    el video conserva exactamente los valores de la máscara. El video se
+    guarda en la caché de máscaras (cache_mascaras.py): la misma máscara
+    con un video base de la misma geometría se convierte una sola vez.
+    
     Args:
         ruta_mascara_imagen: Ruta a la imagen de máscara
         ruta_video_base: Ruta al video base
+        cache: CacheMascaras a usar (None = la del directorio por defecto)
     
     Returns:
-        Ruta al video de máscara creado, o None si hay error
+        Ruta al video de máscara (dentro de la caché), o None si hay error
     """
     try:
-        # Cargar video base para obtener dimensiones y duración
-        cap = cv2.VideoCapture(str(ruta_video_base))
-        if not cap.isOpened():
-            print(f"✗ Error: No se pudo abrir el video base: {ruta_video_base}")
+        # Dimensiones y duración del video base (de los metadatos, sin decodificarlo)
+        try:
+            info_base = sondear_video(ruta_video_base)
+        except (OSError, ValueError) as e:
+            print(f"✗ Error: No se pudo abrir el video base: {e}")
             return None
         
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        
-        # Contar frames reales leyendo el video
-        frame_count = 0
-        while True:
-            ret, _ = cap.read()
-            if not ret:
-                break
-            frame_count += 1
-        
-        cap.release()
-        
-        if frame_count == 0:
+        if info_base["frames"] == 0:
             print(f"✗ Error: El video base no tiene frames: {ruta_video_base}")
             return None
         
-        print(f"  Video base: {width}x{height}, {fps} fps, {frame_count} frames")
-        
-        # Cargar máscara de imagen
-        mascara_img = cv2.imread(str(ruta_mascara_imagen), cv2.IMREAD_GRAYSCALE)
-        if mascara_img is None:
-            print(f"✗ Error: No se pudo cargar la máscara: {ruta_mascara_imagen}")
-            return None
-        
-        print(f"  Máscara original: {mascara_img.shape[1]}x{mascara_img.shape[0]}")
-        
-        # Redimensionar máscara al tamaño del video
-        mascara_resized = cv2.resize(mascara_img, (width, height), interpolation=cv2.INTER_LINEAR)
+        print(f"  Video base: {info_base['ancho']}x{info_base['alto']}, "
+              f"{info_base['fps']} fps, {info_base['frames']} frames")
         
-        # Crear nombre único para el video de máscara
-        mascara_video_path = Path(ruta_mascara_imagen).with_suffix('.mp4')
-        # Si ya existe, agregar timestamp
-        if mascara_video_path.exists():
-            timestamp = int(time.time())
-            mascara_video_path = Path(ruta_mascara_imagen).parent / f"{Path(ruta_mascara_imagen).stem}_mask_{timestamp}.mp4"
-        
-        # Guardar máscara redimensionada temporalmente
-        temp_mascara_path = Path(ruta_mascara_imagen).parent / f"temp_mask_{int(time.time())}.png"
-        cv2.imwrite(str(temp_mascara_path), mascara_resized)
-        
-        # Calcular duración del video
-        duration = frame_count / fps if fps > 0 else frame_count / 16.0
-        
-        # Usar ffmpeg para crear el video de máscara
-        print(f"  Usando ffmpeg para crear video de máscara...")
-        
-        ffmpeg_cmd = [
-            'ffmpeg',
-            '-y',  # Sobrescribir si existe
-            '-loop', '1',  # Loop la imagen
-            '-i', str(temp_mascara_path),  # Imagen de entrada
-            '-t', str(duration),  # Duración
-            '-vf', f'scale={width}:{height},fps={fps}',  # Escalar y establecer fps
-            '-pix_fmt', 'yuv420p',  # Formato de píxel compatible
-            '-c:v', 'libx264',  # Codec H.264
-            '-preset', 'fast',  # Preset rápido
-            '-crf', '23',  # Calidad
-            str(mascara_video_path)
-        ]
-        
-        result = subprocess.run(
-            ffmpeg_cmd,
-            capture_output=True,
-            text=True
-        )
-        
-        # Limpiar archivo temporal
-        if temp_mascara_path.exists():
-            temp_mascara_path.unlink()
-        
-        if result.returncode != 0:
-            print(f"✗ Error al ejecutar ffmpeg: {result.stderr}")
-            if mascara_video_path.exists():
-                mascara_video_path.unlink()
-            return None
-        
-        # Verificar que el archivo se creó correctamente
-        if not mascara_video_path.exists():
-            print(f"✗ Error: El archivo de video no se creó")
+        if cache is None:
+            cache = CacheMascaras()
+        try:
+            mascara_video_path, en_cache = cache.video_mascara(ruta_mascara_imagen, info_base)
+        except ValueError as e:
+            print(f"✗ Error: {e}")
             return None
         
-        file_size = mascara_video_path.stat().st_size
-        if file_size == 0:
-            print(f"✗ Error: El archivo de video está vacío (0 bytes)")
-            mascara_video_path.unlink()
-            return None
+        if en_cache:
+            print(f"  ✓ Video de máscara recuperado de la caché: {mascara_video_path}")
+            return mascara_video_path
         
         # Verificar que el video se puede leer
-        test_cap = cv2.VideoCapture(str(mascara_video_path))
-        if not test_cap.isOpened():
+        try:
+            test_frame_count = sondear_video(mascara_video_path)["frames"]
+        except ValueError:
             print(f"✗ Error: El archivo de video no se puede leer")
-            test_cap.release()
             return None
         
-        test_frame_count = int(test_cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        test_cap.release()
-        
         if test_frame_count == 0:
             print(f"✗ Error: El video no tiene frames")
             return None
         
+        file_size = mascara_video_path.stat().st_size
         print(f"  ✓ Video de máscara creado exitosamente: {mascara_video_path}")
         print(f"    Tamaño: {file_size / 1024:.2f} KB, Frames: {test_frame_count}")
         
@@ -224,52 +176,72 @@ def convertir_mascara_imagen_a_video(ruta_mascara_imagen, ruta_video_base):
         import traceback
         print(f"✗ Error al convertir máscara a video: {e}")
         print(f"  Detalles: {traceback.format_exc()}")
-        # Limpiar archivos temporales si existen
-        try:
-            temp_files = list(Path(ruta_mascara_imagen).parent.glob("temp_mask_*.png"))
-            for temp_file in temp_files:
-                temp_file.unlink()
-        except:
-            pass
         return None
 
 
-def procesar_video_base(ruta_video):
+def crear_mascara_seguida(ruta_mascara_imagen, ruta_video_base, metodo="dis", cache=None):
+    """
+    Crea un video de máscara que sigue al producto a lo largo del video base.
+    
+    La máscara de imagen se toma como la del primer frame y se propaga a
+    todos los frames con flujo óptico o búsqueda de plantilla
+    (seguimiento_mascara.py). El video se guarda en la caché de máscaras,
+    indexado por el contenido de la máscara y del video base.
+    
+    Args:
+        ruta_mascara_imagen: Ruta a la imagen de máscara del primer frame
+        ruta_video_base: Ruta al video base
+        metodo: 'dis', 'farneback' o 'plantilla'
+        cache: CacheMascaras a usar (None = la del directorio por defecto)
+    
+    Returns:
+        Ruta al video de máscara (dentro de la caché), o None si hay error
+    """
+    if cache is None:
+        cache = CacheMascaras()
+    try:
+        mascara_video_path, en_cache = cache.video_seguido(ruta_mascara_imagen, ruta_video_base, metodo)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"✗ Error al seguir la máscara: {e}")
+        return None
+    
+    if en_cache:
+        print(f"  ✓ Máscara seguida recuperada de la caché: {mascara_video_path}")
+    else:
+        print(f"  ✓ Video de máscara seguida creado: {mascara_video_path}")
+    return mascara_video_path
+
+
+def procesar_video_base(ruta_video, ajustar_wan=False):
     """
     Procesa el video base para extraer frames y metadatos.
     
+    Los frames no se cargan en memoria: se devuelve una FuenteFrames que
+    los decodifica al recorrerla (ver fuente_frames.py), así que la memoria
+    no crece con la duración del video.
+    
     Args:
         ruta_video: Ruta al video base
+        ajustar_wan: Si True, los frames se entregan ya ajustados a la
+            entrada del modelo (832x480 o 480x832, 16 fps, 81 frames)
     
     Returns:
-        Tupla con (frames, fps, dimensiones)
+        Tupla con (frames, fps, dimensiones); frames es una FuenteFrames
+        iterable con len()
     """
     if not Path(ruta_video).exists():
         print(f"✗ Error: Video base no encontrado: {ruta_video}")
         return None, None, None
     
     try:
-        cap = cv2.VideoCapture(str(ruta_video))
-        
-        if not cap.isOpened():
-            print(f"✗ Error: No se pudo abrir el video: {ruta_video}")
-            return None, None, None
-        
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        
-        frames = []
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            frames.append(frame)
-        
-        cap.release()
+        if ajustar_wan:
+            frames = FuenteFrames.para_wan(ruta_video)
+        else:
+            frames = FuenteFrames(ruta_video)
+        width, height = frames.tamano
         
-        print(f"✓ Video cargado: {len(frames)} frames, {width}x{height}, {fps} fps")
-        return frames, fps, (width, height)
+        print(f"✓ Video abierto: {len(frames)} frames, {width}x{height}, {frames.fps} fps")
+        return frames, frames.fps, (width, height)
         
     except Exception as e:
         print(f"✗ Error al procesar video: {e}")
@@ -277,7 +249,9 @@ def procesar_video_base(ruta_video):
 
 
 def generar_video_mv2v(video_base, mascara, prompt, salida, ckpt_dir, 
-                       resolucion="832x480", offload_model=False, t5_cpu=False):
+                       resolucion="832x480", offload_model=False, t5_cpu=False,
+                       servidor=None, dir_cache=None, gpus=1, paralelismo="ulysses",
+                       semilla=None, frame_num=81, perfil=False, seguimiento=None):
     """
     Genera un video editado usando máscaras (VACE - Video-Aware Content Editing).
     
@@ -290,6 +264,19 @@ def generar_video_mv2v(video_base, mascara, prompt, salida, ckpt_dir,
         resolucion: Resolución del video
         offload_model: Si True, usa offloading para reducir memoria GPU
         t5_cpu: Si True, ejecuta T5 en CPU
+        servidor: Socket de un servidor de generación (servidor_generacion.py).
+            Si está disponible, el trabajo se envía allí en lugar de lanzar generate.py
+        dir_cache: Directorio raíz de las cachés de condicionamiento y de resultados (None = sin caché)
+        gpus: Número de GPUs entre las que repartir el clip (torchrun + FSDP)
+        paralelismo: Paralelismo de secuencia con varias GPUs: 'ulysses' o 'ring'
+        semilla: Semilla de generación (None = aleatoria). Con semilla fija y
+            caché activa, un trabajo idéntico ya generado se sirve desde la caché
+        frame_num: Número de frames a generar (VACE usa 81 por defecto)
+        perfil: Si True, perfila la generación con torch.profiler y cProfile
+            y deja la traza y el resumen junto a la salida (ver perfil.py)
+        seguimiento: Si se indica ('dis', 'farneback' o 'plantilla') y la
+            máscara es una imagen, se toma como la del primer frame y se
+            propaga a todo el video base antes de generar
     """
     print(f"\nGenerando video VACE (Video-Aware Content Editing)...")
     print(f"  Prompt de edición: {prompt}")
@@ -330,16 +317,16 @@ def generar_video_mv2v(video_base, mascara, prompt, salida, ckpt_dir,
         print(f"✗ Error: Máscara no encontrada: {mascara}")
         return False
     
-    # Si la máscara es una imagen, convertirla a video de máscara
-    # VACE requiere un video de máscara, no una imagen estática
-    if mascara_path.suffix.lower() in ['.png', '.jpg', '.jpeg']:
-        print("ℹ Máscara es una imagen. Convirtiendo a video de máscara...")
-        mascara_video_path = convertir_mascara_imagen_a_video(mascara_path, video_path)
-        if mascara_video_path is None:
-            print("✗ Error: No se pudo convertir la máscara a video")
-            return False
-        mascara_path = mascara_video_path
-        print(f"✓ Máscara convertida a video: {mascara_path}")
+    # La máscara seguida sustituye a la imagen en todo lo que sigue
+    # (caché de resultados, servidor y generate.py)
+    if seguimiento:
+        if es_imagen(mascara_path):
+            print(f"ℹ Siguiendo la máscara a lo largo del video base ({seguimiento})...")
+            mascara_path = crear_mascara_seguida(mascara_path, video_path, seguimiento)
+            if mascara_path is None:
+                return False
+        else:
+            print("⚠ Advertencia: la máscara ya es un video; se ignora el seguimiento")
     
     # Determinar el modelo según el checkpoint
     ckpt_str = str(ckpt_dir)
@@ -360,22 +347,61 @@ def generar_video_mv2v(video_base, mascara, prompt, salida, ckpt_dir,
         print("    - Wan2.1-VACE-1.3B para modelo 1.3B")
         print("    - Wan2.1-VACE-14B para modelo 14B")
     
+    trabajo = {
+        "modo": "vace",
+        "task": task,
+        "size": size_default,
+        "ckpt_dir": str(ckpt_dir),
+        "prompt": prompt,
+        "video_base": str(video_path),
+        "mascara": str(mascara_path),
+        "salida": salida,
+        "frame_num": frame_num,
+        "offload_model": offload_model,
+        "t5_cpu": t5_cpu,
+        "semilla": semilla,
+    }
+    
+    # Un trabajo idéntico ya generado se sirve desde la caché de resultados
+    # (salvo con perfil, que necesita ejecutar la generación)
+    cache_resultados = abrir_cache_resultados(dir_cache, semilla)
+    if cache_resultados and not perfil and cache_resultados.recuperar(trabajo, salida):
+        return True
+    
+    # Usar el servidor de generación si hay uno disponible
+    if servidor and gpus <= 1 and not perfil:
+        exito = generar_en_servidor(servidor, trabajo)
+        if exito is not None:
+            if exito and cache_resultados:
+                cache_resultados.almacenar(trabajo, salida)
+            return exito
+    
     # Construir comando para generate.py
     generate_script = repo_path / "generate.py"
     if not generate_script.exists():
         print("✗ Error: generate.py no encontrado en el repositorio Wan2.1")
         return False
     
+    # generate.py necesita un video de máscara, no una imagen estática
+    # (el servidor, en cambio, recibe la imagen y la pasa como tensor)
+    if es_imagen(mascara_path):
+        print("ℹ Máscara es una imagen. Convirtiendo a video de máscara...")
+        mascara_video_path = convertir_mascara_imagen_a_video(mascara_path, video_path)
+        if mascara_video_path is None:
+            print("✗ Error: No se pudo convertir la máscara a video")
+            return False
+        mascara_path = mascara_video_path
+        print(f"✓ Máscara convertida a video: {mascara_path}")
+    
     comando = [
-        sys.executable,
-        str(generate_script),
+        *construir_prefijo(generate_script, dir_cache, perfil=salida if perfil else None),
         "--task", task,
         "--size", size_default,
         "--ckpt_dir", str(ckpt_dir),
         "--prompt", prompt,
         "--src_video", str(video_path.resolve()),
         "--src_mask", str(mascara_path.resolve()),
-        "--frame_num", "81",  # VACE usa 81 frames por defecto
+        "--frame_num", str(frame_num),  # VACE usa 81 frames por defecto
     ]
     
     if offload_model:
@@ -385,70 +411,15 @@ def generar_video_mv2v(video_base, mascara, prompt, salida, ckpt_dir,
     if t5_cpu:
         comando.append("--t5_cpu")
     
-    # Limpiar memoria GPU antes de ejecutar
-    print("\nLimpiando memoria GPU...")
-    try:
-        import torch
-        torch.cuda.empty_cache()
-        print("✓ Memoria GPU limpiada")
-    except:
-        pass
+    if semilla is not None:
+        comando.extend(["--base_seed", str(semilla)])
     
     # Ejecutar generación
-    print("\nEjecutando generación VACE (esto puede tomar varios minutos)...")
-    print(f"Comando: {' '.join(comando)}")
-    
-    import subprocess
-    import os
-    env = os.environ.copy()
-    env['PYTORCH_CUDA_ALLOC_CONF'] = 'expandable_segments:True'
-    resultado = subprocess.run(comando, cwd=str(repo_path), env=env)
-    
-    if resultado.returncode == 0:
-        print(f"\n✓ Video generado exitosamente")
-        print(f"  Nota: El video se guarda en el directorio del repositorio Wan2.1")
-        print(f"  Busca el archivo de salida y muévelo a: {salida}")
-        
-        # Intentar encontrar el archivo generado y copiarlo
-        # Los archivos generados suelen tener un patrón específico con timestamp
-        import glob
-        import shutil
-        import time
-        
-        # Buscar archivos mp4 generados recientemente (últimos 5 minutos)
-        output_pattern = repo_path / "*.mp4"
-        generated_files = glob.glob(str(output_pattern))
-        
-        if generated_files:
-            # Filtrar archivos modificados en los últimos 5 minutos
-            current_time = time.time()
-            recent_files = [
-                f for f in generated_files 
-                if current_time - os.path.getmtime(f) < 300  # 5 minutos
-            ]
-            
-            if recent_files:
-                # Ordenar por tiempo de modificación (más reciente primero)
-                recent_files.sort(key=os.path.getmtime, reverse=True)
-                latest_file = recent_files[0]
-                print(f"  Archivo generado encontrado: {latest_file}")
-                print(f"  Copiando a: {salida}")
-                
-                # Asegurar que el directorio de salida existe
-                Path(salida).parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy2(latest_file, salida)
-                print(f"✓ Video copiado a: {salida}")
-            else:
-                print("  ⚠ No se encontraron archivos generados recientemente")
-                print(f"  Busca manualmente en: {repo_path}")
-        else:
-            print(f"  ⚠ No se encontraron archivos MP4 en: {repo_path}")
-            print(f"  El video puede haberse guardado con otro nombre")
-        
-        return True
-    else:
-        print("\n✗ Error durante la generación")
-        return False
+    comando = preparar_lanzamiento(comando, task, size_default, frame_num, gpus, paralelismo)
+    exito = ejecutar_generate(comando, repo_path, salida)
+    if exito and cache_resultados:
+        cache_resultados.almacenar(trabajo, salida)
+    return exito
 
 
 def crear_mascara_ejemplo(imagen_producto, salida_mascara):
@@ -462,6 +433,9 @@ def crear_mascara_ejemplo(imagen_producto, salida_mascara):
         imagen_producto: Ruta a imagen del producto
         salida_mascara: Ruta donde guardar la máscara
     """
+    import cv2
+    import numpy as np
+    
     print(f"\nCreando máscara de ejemplo para: {imagen_producto}")
     
     try:
@@ -513,6 +487,10 @@ Ejemplos de uso:
       --prompt "Cambiar el fondo a una playa manteniendo el producto idéntico" \\
       --salida video_editado.mp4
 
+  # Perfilar la generación (traza Chrome/Perfetto y resumen junto a la salida)
+  python generar_video_con_mascara.py --video_base video_inicial.mp4 \
+      --mascara mascara_producto.png --prompt "Playa" --salida video_editado.mp4 --perfil
+
   # Crear máscara de ejemplo
   python generar_video_con_mascara.py \\
       --crear_mascara \\
@@ -541,6 +519,36 @@ de Wan2.1. Consulta la documentación oficial para detalles.
                        help="Usar offloading de modelo para reducir uso de memoria GPU")
     parser.add_argument("--t5_cpu", action="store_true",
                        help="Ejecutar encoder T5 en CPU en lugar de GPU (recomendado para modelo 14B)")
+    parser.add_argument("--semilla", type=int, default=None,
+                       help="Semilla de generación (default: aleatoria). Con semilla fija, un trabajo "
+                            "idéntico ya generado se recupera de la caché de resultados")
+    parser.add_argument("--perfil", action="store_true",
+                       help="Perfilar la generación con torch.profiler y cProfile: escribe "
+                            "<salida>_perfil_traza.json (Chrome/Perfetto) y <salida>_perfil.txt (top-N)")
+    parser.add_argument("--interpolar", type=int, default=None, metavar="FACTOR",
+                       help="Generar 80 / FACTOR + 1 frames (con el video base submuestreado) e interpolar "
+                            "hasta 81 en CPU con flujo óptico (ej: 2 = 41 frames generados)")
+    parser.add_argument("--comparar_nativo", action="store_true",
+                       help="Con --interpolar, generar también el video nativo de 81 frames y escribir "
+                            "un informe de calidad y tiempo")
+    parser.add_argument("--servidor", type=str, default=os.environ.get("WAN_SERVIDOR_SOCKET"),
+                       help="Socket de un servidor de generación (servidor_generacion.py) con el modelo ya cargado. "
+                            "Si no responde, se lanza generate.py como siempre")
+    parser.add_argument("--gpus", type=int, default=1,
+                       help="Repartir un mismo clip entre N GPUs (torchrun + FSDP). "
+                            "Si la configuración no es válida se usa una sola GPU")
+    parser.add_argument("--paralelismo", type=str, default="ulysses", choices=PARALELISMOS,
+                       help="Paralelismo de secuencia con --gpus > 1: 'ulysses' (reparte cabezas de atención) "
+                            "o 'ring' (reparte la secuencia)")
+    parser.add_argument("--dir_cache", type=str, default=None,
+                       help="Directorio de las cachés de condicionamiento (default: WAN_CACHE_DIR, "
+                            "/app/.cache/wan_video o ~/.cache/wan_video)")
+    parser.add_argument("--sin_cache", action="store_true",
+                       help="No usar las cachés (embeddings de texto e imagen y videos ya generados)")
+    
+    parser.add_argument("--seguimiento", type=str, default=None, choices=METODOS_SEGUIMIENTO,
+                       help="Propagar la máscara (imagen del primer frame) a todo el video base "
+                            "con flujo óptico (dis, farneback) o búsqueda de plantilla")
     
     # Opción para crear máscara
     parser.add_argument("--crear_mascara", action="store_true",
@@ -550,6 +558,20 @@ de Wan2.1. Consulta la documentación oficial para detalles.
     
     args = parser.parse_args()
     
+    # Validar argumentos antes de comprobar el entorno (que consulta la GPU)
+    if args.crear_mascara:
+        if not args.imagen_producto:
+            print("✗ Error: --imagen_producto es requerido cuando se usa --crear_mascara")
+            sys.exit(1)
+    else:
+        if not args.video_base or not args.mascara:
+            print("✗ Error: --video_base y --mascara son requeridos para generar video")
+            sys.exit(1)
+        
+        if not args.prompt:
+            print("✗ Error: --prompt es requerido para generar video")
+            sys.exit(1)
+    
     # Verificar entorno
     if not verificar_entorno():
         sys.exit(1)
@@ -560,30 +582,58 @@ de Wan2.1. Consulta la documentación oficial para detalles.
     
     # Modo: crear máscara
     if args.crear_mascara:
-        if not args.imagen_producto:
-            print("✗ Error: --imagen_producto es requerido cuando se usa --crear_mascara")
-            sys.exit(1)
         exito = crear_mascara_ejemplo(args.imagen_producto, args.salida)
         sys.exit(0 if exito else 1)
     
     # Modo: generar video
-    if not args.video_base or not args.mascara:
-        print("✗ Error: --video_base y --mascara son requeridos para generar video")
-        sys.exit(1)
-    
-    if not args.prompt:
-        print("✗ Error: --prompt es requerido para generar video")
-        sys.exit(1)
-    
-    exito = generar_video_mv2v(
-        args.video_base,
-        args.mascara,
-        args.prompt,
-        args.salida,
-        args.ckpt_dir,
-        args.resolucion,
-        args.offload_model
-    )
+    def generar(salida, frame_num):
+        video_base, mascara = args.video_base, args.mascara
+        temporales = []
+        if frame_num != 81:
+            # Menos frames que cubren todo el video base: uno de cada FACTOR
+            from interpolacion_temporal import submuestrear_video
+            video_base = submuestrear_video(video_base, args.interpolar)
+            temporales.append(video_base)
+            if not es_imagen(mascara):
+                mascara = submuestrear_video(mascara, args.interpolar, mascara=True)
+                temporales.append(mascara)
+        try:
+            return generar_video_mv2v(
+                video_base,
+                mascara,
+                args.prompt,
+                salida,
+                args.ckpt_dir,
+                args.resolucion,
+                args.offload_model,
+                servidor=args.servidor,
+                dir_cache=None if args.sin_cache else (args.dir_cache or str(directorio_cache_por_defecto())),
+                gpus=args.gpus,
+                paralelismo=args.paralelismo,
+                semilla=args.semilla,
+                frame_num=frame_num,
+                perfil=args.perfil,
+                seguimiento=args.seguimiento
+            )
+        finally:
+            for temporal in temporales:
+                Path(temporal).unlink(missing_ok=True)
+    
+    if args.interpolar:
+        from interpolacion_temporal import generar_interpolado
+        if args.comparar_nativo:
+            # El video reducido y el nativo deben salir de la misma semilla
+            from borradores import elegir_semilla
+            args.semilla = elegir_semilla(args.semilla)
+            print(f"ℹ Semilla de la comparación: {args.semilla}")
+        try:
+            exito = generar_interpolado(generar, args.salida, 81, args.interpolar,
+                                        comparar_nativo=args.comparar_nativo)
+        except ValueError as e:
+            print(f"✗ Error: {e}")
+            sys.exit(1)
+    else:
+        exito = generar(args.salida, 81)
     
     if exito:
         print("\n✓ Proceso completado")
@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+Interpolación temporal: generar menos frames y sintetizar los intermedios.
+
+El coste del denoising crece con frame_num. En lugar de generar los 81
+frames se generan, por ejemplo, 41 (factor 2) y los frames intermedios se
+sintetizan en CPU con flujo óptico (OpenCV DIS o Farneback): cada frame
+nuevo mezcla los dos vecinos deformados hacia el instante intermedio. El
+video final tiene los mismos 81 frames a 16 fps.
+
+Los pares de frames se reparten en tramos entre un pool de procesos; en
+cada tramo los mapas de deformación y la mezcla se calculan con numpy
+sobre toda la pila de frames a la vez.
+
+Wan2.1 necesita frame_num de la forma 4n+1, así que el número de frames
+generados ((frame_num - 1) / factor + 1) también debe serlo: 81 frames
+admiten los factores 2 (41), 4 (21) y 5 (17).
+
+Uso:
+    python interpolacion_temporal.py video_41f.mp4 video_81f.mp4 --factor 2
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from ejecucion_wan import publicar_salida, ruta_temporal
+
+
+FPS_WAN = 16
+
+METODOS_FLUJO = ("dis", "farneback")
+
+
+def frames_reducidos(frame_num, factor):
+    """
+    Frames a generar para llegar a frame_num interpolando con un factor.
+
+    Args:
+        frame_num: Frames del video final (4n+1)
+        factor: Frames del video final por cada frame generado
+
+    Returns:
+        Número de frames a generar
+
+    Raises:
+        ValueError: Si la combinación no da un número de frames válido para Wan2.1
+    """
+    if factor < 2:
+        raise ValueError("El factor de interpolación debe ser al menos 2")
+    if (frame_num - 1) % factor:
+        raise ValueError(f"{frame_num} frames no se pueden interpolar con factor {factor}")
+    reducidos = (frame_num - 1) // factor + 1
+    if (reducidos - 1) % 4:
+        raise ValueError(f"{reducidos} frames no es válido para Wan2.1 (debe ser 4n+1); "
+                         f"prueba otro factor")
+    return reducidos
+
+
+def leer_frames(ruta):
+    """
+    Lee todos los frames de un video.
+
+    Returns:
+        Tupla (frames, fps): array uint8 (N, alto, ancho, 3) en BGR y fps del video
+    """
+    import cv2
+    import numpy as np
+
+    captura = cv2.VideoCapture(str(ruta))
+    if not captura.isOpened():
+        raise ValueError(f"No se pudo abrir el video: {ruta}")
+    fps = captura.get(cv2.CAP_PROP_FPS) or FPS_WAN
+    frames = []
+    while True:
+        ret, frame = captura.read()
+        if not ret:
+            break
+        frames.append(frame)
+    captura.release()
+    if not frames:
+        raise ValueError(f"El video no tiene frames: {ruta}")
+    return np.stack(frames), fps
+
+
+def escribir_frames(frames, salida, fps=FPS_WAN):
+    """
+    Escribe una pila de frames BGR como MP4 (H.264 con ffmpeg, mp4v si no hay ffmpeg).
+
+    El video se escribe en un temporal y se publica con un rename atómico.
+    """
+    salida = Path(salida)
+    temporal = ruta_temporal(salida)
+    alto, ancho = frames.shape[1:3]
+    try:
+        if shutil.which("ffmpeg"):
+            proceso = subprocess.Popen(
+                ["ffmpeg", "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "bgr24",
+                 "-s", f"{ancho}x{alto}", "-r", str(fps), "-i", "-",
+                 "-c:v", "libx264", "-crf", "18", "-pix_fmt", "yuv420p", "-f", "mp4", str(temporal)],
+                stdin=subprocess.PIPE,
+            )
+            proceso.stdin.write(frames.tobytes())
+            proceso.stdin.close()
+            if proceso.wait() != 0:
+                raise RuntimeError(f"ffmpeg terminó con código {proceso.returncode}")
+        else:
+            import cv2
+            escritor = cv2.VideoWriter(str(temporal), cv2.VideoWriter_fourcc(*"mp4v"), fps, (ancho, alto))
+            for frame in frames:
+                escritor.write(frame)
+            escritor.release()
+    except BaseException:
+        if temporal.exists():
+            temporal.unlink()
+        raise
+    if not publicar_salida(temporal, salida):
+        raise RuntimeError(f"No se pudo escribir el video en {salida}")
+
+
+def _flujos(grises, metodo):
+    """Flujo óptico hacia delante y hacia atrás de cada par de frames consecutivos."""
+    import cv2
+    import numpy as np
+
+    if metodo == "dis":
+        dis = cv2.DISOpticalFlow_create(cv2.DISOPTICAL_FLOW_PRESET_MEDIUM)
+        calcular = lambda a, b: dis.calc(a, b, None)
+    else:
+        calcular = lambda a, b: cv2.calcOpticalFlowFarneback(a, b, None, 0.5, 3, 15, 3, 5, 1.2, 0)
+
+    adelante = np.stack([calcular(a, b) for a, b in zip(grises[:-1], grises[1:])])
+    atras = np.stack([calcular(b, a) for a, b in zip(grises[:-1], grises[1:])])
+    return adelante, atras
+
+
+def _interpolar_tramo(frames, factor, metodo):
+    """
+    Sintetiza los frames intermedios de un tramo de frames consecutivos.
+
+    Args:
+        frames: Array uint8 (M + 1, alto, ancho, 3)
+        factor: Frames de salida por cada par
+        metodo: 'dis' o 'farneback'
+
+    Returns:
+        Array uint8 (M, factor - 1, alto, ancho, 3) con los frames intermedios de cada par
+    """
+    import cv2
+    import numpy as np
+
+    cv2.setNumThreads(1)
+    grises = np.stack([cv2.cvtColor(f, cv2.COLOR_BGR2GRAY) for f in frames])
+    adelante, atras = _flujos(grises, metodo)
+
+    alto, ancho = frames.shape[1:3]
+    malla = np.stack(np.meshgrid(np.arange(ancho, dtype=np.float32),
+                                 np.arange(alto, dtype=np.float32)), axis=-1)
+    anteriores = frames[:-1].astype(np.float32)
+    siguientes = frames[1:].astype(np.float32)
+
+    intermedios = np.empty((len(frames) - 1, factor - 1, alto, ancho, 3), dtype=np.uint8)
+    for k in range(1, factor):
+        t = k / factor
+        # Mapas de todo el tramo a la vez: x - t*F(a->b) y x - (1-t)*F(b->a)
+        mapas_a = malla - t * adelante
+        mapas_b = malla - (1 - t) * atras
+        deformados_a = np.stack([cv2.remap(f, m, None, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+                                 for f, m in zip(anteriores, mapas_a)])
+        deformados_b = np.stack([cv2.remap(f, m, None, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+                                 for f, m in zip(siguientes, mapas_b)])
+        mezcla = (1 - t) * deformados_a + t * deformados_b
+        intermedios[:, k - 1] = np.clip(mezcla + 0.5, 0, 255).astype(np.uint8)
+    return intermedios
+
+
+def interpolar_frames(frames, factor=2, metodo="dis", procesos=None):
+    """
+    Inserta factor - 1 frames sintetizados entre cada par de frames.
+
+    Args:
+        frames: Array uint8 (N, alto, ancho, 3)
+        factor: Factor de interpolación
+        metodo: 'dis' o 'farneback'
+        procesos: Procesos del pool (default: número de CPUs)
+
+    Returns:
+        Array uint8 ((N - 1) * factor + 1, alto, ancho, 3)
+    """
+    import numpy as np
+
+    if metodo not in METODOS_FLUJO:
+        raise ValueError(f"Método de flujo desconocido: {metodo}")
+    procesos = procesos or os.cpu_count() or 1
+    pares = len(frames) - 1
+    # Tramos solapados en un frame para que cada par quede en un solo tramo
+    por_tramo = max(1, -(-pares // procesos))
+    limites = [(i, min(i + por_tramo, pares)) for i in range(0, pares, por_tramo)]
+
+    if len(limites) == 1:
+        intermedios = [_interpolar_tramo(frames, factor, metodo)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(procesos, len(limites))) as pool:
+            intermedios = list(pool.map(
+                _interpolar_tramo,
+                [frames[inicio:fin + 1] for inicio, fin in limites],
+                [factor] * len(limites),
+                [metodo] * len(limites),
+            ))
+    intermedios = np.concatenate(intermedios)
+
+    salida = np.empty(((len(frames) - 1) * factor + 1, *frames.shape[1:]), dtype=np.uint8)
+    salida[::factor] = frames
+    for k in range(1, factor):
+        salida[k::factor] = intermedios[:, k - 1]
+    return salida
+
+
+def interpolar_video(entrada, salida, factor=2, fps=FPS_WAN, metodo="dis", procesos=None):
+    """
+    Interpola un video generado hasta factor veces sus frames.
+
+    Args:
+        entrada: Video con los frames generados
+        salida: Video interpolado
+        factor: Factor de interpolación
+        fps: Fps del video de salida (16 en Wan2.1)
+        metodo: 'dis' o 'farneback'
+        procesos: Procesos del pool (default: número de CPUs)
+
+    Returns:
+        Diccionario con frames_entrada, frames_salida y segundos
+    """
+    inicio = time.perf_counter()
+    frames, _ = leer_frames(entrada)
+    interpolados = interpolar_frames(frames, factor, metodo, procesos)
+    escribir_frames(interpolados, salida, fps)
+    return {
+        "frames_entrada": len(frames),
+        "frames_salida": len(interpolados),
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+def submuestrear_video(entrada, factor, fps=FPS_WAN, mascara=False):
+    """
+    Conserva uno de cada factor frames de un video y lo reetiqueta a fps.
+
+    Sirve para que VACE genere menos frames siguiendo todo el movimiento
+    del video base: tras interpolar, el resultado recupera su duración.
+
+    Args:
+        entrada: Video base o de máscara
+        factor: Factor de interpolación
+        mascara: Si True, el video es una máscara y se escribe sin pérdidas
+            (mascara_video.escribir_pila) para no emborronar sus bordes
+
+    Returns:
+        Ruta del video submuestreado (en el directorio temporal; quien lo
+        pide debe borrarlo)
+    """
+    frames, _ = leer_frames(entrada)
+    sufijo = "_mascara" if mascara else ""
+    destino = Path(tempfile.gettempdir()) / f"{Path(entrada).stem}{sufijo}_cada{factor}_{os.getpid()}.mp4"
+    if mascara:
+        from mascara_video import escribir_pila
+
+        # VACE lee la máscara del primer canal RGB (el último en BGR)
+        return escribir_pila(frames[::factor, ..., 2], destino, fps)
+    escribir_frames(frames[::factor], destino, fps)
+    return destino
+
+
+def _psnr(a, b):
+    """PSNR medio (dB) entre dos pilas de frames uint8."""
+    import numpy as np
+
+    errores = ((a.astype(np.float32) - b.astype(np.float32)) ** 2).reshape(len(a), -1).mean(axis=1)
+    psnr = 10 * np.log10(255.0 ** 2 / np.maximum(errores, 1e-10))
+    return float(psnr.mean())
+
+
+def evaluar_interpolacion(nativo, factor=2, metodo="dis", procesos=None):
+    """
+    Mide la calidad de la interpolación sobre un render nativo.
+
+    Se quitan los frames intermedios del render nativo, se reconstruyen
+    interpolando y se comparan con los originales. Como referencia se da
+    también la mezcla lineal de los vecinos, sin flujo óptico.
+
+    Args:
+        nativo: Video generado con todos los frames
+
+    Returns:
+        Diccionario con psnr_flujo_db, psnr_mezcla_db y segundos_interpolacion
+    """
+    import numpy as np
+
+    frames, _ = leer_frames(nativo)
+    frames = frames[:(len(frames) - 1) // factor * factor + 1]
+    inicio = time.perf_counter()
+    reconstruidos = interpolar_frames(frames[::factor], factor, metodo, procesos)
+    segundos = time.perf_counter() - inicio
+
+    huecos = np.ones(len(frames), dtype=bool)
+    huecos[::factor] = False
+    extremos = frames[::factor].astype(np.float32)
+    mezcla = np.empty(frames.shape, dtype=np.float32)
+    for k in range(factor):
+        t = k / factor
+        mezcla[k:-1:factor] = (1 - t) * extremos[:-1] + t * extremos[1:]
+    mezcla[-1] = frames[-1]
+    mezcla = np.clip(mezcla + 0.5, 0, 255).astype(np.uint8)
+
+    return {
+        "psnr_flujo_db": _psnr(reconstruidos[huecos], frames[huecos]),
+        "psnr_mezcla_db": _psnr(mezcla[huecos], frames[huecos]),
+        "segundos_interpolacion": segundos,
+    }
+
+
+def generar_interpolado(generar, salida, frame_num=81, factor=2, comparar_nativo=False,
+                        metodo="dis", procesos=None):
+    """
+    Genera menos frames con Wan2.1 y los interpola hasta frame_num.
+
+    Args:
+        generar: Función generar(salida, frame_num) -> bool que lanza la generación
+        salida: Video final
+        frame_num: Frames del video final
+        factor: Factor de interpolación
+        comparar_nativo: Si True, genera también el video nativo con la misma
+            semilla y escribe el informe <salida>_interpolacion.json
+        metodo: 'dis' o 'farneback'
+        procesos: Procesos del pool (default: número de CPUs)
+
+    Returns:
+        True si el video final se generó
+    """
+    salida = Path(salida)
+    reducidos = frames_reducidos(frame_num, factor)
+    base = salida.with_name(f"{salida.stem}_{reducidos}f{salida.suffix or '.mp4'}")
+
+    print(f"ℹ Interpolación temporal: se generan {reducidos} frames y se interpolan a {frame_num}")
+    inicio = time.perf_counter()
+    if not generar(str(base), reducidos):
+        return False
+    segundos_generacion = time.perf_counter() - inicio
+
+    print(f"\nInterpolando {reducidos} -> {frame_num} frames ({metodo}, "
+          f"{procesos or os.cpu_count()} procesos)...")
+    try:
+        interpolacion = interpolar_video(base, salida, factor, FPS_WAN, metodo, procesos)
+    finally:
+        base.unlink(missing_ok=True)
+    print(f"✓ Interpolación completada en {interpolacion['segundos']:.1f} s")
+
+    if comparar_nativo:
+        nativo = salida.with_name(f"{salida.stem}_nativo{salida.suffix or '.mp4'}")
+        print(f"\nGenerando el video nativo de {frame_num} frames para comparar...")
+        inicio = time.perf_counter()
+        if generar(str(nativo), frame_num):
+            segundos_nativo = time.perf_counter() - inicio
+            informe = {
+                "frame_num": frame_num,
+                "factor": factor,
+                "frames_generados": reducidos,
+                "metodo": metodo,
+                "segundos_generacion_reducida": segundos_generacion,
+                "segundos_interpolacion": interpolacion["segundos"],
+                "segundos_total_interpolado": segundos_generacion + interpolacion["segundos"],
+                "segundos_nativo": segundos_nativo,
+                "calidad": evaluar_interpolacion(nativo, factor, metodo, procesos),
+            }
+            informe["aceleracion"] = segundos_nativo / informe["segundos_total_interpolado"]
+            ruta_informe = salida.with_name(f"{salida.stem}_interpolacion.json")
+            ruta_informe.write_text(json.dumps(informe, ensure_ascii=False, indent=2), encoding="utf-8")
+            imprimir_informe(informe)
+            print(f"  Informe: {ruta_informe}")
+        else:
+            print("⚠ No se pudo generar el video nativo; no hay informe de comparación")
+
+    return True
+
+
+def imprimir_informe(informe):
+    """Imprime la comparación entre el video interpolado y el nativo."""
+    calidad = informe["calidad"]
+    print("\nInterpolado frente a nativo:")
+    print(f"  {'':<24} {'Interpolado':>12} {'Nativo':>10}")
+    print(f"  {'Frames generados':<24} {informe['frames_generados']:>12} {informe['frame_num']:>10}")
+    print(f"  {'Generación (s)':<24} {informe['segundos_generacion_reducida']:>12.1f} {informe['segundos_nativo']:>10.1f}")
+    print(f"  {'Interpolación (s)':<24} {informe['segundos_interpolacion']:>12.1f} {'-':>10}")
+    print(f"  {'Total (s)':<24} {informe['segundos_total_interpolado']:>12.1f} {informe['segundos_nativo']:>10.1f}")
+    print(f"  Aceleración: x{informe['aceleracion']:.2f}")
+    print(f"  Calidad (frames quitados del nativo y reconstruidos): PSNR {calidad['psnr_flujo_db']:.2f} dB "
+          f"con flujo óptico, {calidad['psnr_mezcla_db']:.2f} dB con mezcla lineal")
+
+
+def main():
+    """Interpola un video ya generado."""
+    parser = argparse.ArgumentParser(
+        description="Interpola un video generado hasta factor veces sus frames con flujo óptico"
+    )
+    parser.add_argument("entrada", type=str, help="Video generado (por ejemplo, 41 frames)")
+    parser.add_argument("salida", type=str, help="Video interpolado")
+    parser.add_argument("--factor", type=int, default=2,
+                       help="Frames de salida por cada frame generado (default: 2)")
+    parser.add_argument("--fps", type=float, default=FPS_WAN,
+                       help="Fps del video de salida (default: 16)")
+    parser.add_argument("--metodo", type=str, default="dis", choices=METODOS_FLUJO,
+                       help="Flujo óptico de OpenCV (default: dis)")
+    parser.add_argument("--procesos", type=int, default=None,
+                       help="Procesos del pool (default: número de CPUs)")
+    parser.add_argument("--evaluar", action="store_true",
+                       help="Tratar la entrada como render nativo: quitar frames, reconstruirlos y medir el PSNR")
+    args = parser.parse_args()
+
+    try:
+        if args.evaluar:
+            calidad = evaluar_interpolacion(args.entrada, args.factor, args.metodo, args.procesos)
+            print(f"PSNR con flujo óptico: {calidad['psnr_flujo_db']:.2f} dB")
+            print(f"PSNR con mezcla lineal: {calidad['psnr_mezcla_db']:.2f} dB")
+            print(f"Interpolación: {calidad['segundos_interpolacion']:.2f} s")
+            return
+        resultado = interpolar_video(args.entrada, args.salida, args.factor, args.fps,
+                                     args.metodo, args.procesos)
+    except (ValueError, RuntimeError) as e:
+        print(f"✗ Error: {e}")
+        sys.exit(1)
+
+    print(f"✓ {resultado['frames_entrada']} -> {resultado['frames_salida']} frames "
+          f"en {resultado['segundos']:.1f} s: {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
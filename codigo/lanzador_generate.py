@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Lanzador de generate.py de Wan2.1 con las optimizaciones de este proyecto.
+
+Ejecuta generate.py en el mismo proceso (con runpy) después de instalar
+la decodificación del VAE por tramos (vae_por_tramos.py), las cachés de
+condicionamiento y, si se pide, la caché de pasos del DiT (cache_pasos.py),
+sin modificar el repositorio Wan2.1. Si la variable WAN_EVENTOS apunta a
+un archivo, se escriben en él los eventos de cada etapa (telemetria.py);
+con --perfil la ejecución se perfila (perfil.py).
+Los argumentos que siguen a la ruta de generate.py se le pasan tal cual.
+
+Uso:
+    python lanzador_generate.py --dir_cache /app/.cache/wan_video \\
+        /app/Wan2.1/generate.py --task t2v-1.3B --size 832*480 ...
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import argparse
+import os
+import runpy
+import sys
+from contextlib import ExitStack
+from pathlib import Path
+
+
+# Límites por defecto de cada caché de condicionamiento (GB)
+LIMITE_CACHE_T5_GB = 2.0
+LIMITE_CACHE_IMAGEN_GB = 5.0
+
+
+def construir_prefijo(generate_script, dir_cache=None, cache_pasos=None, perfil=None):
+    """
+    Construye el inicio del comando para ejecutar generate.py.
+
+    Siempre pasa por el lanzador para que el VAE decodifique por tramos.
+
+    Args:
+        generate_script: Ruta a generate.py
+        dir_cache: Directorio raíz de las cachés (None = sin caché)
+        cache_pasos: Umbral de la caché de pasos del DiT (None = desactivada)
+        perfil: Ruta final del video si se quiere perfilar la generación
+            (None = sin perfil, ver perfil.py)
+
+    Returns:
+        Lista con el ejecutable, el script y sus opciones
+    """
+    prefijo = [sys.executable, str(Path(__file__).resolve())]
+    if dir_cache is not None:
+        prefijo.extend(["--dir_cache", str(dir_cache)])
+    if cache_pasos is not None:
+        prefijo.extend(["--cache_pasos", str(cache_pasos)])
+    if perfil is not None:
+        prefijo.extend(["--perfil", str(perfil)])
+    prefijo.append(str(generate_script))
+    return prefijo
+
+
+def _pasos_de_muestreo(argumentos):
+    """Pasos de muestreo de una llamada a generate.py (los mismos defaults que generate.py)."""
+    valores = dict(zip(argumentos, argumentos[1:]))
+    if "--sample_steps" in valores:
+        return int(valores["--sample_steps"])
+    return 40 if "i2v" in valores.get("--task", "") else 50
+
+
+def _directorio_salida(argumentos):
+    """Directorio donde generate.py escribirá el video (--save_file o el actual)."""
+    valores = dict(zip(argumentos, argumentos[1:]))
+    if "--save_file" in valores:
+        return Path(valores["--save_file"]).resolve().parent
+    return Path.cwd()
+
+
+def main():
+    """Función principal del lanzador."""
+    parser = argparse.ArgumentParser(
+        description="Ejecuta generate.py de Wan2.1 con cachés de condicionamiento y de pasos"
+    )
+    parser.add_argument("--dir_cache", type=str, default=None,
+                       help="Directorio raíz de las cachés (embeddings de texto e imagen)")
+    parser.add_argument("--limite_cache_t5_gb", type=float, default=LIMITE_CACHE_T5_GB,
+                       help="Tamaño máximo de la caché de embeddings de texto")
+    parser.add_argument("--limite_cache_imagen_gb", type=float, default=LIMITE_CACHE_IMAGEN_GB,
+                       help="Tamaño máximo de la caché de CLIP y latentes de imagen (I2V)")
+    parser.add_argument("--cache_pasos", type=float, default=None,
+                       help="Umbral de la caché de pasos del DiT (ver cache_pasos.py)")
+    parser.add_argument("--perfil", type=str, default=None, metavar="SALIDA",
+                       help="Perfilar con torch.profiler y cProfile; los archivos se "
+                            "escriben junto a SALIDA (ver perfil.py)")
+    parser.add_argument("--vae_completo", action="store_true",
+                       help="Decodificar el video entero de una vez (sin vae_por_tramos.py)")
+    parser.add_argument("generate_script", type=str,
+                       help="Ruta a generate.py del repositorio Wan2.1")
+    parser.add_argument("argumentos", nargs=argparse.REMAINDER,
+                       help="Argumentos para generate.py")
+
+    args = parser.parse_args()
+
+    generate_script = Path(args.generate_script).resolve()
+    sys.path.insert(0, str(generate_script.parent))
+
+    # Con torchrun solo el proceso de rango 0 perfila y emite telemetría
+    rango_principal = os.environ.get("RANK", "0") == "0"
+
+    with ExitStack() as pila:
+        consumidores = []
+        if args.perfil and rango_principal:
+            from perfil import perfil
+            consumidores.append(pila.enter_context(perfil(args.perfil)).emitir)
+
+        if not args.vae_completo:
+            from vae_por_tramos import vae_por_tramos
+            pila.enter_context(vae_por_tramos(_directorio_salida(args.argumentos)))
+
+        caches = []
+        if args.dir_cache:
+            from cache_condicionamiento import imagen_con_cache, resumen_cache, t5_con_cache
+            from cache_disco import CacheDisco
+
+            cache_t5 = CacheDisco(Path(args.dir_cache) / "t5", args.limite_cache_t5_gb)
+            cache_imagen = CacheDisco(Path(args.dir_cache) / "imagen", args.limite_cache_imagen_gb)
+            pila.enter_context(t5_con_cache(cache_t5))
+            pila.enter_context(imagen_con_cache(cache_imagen))
+            caches.append((cache_t5, "T5"))
+            caches.append((cache_imagen, "imagen"))
+
+        cache_dit = None
+        if args.cache_pasos is not None:
+            from cache_pasos import cache_pasos
+            cache_dit = pila.enter_context(
+                cache_pasos(args.cache_pasos, _pasos_de_muestreo(args.argumentos)))
+
+        # La telemetría va la última para medir las implementaciones parcheadas
+        if os.environ.get("WAN_EVENTOS") and rango_principal:
+            from telemetria import VARIABLE_EVENTOS, emisor_archivo
+            consumidores.append(emisor_archivo(os.environ[VARIABLE_EVENTOS]))
+        if consumidores:
+            from telemetria import telemetria
+
+            def emitir(evento):
+                for consumidor in consumidores:
+                    consumidor(evento)
+
+            pila.enter_context(telemetria(emitir))
+
+        sys.argv = [str(generate_script)] + args.argumentos
+        runpy.run_path(str(generate_script), run_name="__main__")
+
+        for cache, nombre in caches:
+            resumen_cache(cache, nombre)
+        if cache_dit is not None:
+            from cache_pasos import resumen_cache_pasos
+            resumen_cache_pasos(cache_dit)
+
+
+if __name__ == "__main__":
+    main()
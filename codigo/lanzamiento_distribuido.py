@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Lanzamiento de generate.py en varias GPUs con paralelismo de secuencia.
+
+Para clips 720p o modelos 14B se puede repartir un mismo video entre
+varias GPUs para reducir la latencia. Wan2.1 lo soporta con torchrun,
+FSDP y paralelismo de secuencia (xDiT USP) en dos variantes:
+    - ulysses: reparte las cabezas de atención (requiere que el número de
+      cabezas sea divisible entre las GPUs)
+    - ring: reparte la secuencia de tokens en anillo
+
+Las funciones validar_paralelismo y construir_comando_distribuido no
+necesitan GPU, así que la construcción del comando se puede comprobar en
+cualquier máquina.
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import importlib.util
+import sys
+
+
+# Cabezas de atención del DiT según el tamaño del modelo
+CABEZAS_ATENCION = {
+    "1.3B": 12,
+    "14B": 40,
+}
+
+# Compresión del VAE (tiempo, alto, ancho) y tamaño de parche del DiT
+VAE_STRIDE = (4, 8, 8)
+PATCH_SIZE = (1, 2, 2)
+
+PARALELISMOS = ["ulysses", "ring"]
+
+
+def tokens_por_clip(size, frame_num):
+    """
+    Calcula las dimensiones latentes y el número de tokens de un clip.
+
+    Args:
+        size: Tamaño en formato de generate.py ("832*480")
+        frame_num: Número de frames
+
+    Returns:
+        Tupla (frames_latentes, tokens_por_frame, tokens_totales)
+    """
+    ancho, alto = (int(v) for v in size.split("*"))
+    frames_latentes = (frame_num - 1) // VAE_STRIDE[0] + 1
+    tokens_por_frame = (alto // VAE_STRIDE[1] // PATCH_SIZE[1]) * (ancho // VAE_STRIDE[2] // PATCH_SIZE[2])
+    return frames_latentes, tokens_por_frame, frames_latentes * tokens_por_frame
+
+
+def validar_paralelismo(task, size, frame_num, gpus, paralelismo):
+    """
+    Comprueba que un trabajo se puede repartir entre varias GPUs.
+
+    Args:
+        task: Tarea de Wan2.1 ('t2v-14B', 'i2v-14B', 'vace-1.3B', ...)
+        size: Tamaño en formato de generate.py ("1280*720")
+        frame_num: Número de frames
+        gpus: Número de GPUs
+        paralelismo: 'ulysses' o 'ring'
+
+    Returns:
+        Lista de errores (vacía si la configuración es válida)
+    """
+    errores = []
+
+    if paralelismo not in PARALELISMOS:
+        errores.append(f"Paralelismo desconocido: {paralelismo} (usa {' o '.join(PARALELISMOS)})")
+        return errores
+
+    tamano_modelo = task.split("-")[-1]
+    cabezas = CABEZAS_ATENCION.get(tamano_modelo)
+    if cabezas is None:
+        errores.append(f"Tamaño de modelo desconocido en la tarea: {task}")
+    elif paralelismo == "ulysses" and cabezas % gpus != 0:
+        errores.append(f"ulysses: las {cabezas} cabezas de atención del modelo {tamano_modelo} "
+                       f"no se dividen entre {gpus} GPUs")
+
+    if (frame_num - 1) % VAE_STRIDE[0] != 0:
+        errores.append(f"frame_num debe ser 4n+1 (recibido: {frame_num})")
+
+    _, _, tokens = tokens_por_clip(size, frame_num)
+    if tokens % gpus != 0:
+        errores.append(f"{paralelismo}: los {tokens} tokens del clip ({size}, {frame_num} frames) "
+                       f"no se dividen entre {gpus} GPUs")
+
+    return errores
+
+
+def construir_comando_distribuido(comando, gpus, paralelismo):
+    """
+    Convierte un comando de generate.py de una GPU en un lanzamiento con torchrun.
+
+    Se añade FSDP para el DiT (y para el T5 salvo con --t5_cpu) y el
+    tamaño de paralelismo de secuencia. --offload_model se elimina porque
+    con FSDP cada GPU solo guarda su parte del modelo.
+
+    Args:
+        comando: Comando [python, script, argumentos...]
+        gpus: Número de GPUs (procesos)
+        paralelismo: 'ulysses' o 'ring'
+
+    Returns:
+        Nuevo comando
+    """
+    if gpus <= 1:
+        return list(comando)
+
+    argumentos = []
+    i = 2
+    while i < len(comando):
+        if comando[i] == "--offload_model":
+            i += 2
+            continue
+        argumentos.append(comando[i])
+        i += 1
+
+    nuevo = [
+        comando[0], "-m", "torch.distributed.run",
+        "--standalone",
+        f"--nproc_per_node={gpus}",
+        comando[1],
+        *argumentos,
+        "--dit_fsdp",
+    ]
+    if "--t5_cpu" not in argumentos:
+        nuevo.append("--t5_fsdp")
+    nuevo.extend([f"--{paralelismo}_size", str(gpus)])
+    return nuevo
+
+
+def preparar_lanzamiento(comando, task, size, frame_num, gpus, paralelismo):
+    """
+    Prepara el comando de generación para una o varias GPUs.
+
+    Si la configuración no es válida o el entorno no lo permite (faltan
+    GPUs, torch o xfuser), se vuelve a una sola GPU con un aviso.
+
+    Args:
+        comando: Comando de generate.py para una GPU
+        task: Tarea de Wan2.1
+        size: Tamaño en formato de generate.py
+        frame_num: Número de frames (None = 81)
+        gpus: Número de GPUs solicitado
+        paralelismo: 'ulysses' o 'ring'
+
+    Returns:
+        Comando a ejecutar
+    """
+    if gpus is None or gpus <= 1:
+        return list(comando)
+
+    frame_num = frame_num or 81
+    errores = validar_paralelismo(task, size, frame_num, gpus, paralelismo)
+
+    if not errores:
+        for modulo in ("torch", "xfuser"):
+            if importlib.util.find_spec(modulo) is None:
+                errores.append(f"{modulo} no está instalado (necesario para el paralelismo de secuencia)")
+
+    if not errores:
+        from seleccionar_gpu import obtener_info_gpus
+        disponibles = len(obtener_info_gpus())
+        if disponibles < gpus:
+            errores.append(f"Se pidieron {gpus} GPUs pero solo hay {disponibles} visibles")
+
+    if errores:
+        print(f"⚠ No se puede repartir el clip entre {gpus} GPUs:")
+        for error in errores:
+            print(f"  - {error}")
+        print("  Se usará una sola GPU")
+        return list(comando)
+
+    print(f"ℹ Repartiendo el clip entre {gpus} GPUs (paralelismo {paralelismo})")
+    return construir_comando_distribuido(comando, gpus, paralelismo)
+
+
+if __name__ == "__main__":
+    # Muestra el comando que se construiría, sin ejecutarlo
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Muestra el lanzamiento distribuido de generate.py")
+    parser.add_argument("--task", type=str, default="t2v-14B")
+    parser.add_argument("--size", type=str, default="1280*720")
+    parser.add_argument("--frame_num", type=int, default=81)
+    parser.add_argument("--gpus", type=int, default=4)
+    parser.add_argument("--paralelismo", type=str, default="ulysses", choices=PARALELISMOS)
+    args = parser.parse_args()
+
+    errores = validar_paralelismo(args.task, args.size, args.frame_num, args.gpus, args.paralelismo)
+    for error in errores:
+        print(f"✗ {error}")
+    base = [sys.executable, "generate.py", "--task", args.task, "--size", args.size,
+            "--offload_model", "True", "--t5_cpu"]
+    print(" ".join(construir_comando_distribuido(base, args.gpus, args.paralelismo)))
+    sys.exit(1 if errores else 0)
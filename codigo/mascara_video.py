@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Máscaras de VACE como pilas de frames en memoria.
+
+Una máscara estática (PNG/JPG) se convierte en la pila (frames, alto,
+ancho) uint8 que VACE espera, sin copiar el frame: la pila es una vista
+con np.broadcast_to. Las máscaras binarias se redimensionan con vecino
+más cercano para que sigan siendo exactamente 0/255.
+
+Cuando la pila tiene que llegar a generate.py (otro proceso, que lee la
+máscara con decord) se escribe sin pérdidas:
+    ffmpeg   H.264 RGB con -qp 0 (libx264rgb) en .mp4
+    OpenCV   FFV1 en .avi si no hay ffmpeg
+En lugar de H.264 4:2:0 con pérdidas, que emborrona los bordes de una
+máscara binaria. En el proceso del modelo (motor_wan.py) la máscara se
+pasa directamente como tensor (tensor_mascara), sin archivo.
+
+Uso:
+    pila = pila_mascara("mascara.png", 832, 480, 81)
+    ruta = escribir_pila(pila, "mascara.mp4", fps=16)
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import shutil
+import subprocess
+from pathlib import Path
+
+from ejecucion_wan import publicar_salida, ruta_temporal
+
+
+EXTENSIONES_IMAGEN = (".png", ".jpg", ".jpeg")
+
+FPS_POR_DEFECTO = 16.0
+
+
+def es_imagen(ruta):
+    """True si la máscara es una imagen estática (y no un video)."""
+    return Path(ruta).suffix.lower() in EXTENSIONES_IMAGEN
+
+
+def leer_mascara(ruta):
+    """
+    Lee una máscara en escala de grises.
+
+    Returns:
+        Array uint8 (alto, ancho)
+
+    Raises:
+        ValueError: Si la imagen no se puede leer
+    """
+    import cv2
+
+    mascara = cv2.imread(str(ruta), cv2.IMREAD_GRAYSCALE)
+    if mascara is None:
+        raise ValueError(f"No se pudo cargar la máscara: {ruta}")
+    return mascara
+
+
+def es_binaria(mascara):
+    """True si la máscara solo tiene los valores 0 y 255."""
+    import numpy as np
+
+    return not np.any((mascara != 0) & (mascara != 255))
+
+
+def redimensionar_mascara(mascara, ancho, alto):
+    """
+    Redimensiona una máscara (vecino más cercano si es binaria, lineal si no).
+
+    Returns:
+        Array uint8 (alto, ancho); la misma máscara si ya tiene ese tamaño
+    """
+    import cv2
+
+    if mascara.shape == (alto, ancho):
+        return mascara
+    interpolacion = cv2.INTER_NEAREST if es_binaria(mascara) else cv2.INTER_LINEAR
+    return cv2.resize(mascara, (ancho, alto), interpolation=interpolacion)
+
+
+def pila_mascara(mascara, ancho, alto, frames):
+    """
+    Pila de frames de una máscara estática, sin copiar el frame.
+
+    Args:
+        mascara: Ruta a la imagen o array uint8 (alto, ancho)
+        ancho, alto: Tamaño de los frames (el del video base)
+        frames: Número de frames
+
+    Returns:
+        Vista de solo lectura (frames, alto, ancho) uint8 de un único frame
+    """
+    import numpy as np
+
+    if not hasattr(mascara, "shape"):
+        mascara = leer_mascara(mascara)
+    frame = redimensionar_mascara(mascara, ancho, alto)
+    return np.broadcast_to(frame, (frames, alto, ancho))
+
+
+def _escribir_ffmpeg(pila, temporal, fps):
+    """Escribe la pila con ffmpeg en H.264 RGB sin pérdidas."""
+    frames, alto, ancho = pila.shape
+    proceso = subprocess.Popen(
+        ["ffmpeg", "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "gray",
+         "-s", f"{ancho}x{alto}", "-r", str(fps), "-i", "-",
+         "-c:v", "libx264rgb", "-qp", "0", "-preset", "ultrafast", "-pix_fmt", "rgb24",
+         "-f", "mp4", str(temporal)],
+        stdin=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        for frame in pila:
+            proceso.stdin.write(frame.tobytes())
+        proceso.stdin.close()
+    except BrokenPipeError:
+        pass
+    error = proceso.stderr.read().decode(errors="replace")
+    if proceso.wait() != 0:
+        raise RuntimeError(f"ffmpeg terminó con código {proceso.returncode}: {error.strip()}")
+
+
+def _escribir_opencv(pila, temporal, fps):
+    """Escribe la pila con OpenCV en FFV1 (sin pérdidas)."""
+    import cv2
+
+    frames, alto, ancho = pila.shape
+    escritor = cv2.VideoWriter(str(temporal), cv2.VideoWriter_fourcc(*"FFV1"), fps,
+                               (ancho, alto), False)
+    if not escritor.isOpened():
+        raise RuntimeError("OpenCV no puede escribir video FFV1")
+    try:
+        for frame in pila:
+            escritor.write(frame)
+    finally:
+        escritor.release()
+
+
+def parametros_codificacion():
+    """
+    Codificador que usará escribir_pila() en esta máquina.
+
+    Returns:
+        Diccionario con el formato, el códec y sus opciones (forma parte de
+        la clave de cache_mascaras.py)
+    """
+    if shutil.which("ffmpeg"):
+        return {"formato": "mp4", "codec": "libx264rgb", "qp": 0, "pix_fmt": "rgb24"}
+    return {"formato": "avi", "codec": "ffv1"}
+
+
+def escribir_pila(pila, salida, fps=FPS_POR_DEFECTO):
+    """
+    Escribe una pila de máscara como video sin pérdidas.
+
+    Con ffmpeg el video es .mp4 (H.264 RGB, -qp 0); sin ffmpeg, .avi (FFV1
+    con OpenCV), así que la ruta final puede cambiar de extensión. Se
+    escribe en un temporal y se publica con un rename atómico.
+
+    Args:
+        pila: Array (frames, alto, ancho) uint8
+        salida: Ruta del video
+        fps: fps del video (los del video base)
+
+    Returns:
+        Ruta del video escrito
+    """
+    formato = parametros_codificacion()["formato"]
+    escribir = _escribir_ffmpeg if formato == "mp4" else _escribir_opencv
+    salida = Path(salida).with_suffix(f".{formato}")
+
+    temporal = ruta_temporal(salida)
+    try:
+        escribir(pila, temporal, fps or FPS_POR_DEFECTO)
+    except BaseException:
+        if temporal.exists():
+            temporal.unlink()
+        raise
+    if not publicar_salida(temporal, salida):
+        raise RuntimeError(f"No se pudo escribir el video de máscara en {salida}")
+    return salida
+
+
+def tensor_mascara(mascara, ancho_base, alto_base, video):
+    """
+    Tensor de máscara de VACE para un video ya preparado por el pipeline.
+
+    Reproduce lo que hace prepare_source de Wan2.1 con un video de máscara
+    del tamaño del video base: recorte central a la proporción de los
+    frames preparados, redimensionado y valores en [0, 1]. El frame se
+    sube una sola vez al dispositivo y se expande en él.
+
+    Args:
+        mascara: Ruta a la imagen de máscara
+        ancho_base, alto_base: Tamaño del video base
+        video: Tensor (3, frames, alto, ancho) devuelto por prepare_source
+
+    Returns:
+        Tensor (1, frames, alto, ancho) en el dispositivo del video
+    """
+    import cv2
+    import torch
+
+    _, frames, alto, ancho = video.shape
+    frame = redimensionar_mascara(leer_mascara(mascara), ancho_base, alto_base)
+
+    # Recorte central a la proporción del video preparado
+    escala = min(alto_base / alto, ancho_base / ancho)
+    alto_recorte, ancho_recorte = round(alto * escala), round(ancho * escala)
+    y = (alto_base - alto_recorte) // 2
+    x = (ancho_base - ancho_recorte) // 2
+    frame = frame[y:y + alto_recorte, x:x + ancho_recorte]
+    if frame.shape != (alto, ancho):
+        frame = cv2.resize(frame, (ancho, alto), interpolation=cv2.INTER_LINEAR)
+
+    plano = torch.from_numpy(frame).to(video.device, torch.float32) / 255.0
+    # VACE remodela la máscara con view(), que necesita memoria contigua
+    return plano.expand(1, frames, alto, ancho).contiguous()
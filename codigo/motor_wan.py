@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Motor de generación en proceso para Wan 2.1.
+
+A diferencia de los scripts generar_video.py y generar_video_con_mascara.py,
+que lanzan generate.py como un subproceso nuevo por cada video, este módulo
+carga el pipeline de Wan2.1 (encoder umt5-xxl, VAE y DiT) una sola vez y lo
+reutiliza para todos los trabajos que usen el mismo checkpoint.
+
+Un trabajo es un diccionario con las claves:
+    modo: 't2v', 'i2v' o 'vace'
+    task, size: tarea y tamaño en formato de generate.py ('t2v-14B', '832*480')
+    ckpt_dir: directorio del checkpoint
+    prompt: texto de la generación
+    salida: ruta del MP4 de salida
+    imagen: imagen de referencia (solo I2V)
+    video_base, mascara: video base y máscara, como video o como imagen
+        estática (solo VACE)
+    frame_num, semilla, sample_guide_scale, sample_shift, sample_steps,
+    sample_solver, offload_model, t5_cpu: opcionales
+    cache_pasos: umbral de la caché de pasos del DiT (opcional, ver cache_pasos.py)
+
+El VAE decodifica por tramos y escribe el MP4 a medida (vae_por_tramos.py)
+y cada trabajo deja el tiempo de sus etapas en <stem>_telemetria.json
+(telemetria.py).
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import gc
+import os
+import random
+import sys
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+from ejecucion_wan import publicar_salida, ruta_temporal
+from mascara_video import es_imagen, tensor_mascara
+from muestreo_memoria import MuestreadorMemoria, imprimir_resumen
+from sonda_video import sondear_video
+from telemetria import RegistroTelemetria, imprimir_evento, ruta_telemetria, telemetria
+from vae_por_tramos import VideoEnStreaming, vae_por_tramos
+
+
+# Clase de pipeline de Wan2.1 según el prefijo de la tarea
+CLASES_PIPELINE = {
+    "t2v": "WanT2V",
+    "i2v": "WanI2V",
+    "vace": "WanVace",
+}
+
+
+def valores_por_defecto(trabajo):
+    """
+    Completa un trabajo con los mismos valores por defecto que usa generate.py.
+
+    Args:
+        trabajo: Diccionario del trabajo (se modifica en el sitio)
+
+    Returns:
+        El mismo diccionario, completado
+    """
+    task = trabajo["task"]
+    trabajo.setdefault("frame_num", None)
+    trabajo.setdefault("semilla", None)
+    trabajo.setdefault("offload_model", False)
+    trabajo.setdefault("t5_cpu", False)
+    trabajo.setdefault("sample_solver", "unipc")
+
+    if trabajo["frame_num"] is None:
+        trabajo["frame_num"] = 81
+    if trabajo.get("sample_steps") is None:
+        trabajo["sample_steps"] = 40 if "i2v" in task else 50
+    if trabajo.get("sample_shift") is None:
+        trabajo["sample_shift"] = 5.0
+        if "i2v" in task and trabajo["size"] in ["832*480", "480*832"]:
+            trabajo["sample_shift"] = 3.0
+        elif "vace" in task or "flf2v" in task:
+            trabajo["sample_shift"] = 16
+    if trabajo.get("sample_guide_scale") is None:
+        trabajo["sample_guide_scale"] = 5.0
+    if trabajo["semilla"] is None or trabajo["semilla"] < 0:
+        trabajo["semilla"] = random.randint(0, sys.maxsize)
+
+    return trabajo
+
+
+class MotorWan:
+    """
+    Mantiene un pipeline de Wan2.1 cargado en memoria entre trabajos.
+
+    Solo se conserva un pipeline a la vez: si un trabajo pide un checkpoint
+    distinto del cargado, el anterior se libera antes de cargar el nuevo
+    para no duplicar el uso de memoria GPU.
+    """
+
+    def __init__(self, repo_path, device_id=0, dir_cache=None):
+        """
+        Args:
+            repo_path: Ruta al repositorio Wan2.1
+            device_id: Índice de la GPU (dentro de CUDA_VISIBLE_DEVICES)
+            dir_cache: Directorio raíz de las cachés de condicionamiento
+                (None = sin caché)
+        """
+        self.repo_path = Path(repo_path)
+        self.device_id = device_id
+        self.cache_t5 = None
+        self.cache_imagen = None
+        self.clave_cargada = None
+        self.pipeline = None
+        self.config = None
+        self.tiempo_carga = 0.0
+
+        if str(self.repo_path) not in sys.path:
+            sys.path.insert(0, str(self.repo_path))
+
+        if dir_cache is not None:
+            from cache_disco import CacheDisco
+            from lanzador_generate import LIMITE_CACHE_IMAGEN_GB, LIMITE_CACHE_T5_GB
+            self.cache_t5 = CacheDisco(Path(dir_cache) / "t5", LIMITE_CACHE_T5_GB)
+            self.cache_imagen = CacheDisco(Path(dir_cache) / "imagen", LIMITE_CACHE_IMAGEN_GB)
+
+    def cargar(self, task, ckpt_dir, t5_cpu=False):
+        """
+        Carga el pipeline para (task, ckpt_dir, t5_cpu) si no está ya cargado.
+
+        Args:
+            task: Tarea de Wan2.1 ('t2v-1.3B', 'i2v-14B', 'vace-14B', ...)
+            ckpt_dir: Directorio del checkpoint
+            t5_cpu: Si True, el encoder T5 se mantiene en CPU
+
+        Returns:
+            Segundos empleados en la carga (0.0 si ya estaba cargado)
+        """
+        clave = (task, str(Path(ckpt_dir).resolve()), bool(t5_cpu))
+        if clave == self.clave_cargada:
+            return 0.0
+
+        self.liberar()
+
+        import wan
+        from wan.configs import WAN_CONFIGS
+
+        print(f"Cargando pipeline {task} desde {ckpt_dir}...")
+        inicio = time.perf_counter()
+        config = WAN_CONFIGS[task]
+        clase = getattr(wan, CLASES_PIPELINE[task.split("-")[0]])
+        with ExitStack() as pila:
+            if self.cache_t5 is not None:
+                from cache_condicionamiento import imagen_con_cache, t5_con_cache
+                pila.enter_context(t5_con_cache(self.cache_t5))
+                pila.enter_context(imagen_con_cache(self.cache_imagen))
+            self.pipeline = clase(
+                config=config,
+                checkpoint_dir=str(ckpt_dir),
+                device_id=self.device_id,
+                rank=0,
+                t5_fsdp=False,
+                dit_fsdp=False,
+                use_usp=False,
+                t5_cpu=t5_cpu,
+            )
+        self.config = config
+        self.clave_cargada = clave
+        self.tiempo_carga = time.perf_counter() - inicio
+        print(f"✓ Pipeline cargado en {self.tiempo_carga:.1f} s")
+        return self.tiempo_carga
+
+    def liberar(self):
+        """Libera el pipeline cargado y la memoria GPU asociada."""
+        if self.pipeline is None:
+            return
+        import torch
+
+        self.pipeline = None
+        self.config = None
+        self.clave_cargada = None
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def generar(self, trabajo):
+        """
+        Ejecuta un trabajo de generación con el pipeline cargado.
+
+        Args:
+            trabajo: Diccionario del trabajo (ver docstring del módulo)
+
+        Returns:
+            Diccionario con exito, salida, semilla, tiempo_carga,
+            tiempo_trabajo, error, memoria (picos y línea de tiempo de RSS
+            y GPU de este proceso) y telemetria (registro de etapas y
+            memoria, que también se guarda en <stem>_telemetria.json)
+        """
+        trabajo = valores_por_defecto(dict(trabajo))
+        resultado = {
+            "exito": False,
+            "salida": trabajo["salida"],
+            "semilla": trabajo["semilla"],
+            "tiempo_carga": 0.0,
+            "tiempo_trabajo": 0.0,
+            "error": None,
+        }
+
+        registro = RegistroTelemetria([imprimir_evento])
+        muestreador = MuestreadorMemoria(os.getpid())
+        try:
+            with ExitStack() as pila:
+                pila.enter_context(muestreador)
+                pila.enter_context(vae_por_tramos(Path(trabajo["salida"]).resolve().parent))
+                cache = None
+                if trabajo.get("cache_pasos") is not None:
+                    from cache_pasos import cache_pasos
+                    cache = pila.enter_context(
+                        cache_pasos(trabajo["cache_pasos"], trabajo["sample_steps"]))
+                pila.enter_context(telemetria(registro.emitir))
+
+                resultado["tiempo_carga"] = self.cargar(
+                    trabajo["task"], trabajo["ckpt_dir"], trabajo["t5_cpu"])
+
+                inicio = time.perf_counter()
+                video = self._ejecutar(trabajo)
+                self._guardar(video, trabajo["salida"])
+                resultado["tiempo_trabajo"] = time.perf_counter() - inicio
+            if cache is not None:
+                from cache_pasos import resumen_cache_pasos
+                resumen_cache_pasos(cache)
+                resultado["pasos_saltados"] = cache.saltados
+            resultado["exito"] = True
+        except Exception as e:
+            import traceback
+            resultado["error"] = f"{e}\n{traceback.format_exc()}"
+            print(f"✗ Error en el trabajo: {e}")
+
+        resultado["memoria"] = muestreador.resumen()
+        imprimir_resumen(resultado["memoria"])
+        resultado["telemetria"] = registro.guardar(
+            ruta_telemetria(trabajo["salida"]), salida=str(trabajo["salida"]),
+            exito=resultado["exito"], memoria=resultado["memoria"])
+        return resultado
+
+    def _ejecutar(self, trabajo):
+        """Llama a generate() del pipeline según el modo del trabajo."""
+        from wan.configs import MAX_AREA_CONFIGS, SIZE_CONFIGS
+
+        comunes = dict(
+            frame_num=trabajo["frame_num"],
+            shift=trabajo["sample_shift"],
+            sample_solver=trabajo["sample_solver"],
+            sampling_steps=trabajo["sample_steps"],
+            guide_scale=trabajo["sample_guide_scale"],
+            seed=trabajo["semilla"],
+            offload_model=trabajo["offload_model"],
+        )
+        modo = trabajo["modo"]
+
+        if modo == "t2v":
+            return self.pipeline.generate(
+                trabajo["prompt"], size=SIZE_CONFIGS[trabajo["size"]], **comunes)
+
+        if modo == "i2v":
+            from PIL import Image
+            img = Image.open(trabajo["imagen"]).convert("RGB")
+            return self.pipeline.generate(
+                trabajo["prompt"], img,
+                max_area=MAX_AREA_CONFIGS[trabajo["size"]], **comunes)
+
+        if modo == "vace":
+            size = SIZE_CONFIGS[trabajo["size"]]
+            # Una máscara estática se pasa como tensor, sin convertirla a video
+            estatica = es_imagen(trabajo["mascara"])
+            src_video, src_mask, src_ref_images = self.pipeline.prepare_source(
+                [trabajo["video_base"]], [None if estatica else trabajo["mascara"]], [None],
+                trabajo["frame_num"], size, self.pipeline.device)
+            if estatica:
+                info = sondear_video(trabajo["video_base"])
+                src_mask[0] = tensor_mascara(trabajo["mascara"], info["ancho"], info["alto"],
+                                             src_video[0])
+            return self.pipeline.generate(
+                trabajo["prompt"], src_video, src_mask, src_ref_images,
+                size=size, **comunes)
+
+        raise ValueError(f"Modo de trabajo desconocido: {modo}")
+
+    def _guardar(self, video, salida):
+        """
+        Guarda el tensor de video como MP4 con la utilidad de Wan2.1.
+
+        Se escribe en un temporal junto a la salida y se publica con un
+        rename atómico, igual que en ejecucion_wan.ejecutar_generate. Si el
+        VAE ya lo escribió por tramos (VideoEnStreaming) solo se publica.
+        """
+        from wan.utils.utils import cache_video
+
+        if isinstance(video, VideoEnStreaming):
+            if not publicar_salida(video.ruta, salida):
+                raise RuntimeError(f"No se pudo escribir el video en {salida}")
+            return
+
+        temporal = ruta_temporal(salida)
+        try:
+            cache_video(
+                tensor=video[None],
+                save_file=str(temporal),
+                fps=self.config.sample_fps,
+                nrow=1,
+                normalize=True,
+                value_range=(-1, 1),
+            )
+        except BaseException:
+            if temporal.exists():
+                temporal.unlink()
+            raise
+        if not publicar_salida(temporal, salida):
+            raise RuntimeError(f"No se pudo escribir el video en {salida}")
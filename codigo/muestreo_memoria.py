@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Muestreo de memoria en segundo plano durante una generación.
+
+Un hilo consulta cada cierto intervalo la memoria residente (RSS) de un
+proceso y de todos sus descendientes (generate.py, los workers de
+torchrun, ffmpeg...) y la memoria de GPU, y guarda la línea de tiempo y
+los picos. A diferencia de limpiar_memoria.py, que solo ve el proceso
+actual, aquí se mide el proceso que realmente genera.
+
+Backends de GPU:
+    GPUNvml   NVML (paquete nvidia-ml-py / pynvml). Mide la memoria usada
+              en las GPUs visibles y, si NVML lo permite, la de los
+              procesos del árbol
+    GPUFalsa  valores fijados de antemano, para probar sin GPU
+    None      solo RSS
+
+El intervalo se puede cambiar con la variable WAN_INTERVALO_MEMORIA
+(segundos; 0 desactiva el muestreo).
+
+Uso:
+    with MuestreadorMemoria(proceso.pid) as muestreador:
+        proceso.wait()
+    registro["memoria"] = muestreador.resumen()
+
+    # Prueba sin GPU: muestrea un proceso hijo que reserva memoria
+    python muestreo_memoria.py --prueba
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+INTERVALO_POR_DEFECTO = 0.5
+VARIABLE_INTERVALO = "WAN_INTERVALO_MEMORIA"
+
+# Número máximo de muestras de la línea de tiempo del registro (se diezma)
+MAXIMO_MUESTRAS = 600
+
+
+def intervalo_configurado():
+    """Intervalo de muestreo en segundos (WAN_INTERVALO_MEMORIA o el default)."""
+    valor = os.environ.get(VARIABLE_INTERVALO)
+    return float(valor) if valor else INTERVALO_POR_DEFECTO
+
+
+def arbol_procesos(pid):
+    """
+    PIDs de un proceso y todos sus descendientes (a partir de /proc).
+
+    Args:
+        pid: Proceso raíz
+
+    Returns:
+        Lista de PIDs (vacía si el proceso ya no existe)
+    """
+    hijos = {}
+    for entrada in os.scandir("/proc"):
+        if not entrada.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada.name}/stat") as archivo:
+                # El nombre del comando va entre paréntesis y puede contener espacios
+                campos = archivo.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        hijos.setdefault(int(campos[1]), []).append(int(entrada.name))
+
+    if not Path(f"/proc/{pid}").exists():
+        return []
+    arbol, pendientes = [], [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        arbol.append(actual)
+        pendientes.extend(hijos.get(actual, []))
+    return arbol
+
+
+def rss_mb(pid):
+    """Memoria residente de un proceso en MB (0 si ya terminó)."""
+    try:
+        with open(f"/proc/{pid}/statm") as archivo:
+            paginas = int(archivo.read().split()[1])
+    except OSError:
+        return 0.0
+    return paginas * os.sysconf("SC_PAGE_SIZE") / (1024 ** 2)
+
+
+class GPUNvml:
+    """Memoria de GPU con NVML."""
+
+    def __init__(self, indices=None):
+        """
+        Args:
+            indices: Índices NVML de las GPUs a medir (None = las de
+                CUDA_VISIBLE_DEVICES si son números, si no todas)
+        """
+        import pynvml
+
+        self.nvml = pynvml
+        pynvml.nvmlInit()
+        if indices is None:
+            visibles = os.environ.get("CUDA_VISIBLE_DEVICES", "")
+            if visibles and all(v.strip().isdigit() for v in visibles.split(",")):
+                indices = [int(v) for v in visibles.split(",")]
+            else:
+                indices = range(pynvml.nvmlDeviceGetCount())
+        self.dispositivos = [pynvml.nvmlDeviceGetHandleByIndex(i) for i in indices]
+
+    def muestrear(self, pids):
+        """
+        Args:
+            pids: PIDs del árbol de procesos
+
+        Returns:
+            Diccionario con gpu_mb (memoria usada en las GPUs medidas) y
+            gpu_procesos_mb (la de los procesos del árbol, None si NVML no
+            los ve, p. ej. dentro de un contenedor con otro espacio de PIDs)
+        """
+        usada = 0.0
+        de_procesos = None
+        pids = set(pids)
+        for dispositivo in self.dispositivos:
+            usada += self.nvml.nvmlDeviceGetMemoryInfo(dispositivo).used / (1024 ** 2)
+            try:
+                procesos = self.nvml.nvmlDeviceGetComputeRunningProcesses(dispositivo)
+            except self.nvml.NVMLError:
+                continue
+            for proceso in procesos:
+                if proceso.pid in pids and proceso.usedGpuMemory:
+                    de_procesos = (de_procesos or 0.0) + proceso.usedGpuMemory / (1024 ** 2)
+        return {"gpu_mb": usada, "gpu_procesos_mb": de_procesos}
+
+    def cerrar(self):
+        self.nvml.nvmlShutdown()
+
+
+class GPUFalsa:
+    """Backend de GPU con valores fijados de antemano (pruebas sin GPU)."""
+
+    def __init__(self, valores_mb):
+        """
+        Args:
+            valores_mb: Memoria usada en cada muestra; se repite el último
+        """
+        self.valores = list(valores_mb)
+        self.indice = 0
+
+    def muestrear(self, pids):
+        valor = self.valores[min(self.indice, len(self.valores) - 1)]
+        self.indice += 1
+        return {"gpu_mb": float(valor), "gpu_procesos_mb": float(valor)}
+
+    def cerrar(self):
+        pass
+
+
+def backend_gpu_por_defecto():
+    """GPUNvml si NVML está disponible; si no, None (solo RSS)."""
+    try:
+        return GPUNvml()
+    except Exception:
+        return None
+
+
+class MuestreadorMemoria:
+    """
+    Hilo que muestrea la memoria de un árbol de procesos mientras está activo.
+
+    Se usa como contexto: el muestreo empieza al entrar y termina (con una
+    última muestra) al salir.
+    """
+
+    def __init__(self, pid, intervalo=None, gpu="auto"):
+        """
+        Args:
+            pid: Proceso raíz (el subproceso de generate.py o el propio)
+            intervalo: Segundos entre muestras (None = intervalo_configurado())
+            gpu: Backend de GPU, None para no medir GPU o 'auto' para NVML
+                si está disponible
+        """
+        self.pid = pid
+        self.intervalo = intervalo_configurado() if intervalo is None else intervalo
+        self.gpu = backend_gpu_por_defecto() if gpu == "auto" else gpu
+        self.muestras = []
+        self._inicio = None
+        self._parar = threading.Event()
+        self._hilo = None
+
+    @property
+    def activo(self):
+        """False si el muestreo está desactivado (intervalo 0) o no hay /proc."""
+        return self.intervalo > 0 and Path("/proc").is_dir()
+
+    def muestrear(self):
+        """Toma una muestra y la añade a la línea de tiempo (None si el proceso terminó)."""
+        pids = arbol_procesos(self.pid)
+        if not pids:
+            return None
+        muestra = {
+            "t": round(time.perf_counter() - self._inicio, 3),
+            "rss_mb": round(sum(rss_mb(p) for p in pids), 1),
+            "procesos": len(pids),
+        }
+        if self.gpu is not None:
+            for clave, valor in self.gpu.muestrear(pids).items():
+                muestra[clave] = None if valor is None else round(valor, 1)
+        self.muestras.append(muestra)
+        return muestra
+
+    def _bucle(self):
+        while not self._parar.wait(self.intervalo):
+            self.muestrear()
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        if self.activo:
+            self.muestrear()
+            self._hilo = threading.Thread(target=self._bucle, daemon=True)
+            self._hilo.start()
+        return self
+
+    def __exit__(self, *excepcion):
+        if self._hilo is not None:
+            self._parar.set()
+            self._hilo.join()
+            self.muestrear()
+        if self.gpu is not None:
+            self.gpu.cerrar()
+        return False
+
+    def resumen(self):
+        """
+        Returns:
+            Diccionario con el intervalo, los picos, la RSS inicial y final
+            y la línea de tiempo (diezmada a MAXIMO_MUESTRAS, conservando
+            las muestras de los picos); None si no se muestreó
+        """
+        if not self.muestras:
+            return None
+
+        def pico(clave):
+            valores = [m[clave] for m in self.muestras if m.get(clave) is not None]
+            return max(valores) if valores else None
+
+        paso = -(-len(self.muestras) // MAXIMO_MUESTRAS)
+        linea = self.muestras[::paso]
+        for clave in ("rss_mb", "gpu_mb"):
+            valor = pico(clave)
+            if valor is not None:
+                maxima = next(m for m in self.muestras if m.get(clave) == valor)
+                if maxima not in linea:
+                    linea.append(maxima)
+        linea.sort(key=lambda m: m["t"])
+
+        return {
+            "intervalo": self.intervalo,
+            "pico_rss_mb": pico("rss_mb"),
+            "pico_gpu_mb": pico("gpu_mb"),
+            "pico_gpu_procesos_mb": pico("gpu_procesos_mb"),
+            "rss_inicial_mb": self.muestras[0]["rss_mb"],
+            "rss_final_mb": self.muestras[-1]["rss_mb"],
+            "muestras": linea,
+        }
+
+
+def imprimir_resumen(resumen):
+    """Muestra los picos de memoria de una generación."""
+    if not resumen:
+        return
+    texto = f"ℹ Memoria: pico RSS {resumen['pico_rss_mb'] / 1024:.2f} GB"
+    if resumen["pico_gpu_mb"] is not None:
+        texto += f", pico GPU {resumen['pico_gpu_mb'] / 1024:.2f} GB"
+    print(texto)
+
+
+def prueba(megas=300, segundos=2.0, intervalo=0.1):
+    """
+    Muestrea un proceso hijo (con un nieto) que reserva memoria, con GPU falsa.
+
+    Returns:
+        Resumen del muestreo
+    """
+    codigo = (
+        "import subprocess, sys, time\n"
+        f"nieto = subprocess.Popen([sys.executable, '-c', 'import time; b = bytearray({megas // 2} * 2**20); time.sleep({segundos})'])\n"
+        f"datos = bytearray({megas // 2} * 2**20)\n"
+        f"time.sleep({segundos})\n"
+        "nieto.wait()\n"
+    )
+    gpu = GPUFalsa([1000, 4000, 9000, 9000, 2000])
+    with subprocess.Popen([sys.executable, "-c", codigo]) as proceso:
+        with MuestreadorMemoria(proceso.pid, intervalo, gpu=gpu) as muestreador:
+            proceso.wait()
+    resumen = muestreador.resumen()
+    print(f"  {len(resumen['muestras'])} muestras cada {intervalo} s, "
+          f"hasta {max(m['procesos'] for m in resumen['muestras'])} procesos")
+    imprimir_resumen(resumen)
+    return resumen
+
+
+def main():
+    """Prueba del muestreador sin GPU."""
+    parser = argparse.ArgumentParser(
+        description="Muestreo de memoria (RSS del árbol de procesos y GPU) durante una generación"
+    )
+    parser.add_argument("--prueba", action="store_true",
+                       help="Muestrear un proceso de prueba que reserva memoria (GPU falsa)")
+    parser.add_argument("--megas", type=int, default=300,
+                       help="MB que reserva el proceso de prueba")
+    args = parser.parse_args()
+
+    if args.prueba:
+        prueba(args.megas)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
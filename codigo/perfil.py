@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Perfilado de una generación con torch.profiler y cProfile.
+
+El contexto perfil() ejecuta el bloque bajo torch.profiler (CPU y, si hay
+GPU, kernels CUDA y copias host-dispositivo, donde aparece el tráfico de
+--offload_model) y bajo cProfile (orquestación en Python). Al terminar
+escribe junto a la salida:
+    <stem>_perfil_traza.json  traza Chrome/Perfetto (chrome://tracing o
+                              https://ui.perfetto.dev)
+    <stem>_perfil.txt         resumen: los N operadores con más tiempo
+                              propio y las N funciones de Python con más
+                              tiempo acumulado
+    <stem>_perfil.pstats      datos de cProfile (snakeviz, pstats)
+
+Con la telemetría activa (telemetria.py) cada etapa aparece en la traza
+como un rango etapa::<nombre> (codificar_texto, decodificar_vae...).
+
+Solo se importa cuando se pide --perfil, así que sin la opción no añade
+ningún coste.
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import cProfile
+import io
+import pstats
+from contextlib import contextmanager
+from pathlib import Path
+
+
+TOP_POR_DEFECTO = 30
+
+
+def rutas_perfil(salida):
+    """
+    Rutas de los archivos de perfil de un video.
+
+    Returns:
+        Tupla (traza, resumen, pstats)
+    """
+    salida = Path(salida)
+    return (
+        salida.with_name(f"{salida.stem}_perfil_traza.json"),
+        salida.with_name(f"{salida.stem}_perfil.txt"),
+        salida.with_name(f"{salida.stem}_perfil.pstats"),
+    )
+
+
+class MarcasEtapas:
+    """
+    Consumidor de eventos de telemetría que abre un rango de
+    torch.profiler.record_function por cada etapa en curso.
+    """
+
+    def __init__(self):
+        self.abiertas = {}
+
+    def emitir(self, evento):
+        from torch.profiler import record_function
+
+        if evento["tipo"] != "etapa":
+            return
+        if evento["estado"] == "inicio":
+            rango = record_function(f"etapa::{evento['etapa']}")
+            rango.__enter__()
+            self.abiertas[evento["etapa"]] = rango
+        elif evento["etapa"] in self.abiertas:
+            self.abiertas.pop(evento["etapa"]).__exit__(None, None, None)
+
+
+def _resumen_python(perfilador, top):
+    """Tabla de pstats con las funciones de más tiempo acumulado."""
+    texto = io.StringIO()
+    pstats.Stats(perfilador, stream=texto).sort_stats("cumulative").print_stats(top)
+    return texto.getvalue()
+
+
+@contextmanager
+def perfil(salida, top=TOP_POR_DEFECTO):
+    """
+    Perfila el bloque y escribe la traza y el resumen junto a la salida.
+
+    Los archivos se escriben también si el bloque lanza una excepción.
+
+    Args:
+        salida: Ruta del video (define el nombre de los archivos de perfil)
+        top: Número de operadores y funciones del resumen
+
+    Yields:
+        MarcasEtapas, para pasarle los eventos de telemetría
+    """
+    import torch
+    from torch.profiler import ProfilerActivity, profile
+
+    con_cuda = torch.cuda.is_available()
+    actividades = [ProfilerActivity.CPU]
+    if con_cuda:
+        actividades.append(ProfilerActivity.CUDA)
+
+    traza, resumen, ruta_pstats = rutas_perfil(salida)
+    marcas = MarcasEtapas()
+    perfilador_python = cProfile.Profile()
+    perfilador_torch = profile(activities=actividades)
+
+    print(f"ℹ Perfilando la generación ({'CPU + CUDA' if con_cuda else 'CPU'})")
+    perfilador_torch.__enter__()
+    perfilador_python.enable()
+    try:
+        yield marcas
+    finally:
+        perfilador_python.disable()
+        for rango in list(marcas.abiertas.values()):
+            rango.__exit__(None, None, None)
+        perfilador_torch.__exit__(None, None, None)
+
+        traza.parent.mkdir(parents=True, exist_ok=True)
+        perfilador_torch.export_chrome_trace(str(traza))
+        perfilador_python.dump_stats(str(ruta_pstats))
+
+        orden = "self_cuda_time_total" if con_cuda else "self_cpu_time_total"
+        tabla = perfilador_torch.key_averages().table(sort_by=orden, row_limit=top)
+        resumen.write_text(
+            f"Perfil de {salida}\n\n"
+            f"== Operadores (torch.profiler, por {orden}) ==\n{tabla}\n\n"
+            f"== Python (cProfile, por tiempo acumulado) ==\n"
+            f"{_resumen_python(perfilador_python, top)}",
+            encoding="utf-8",
+        )
+        print(f"✓ Traza del perfil: {traza}")
+        print(f"✓ Resumen del perfil: {resumen}")
@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Planificador de trabajos de generación sobre varias GPUs.
+
+seleccionar_gpu.py elige una sola GPU al arrancar el contenedor y el resto
+de tarjetas quedan sin uso. Este planificador mantiene una cola de trabajos
+y coloca cada uno en una GPU con memoria libre suficiente según el modelo
+de memoria de planificador_memoria.py, ejecutando trabajos en paralelo en
+todas las tarjetas.
+
+Cada trabajo se lanza como un proceso independiente con
+CUDA_VISIBLE_DEVICES fijado a su GPU. Los trabajos usan el mismo formato
+JSONL que generar_video.py --lote.
+
+Uso:
+    # Repartir un lote entre todas las GPUs
+    python planificador_gpu.py --lote trabajos.jsonl
+
+    # Probar la planificación sin GPUs (tarjetas falsas de 24 y 80 GB)
+    python planificador_gpu.py --lote trabajos.jsonl --gpus_falsas 24,80 --simular 2
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+# Margen que se deja libre en cada GPU (GB)
+MARGEN_GB = 1.0
+
+
+def memoria_requerida(trabajo):
+    """
+    Estima la memoria GPU que necesita un trabajo del lote.
+
+    Si el trabajo no fija offload_model ni t5_cpu se reserva la configuración
+    más ligera; el proceso hijo planifica dentro de esa reserva (WAN_MEMORIA_GB).
+
+    Args:
+        trabajo: Diccionario en el formato de generar_video.py --lote
+
+    Returns:
+        Memoria en GB
+    """
+    if trabajo.get("memoria_gb") is not None:
+        return float(trabajo["memoria_gb"])
+
+    from generar_video import CKPT_POR_DEFECTO, determinar_tarea
+    from planificador_memoria import CALIBRACION, estimar
+
+    resolucion = trabajo.get("resolucion", "832x480")
+    ckpt_dir = trabajo.get("ckpt_dir") or CKPT_POR_DEFECTO[(trabajo["modo"], resolucion)]
+    task, size = determinar_tarea(trabajo["modo"], ckpt_dir, resolucion)
+    fijado = "offload_model" in trabajo or "t5_cpu" in trabajo
+    estimacion = estimar(task, size, trabajo.get("frame_num") or 81,
+                         trabajo.get("offload_model", False) if fijado else True,
+                         trabajo.get("t5_cpu", False) if fijado else True,
+                         trabajo.get("sample_steps"))
+    return estimacion["pico_gb"] + CALIBRACION["margen_gb"]
+
+
+class InventarioGPU:
+    """Inventario de GPUs reales (todas, con su índice físico: el planificador fija CUDA_VISIBLE_DEVICES)."""
+
+    def obtener(self):
+        """
+        Returns:
+            Lista de diccionarios con 'id' y 'free_memory_gb'
+        """
+        from seleccionar_gpu import obtener_info_gpus
+        return obtener_info_gpus(solo_visibles=False)
+
+
+class InventarioFalso:
+    """Inventario simulado para probar la planificación en una máquina sin GPU."""
+
+    def __init__(self, memorias_gb):
+        """
+        Args:
+            memorias_gb: Lista con la memoria libre (GB) de cada GPU falsa
+        """
+        self.memorias_gb = list(memorias_gb)
+
+    def obtener(self):
+        return [
+            {"id": i, "name": f"GPU falsa {i}", "free_memory_gb": memoria,
+             "total_memory_gb": memoria, "reserved_memory_gb": 0.0}
+            for i, memoria in enumerate(self.memorias_gb)
+        ]
+
+
+class PlanificadorGPU:
+    """
+    Cola de trabajos que se reparten entre las GPUs según su memoria libre.
+
+    La memoria disponible se lee del inventario una vez al empezar y el
+    planificador lleva la cuenta de lo que reserva cada trabajo en marcha.
+    Así no depende de cuándo el proceso hijo llega a reservar su memoria.
+    """
+
+    def __init__(self, inventario, ejecutor, margen_gb=MARGEN_GB):
+        """
+        Args:
+            inventario: Objeto con obtener() -> lista de GPUs (InventarioGPU o InventarioFalso)
+            ejecutor: Función (trabajo, gpu_id) -> diccionario de resultado
+            margen_gb: Memoria que se deja libre en cada GPU
+        """
+        self.inventario = inventario
+        self.ejecutor = ejecutor
+        self.margen_gb = margen_gb
+        self.cola = []
+        self.resultados = []
+        self._condicion = threading.Condition()
+
+    def encolar(self, trabajo, memoria_gb=None):
+        """
+        Añade un trabajo a la cola.
+
+        Args:
+            trabajo: Diccionario del trabajo
+            memoria_gb: Memoria requerida (default: según memoria_requerida)
+
+        Returns:
+            Índice del trabajo en la cola
+        """
+        if memoria_gb is None:
+            memoria_gb = memoria_requerida(trabajo)
+        self.cola.append((len(self.cola), trabajo, memoria_gb))
+        return len(self.cola) - 1
+
+    def _elegir_gpu(self, memoria_gb, disponible, excluidas=()):
+        """
+        Elige la GPU con menos memoria disponible que tenga suficiente.
+
+        Con el mejor ajuste los trabajos pequeños no ocupan la tarjeta
+        grande que necesitan los modelos 14B.
+        """
+        candidatas = [g for g, libre in disponible.items()
+                      if libre >= memoria_gb and g not in excluidas]
+        if not candidatas:
+            return None
+        return min(candidatas, key=lambda g: disponible[g])
+
+    def ejecutar(self):
+        """
+        Ejecuta todos los trabajos de la cola y espera a que terminen.
+
+        Un trabajo que no cabe ahora se salta y se reintenta cuando termina
+        otro, para que un trabajo grande no bloquee a los pequeños. Para que
+        el trabajo grande tampoco espere indefinidamente, la GPU donde cabrá
+        queda reservada: no recibe trabajos posteriores hasta que él arranque.
+
+        Returns:
+            Lista de resultados en el orden de la cola
+        """
+        gpus = self.inventario.obtener()
+        if not gpus:
+            print("✗ No se encontraron GPUs disponibles")
+            return []
+
+        disponible = {g["id"]: g["free_memory_gb"] - self.margen_gb for g in gpus}
+        capacidad = dict(disponible)
+        maximo = max(capacidad.values())
+        print(f"✓ {len(gpus)} GPU(s): " + ", ".join(
+            f"GPU {g} ({libre:.1f} GB)" for g, libre in disponible.items()))
+
+        pendientes = []
+        resultados = {}
+        for indice, trabajo, memoria_gb in self.cola:
+            if memoria_gb > maximo:
+                print(f"✗ Trabajo {indice}: necesita {memoria_gb:.1f} GB, ninguna GPU tiene tanta memoria")
+                resultados[indice] = {"indice": indice, "exito": False,
+                                      "error": f"Memoria insuficiente ({memoria_gb:.1f} GB)"}
+            else:
+                pendientes.append((indice, trabajo, memoria_gb))
+
+        en_curso = 0
+        hilos = []
+
+        def correr(indice, trabajo, memoria_gb, gpu_id):
+            nonlocal en_curso
+            inicio = time.perf_counter()
+            try:
+                resultado = self.ejecutor(trabajo, gpu_id)
+            except Exception as e:
+                resultado = {"exito": False, "error": str(e)}
+            resultado = {"indice": indice, "gpu": gpu_id,
+                         "tiempo_total": time.perf_counter() - inicio, **resultado}
+            with self._condicion:
+                disponible[gpu_id] += memoria_gb
+                en_curso -= 1
+                resultados[indice] = resultado
+                estado = "✓" if resultado.get("exito") else "✗"
+                print(f"{estado} Trabajo {indice} terminado en GPU {gpu_id} ({resultado['tiempo_total']:.1f} s)")
+                self._condicion.notify_all()
+
+        with self._condicion:
+            while pendientes or en_curso:
+                lanzados = False
+                reservadas = set()
+                for elemento in list(pendientes):
+                    indice, trabajo, memoria_gb = elemento
+                    gpu_id = self._elegir_gpu(memoria_gb, disponible, reservadas)
+                    if gpu_id is None:
+                        reserva = self._elegir_gpu(memoria_gb, capacidad, reservadas)
+                        if reserva is not None:
+                            reservadas.add(reserva)
+                        continue
+                    disponible[gpu_id] -= memoria_gb
+                    en_curso += 1
+                    pendientes.remove(elemento)
+                    print(f"→ Trabajo {indice} en GPU {gpu_id} ({memoria_gb:.1f} GB)")
+                    hilo = threading.Thread(target=correr, args=(indice, trabajo, memoria_gb, gpu_id),
+                                            daemon=True)
+                    hilo.start()
+                    hilos.append(hilo)
+                    lanzados = True
+                if not lanzados:
+                    self._condicion.wait()
+
+        for hilo in hilos:
+            hilo.join()
+
+        self.resultados = [resultados[i] for i in sorted(resultados)]
+        return self.resultados
+
+
+def ejecutor_subproceso(trabajo, gpu_id):
+    """
+    Ejecuta un trabajo con generar_video.py --lote en un proceso fijado a una GPU.
+
+    Args:
+        trabajo: Diccionario en el formato de generar_video.py --lote
+        gpu_id: GPU en la que ejecutar (se fija con CUDA_VISIBLE_DEVICES)
+
+    Returns:
+        Diccionario de resultado escrito por generar_video.py
+    """
+    script = Path(__file__).resolve().parent / "generar_video.py"
+    with tempfile.TemporaryDirectory(prefix="wan_planificador_") as tmp:
+        lote = Path(tmp) / "trabajo.jsonl"
+        resultados = Path(tmp) / "resultado.jsonl"
+        lote.write_text(json.dumps(trabajo, ensure_ascii=False) + "\n", encoding="utf-8")
+
+        env = os.environ.copy()
+        env["CUDA_VISIBLE_DEVICES"] = str(gpu_id)
+        env["WAN_MEMORIA_GB"] = f"{memoria_requerida(trabajo):.2f}"
+        proceso = subprocess.run(
+            [sys.executable, str(script), "--lote", str(lote), "--resultados_lote", str(resultados)],
+            env=env,
+        )
+
+        if resultados.exists():
+            lineas = resultados.read_text(encoding="utf-8").splitlines()
+            if lineas:
+                return json.loads(lineas[0])
+        return {"exito": False, "error": f"generar_video.py terminó con código {proceso.returncode}"}
+
+
+def ejecutor_simulado(segundos):
+    """
+    Crea un ejecutor que solo espera, para probar la planificación sin GPU.
+
+    Args:
+        segundos: Duración simulada de cada trabajo
+
+    Returns:
+        Función ejecutora (trabajo, gpu_id) -> resultado
+    """
+    def ejecutor(trabajo, gpu_id):
+        time.sleep(trabajo.get("duracion_simulada", segundos))
+        return {"exito": True, "salida": trabajo.get("salida")}
+    return ejecutor
+
+
+def main():
+    """Función principal del planificador."""
+    parser = argparse.ArgumentParser(
+        description="Reparte trabajos de generación entre todas las GPUs disponibles"
+    )
+    parser.add_argument("--lote", type=str, required=True,
+                       help="Archivo JSONL con un trabajo por línea (formato de generar_video.py --lote)")
+    parser.add_argument("--resultados", type=str, default=None,
+                       help="Archivo JSONL de resultados (default: <lote>_planificador.jsonl)")
+    parser.add_argument("--margen_gb", type=float, default=MARGEN_GB,
+                       help="Memoria que se deja libre en cada GPU")
+    parser.add_argument("--gpus_falsas", type=str, default=None,
+                       help="Usar GPUs simuladas con la memoria libre indicada (ej: 24,24,80)")
+    parser.add_argument("--simular", type=float, default=None,
+                       help="No generar: cada trabajo espera estos segundos (para probar la planificación)")
+
+    args = parser.parse_args()
+
+    if args.gpus_falsas:
+        inventario = InventarioFalso([float(m) for m in args.gpus_falsas.split(",")])
+    else:
+        inventario = InventarioGPU()
+
+    ejecutor = ejecutor_simulado(args.simular) if args.simular is not None else ejecutor_subproceso
+    planificador = PlanificadorGPU(inventario, ejecutor, args.margen_gb)
+
+    # Cada línea se valida como en generar_video.py --lote: una línea
+    # inválida se anota como trabajo fallido y no detiene el resto
+    from generar_video import preparar_trabajo_lote
+
+    ruta_lote = Path(args.lote)
+    errores = []
+    with open(ruta_lote, encoding="utf-8") as f:
+        for numero, linea in enumerate(f, start=1):
+            linea = linea.strip()
+            if not linea or linea.startswith("#"):
+                continue
+            try:
+                entrada = json.loads(linea)
+                preparar_trabajo_lote(entrada, sin_optimizaciones=True)
+                planificador.encolar(entrada)
+            except (ValueError, KeyError) as e:
+                errores.append({"linea": numero, "exito": False, "error": str(e)})
+                print(f"✗ Línea {numero}: {e}")
+
+    print(f"\nPlanificando {len(planificador.cola)} trabajos...")
+    inicio = time.perf_counter()
+    resultados = planificador.ejecutar()
+    duracion = time.perf_counter() - inicio
+
+    ruta_resultados = Path(args.resultados or ruta_lote.with_name(f"{ruta_lote.stem}_planificador.jsonl"))
+    resultados = errores + resultados
+    with open(ruta_resultados, "w", encoding="utf-8") as f:
+        for resultado in resultados:
+            f.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+    exitosos = sum(1 for r in resultados if r.get("exito"))
+    print(f"\n✓ {exitosos}/{len(resultados)} trabajos completados en {duracion:.1f} s")
+    print(f"  Resultados: {ruta_resultados}")
+    sys.exit(0 if exitosos == len(resultados) else 1)
+
+
+if __name__ == "__main__":
+    main()
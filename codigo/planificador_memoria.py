@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Planificador de memoria GPU para la generación con Wan 2.1.
+
+Estima el pico de VRAM y el tiempo de ejecución de un trabajo según la
+tarea, el tamaño y el número de frames, y elige la configuración más
+rápida que cabe en la memoria libre de la GPU:
+
+    1. todo en GPU
+    2. --t5_cpu
+    3. --offload_model
+    4. --offload_model + --t5_cpu
+    5. menos frames (solo T2V) o menor resolución
+
+Modelo de memoria (GB): el DiT se carga en fp32 (Wan2.1 no lo convierte a
+bf16, usa autocast) y pasa a la GPU al crear el pipeline, el T5 umt5-xxl
+está en bf16 y el VAE es pequeño. El pico es el máximo de tres fases:
+    - texto: DiT + T5 (salvo --t5_cpu) + CLIP en I2V
+    - denoising: DiT + activaciones, más T5 y CLIP si no hay offload
+    - decodificación VAE: activaciones del VAE, más DiT, T5 y CLIP si no
+      hay offload
+
+Las constantes de CALIBRACION parten de las cifras publicadas de Wan2.1
+(1.3B a 480p con offload y t5_cpu: 8.19 GB) y se pueden ajustar con un
+archivo JSON medido en la propia máquina (--calibracion).
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import json
+import os
+
+from lanzamiento_distribuido import tokens_por_clip
+
+
+CALIBRACION = {
+    # Pesos en GPU (GB)
+    "pesos_dit_gb": {"1.3B": 5.7, "14B": 57.0},
+    "pesos_t5_gb": 11.4,
+    "pesos_clip_gb": 1.3,
+    "pesos_vae_gb": 0.5,
+    "contexto_cuda_gb": 0.8,
+    # Activaciones del DiT por cada 1000 tokens latentes (GB)
+    "activaciones_dit_gb_por_ktoken": {"1.3B": 0.04, "14B": 0.14},
+    # Activaciones del VAE al decodificar, por megapíxel de frame (GB)
+    "activaciones_vae_gb_por_mpx": 8.5,
+    # Segundos por paso de denoising (con CFG) a 480p y 81 frames (32760 tokens)
+    "segundos_por_paso_ref": {"1.3B": 4.8, "14B": 45.0},
+    "tokens_ref": 32760,
+    # La atención crece más que linealmente con los tokens
+    "exponente_tokens": 1.3,
+    # Penalizaciones de tiempo (segundos)
+    "segundos_t5_cpu": 25.0,
+    "gb_por_segundo_pcie": 20.0,
+    # Margen de seguridad sobre la estimación
+    "margen_gb": 1.5,
+}
+
+# Configuraciones de memoria, de la más rápida a la más lenta
+CONFIGURACIONES = [
+    {"offload_model": False, "t5_cpu": False},
+    {"offload_model": False, "t5_cpu": True},
+    {"offload_model": True, "t5_cpu": False},
+    {"offload_model": True, "t5_cpu": True},
+]
+
+# Reducciones que se prueban si ninguna configuración cabe
+FRAMES_REDUCIDOS = [61, 49, 33]
+SIZES_REDUCIDOS = {"1280*720": "832*480", "720*1280": "480*832"}
+
+
+def cargar_calibracion(ruta=None):
+    """
+    Devuelve la calibración por defecto, actualizada con un archivo JSON.
+
+    Args:
+        ruta: Archivo JSON con las claves de CALIBRACION a sobrescribir
+
+    Returns:
+        Diccionario de calibración
+    """
+    calibracion = json.loads(json.dumps(CALIBRACION))
+    if ruta:
+        with open(ruta, encoding="utf-8") as f:
+            calibracion.update(json.load(f))
+    return calibracion
+
+
+def estimar(task, size, frame_num, offload_model, t5_cpu, sample_steps=None, calibracion=None,
+            muestras=1):
+    """
+    Estima el pico de VRAM y el tiempo de un trabajo.
+
+    Args:
+        task: Tarea de Wan2.1 ('t2v-1.3B', 'i2v-14B', 'vace-14B', ...)
+        size: Tamaño en formato de generate.py ("832*480")
+        frame_num: Número de frames
+        offload_model: Si se usa --offload_model
+        t5_cpu: Si se usa --t5_cpu
+        sample_steps: Pasos de denoising (default: 40 para I2V, 50 para el resto)
+        calibracion: Diccionario de calibración (default: CALIBRACION)
+        muestras: Semillas denoisadas a la vez en el mismo forward (ver
+            variaciones_semilla.py); multiplica activaciones y tiempo por paso
+
+    Returns:
+        Diccionario con pico_gb, fases (GB por fase) y segundos estimados
+    """
+    c = calibracion or CALIBRACION
+    modelo = task.split("-")[-1]
+    modo = task.split("-")[0]
+    if sample_steps is None:
+        sample_steps = 40 if modo == "i2v" else 50
+
+    ancho, alto = (int(v) for v in size.split("*"))
+    _, _, tokens = tokens_por_clip(size, frame_num)
+
+    dit = c["pesos_dit_gb"][modelo]
+    t5 = 0.0 if t5_cpu else c["pesos_t5_gb"]
+    clip = c["pesos_clip_gb"] if modo == "i2v" else 0.0
+    vae = c["pesos_vae_gb"]
+    ctx = c["contexto_cuda_gb"]
+    act_dit = c["activaciones_dit_gb_por_ktoken"][modelo] * tokens / 1000 * muestras
+    # VACE procesa además el video de contexto: ~1.5x activaciones
+    if modo == "vace":
+        act_dit *= 1.5
+    act_vae = c["activaciones_vae_gb_por_mpx"] * (ancho * alto) / 1e6
+
+    # Con --offload_model, T5 y CLIP se mueven a CPU tras codificar y el
+    # DiT tras el denoising
+    residente_dit = 0.0 if offload_model else dit
+    residente_t5 = 0.0 if offload_model else t5
+    residente_clip = 0.0 if offload_model else clip
+
+    fases = {
+        "texto": ctx + dit + t5 + clip + vae,
+        "denoising": ctx + dit + act_dit + residente_t5 + residente_clip + vae,
+        "decodificacion": ctx + vae + act_vae + residente_dit + residente_t5 + residente_clip,
+    }
+    pico = max(fases.values())
+
+    segundos_paso = c["segundos_por_paso_ref"][modelo] * (tokens / c["tokens_ref"]) ** c["exponente_tokens"]
+    segundos = sample_steps * segundos_paso * muestras
+    if t5_cpu:
+        segundos += c["segundos_t5_cpu"]
+    if offload_model:
+        # Mover T5, CLIP y DiT a CPU tras usarlos
+        segundos += (dit + t5 + clip) / c["gb_por_segundo_pcie"]
+
+    return {"pico_gb": pico, "fases": fases, "segundos": segundos, "tokens": tokens}
+
+
+def planificar(task, size, frame_num, memoria_libre_gb, permitir_reducir=True,
+               sample_steps=None, calibracion=None):
+    """
+    Elige la configuración más rápida que cabe en la memoria libre.
+
+    Args:
+        task: Tarea de Wan2.1
+        size: Tamaño en formato de generate.py
+        frame_num: Número de frames
+        memoria_libre_gb: Memoria libre de la GPU
+        permitir_reducir: Si True, se prueban menos frames (T2V) o menor
+            resolución cuando ninguna configuración cabe
+        sample_steps: Pasos de denoising
+        calibracion: Diccionario de calibración
+
+    Returns:
+        Diccionario con offload_model, t5_cpu, size, frame_num, pico_gb,
+        segundos y cabe. Si nada cabe se devuelve la configuración más
+        ligera con el tamaño y los frames pedidos (cabe = False)
+    """
+    c = calibracion or CALIBRACION
+    limite = memoria_libre_gb - c["margen_gb"]
+
+    variantes = [(size, frame_num)]
+    if permitir_reducir:
+        if not task.startswith("i2v"):
+            # I2V tiene la máscara fijada a 81 frames en Wan2.1
+            variantes += [(size, f) for f in FRAMES_REDUCIDOS if f < frame_num]
+        if size in SIZES_REDUCIDOS:
+            variantes.append((SIZES_REDUCIDOS[size], frame_num))
+
+    def evaluar(config, size_variante, frames_variante):
+        estimacion = estimar(task, size_variante, frames_variante, config["offload_model"],
+                             config["t5_cpu"], sample_steps, c)
+        return {**config, "size": size_variante, "frame_num": frames_variante,
+                "pico_gb": estimacion["pico_gb"], "segundos": estimacion["segundos"],
+                "cabe": estimacion["pico_gb"] <= limite}
+
+    for size_variante, frames_variante in variantes:
+        for config in CONFIGURACIONES:
+            plan = evaluar(config, size_variante, frames_variante)
+            if plan["cabe"]:
+                return plan
+
+    return evaluar(CONFIGURACIONES[-1], size, frame_num)
+
+
+def muestras_por_lote(task, size, frame_num, memoria_libre_gb, offload_model, t5_cpu,
+                      maximo=8, calibracion=None):
+    """
+    Número de semillas que caben a la vez en un forward del DiT.
+
+    Args:
+        task, size, frame_num: Trabajo a generar
+        memoria_libre_gb: Memoria libre de la GPU
+        offload_model, t5_cpu: Configuración de memoria del trabajo
+        maximo: Límite superior
+        calibracion: Diccionario de calibración
+
+    Returns:
+        Número de muestras (al menos 1)
+    """
+    c = calibracion or CALIBRACION
+    limite = memoria_libre_gb - c["margen_gb"]
+    for muestras in range(maximo, 1, -1):
+        estimacion = estimar(task, size, frame_num, offload_model, t5_cpu,
+                             calibracion=c, muestras=muestras)
+        if estimacion["pico_gb"] <= limite:
+            return muestras
+    return 1
+
+
+def memoria_libre_gpu():
+    """
+    Memoria libre (GB) de la GPU con más memoria disponible.
+
+    Si WAN_MEMORIA_GB está definida (p. ej. por planificador_gpu.py, que
+    reparte una GPU entre varios trabajos), se usa como límite.
+
+    Returns:
+        Memoria libre en GB, o None si no se detectan GPUs
+    """
+    from seleccionar_gpu import obtener_info_gpus
+
+    gpus = obtener_info_gpus()
+    if not gpus:
+        return None
+    libre = max(g["free_memory_gb"] for g in gpus)
+    if os.environ.get("WAN_MEMORIA_GB"):
+        libre = min(libre, float(os.environ["WAN_MEMORIA_GB"]))
+    return libre
+
+
+def imprimir_plan(plan, memoria_libre_gb):
+    """Muestra el plan elegido antes de lanzar la generación."""
+    opciones = [nombre for nombre in ("offload_model", "t5_cpu") if plan[nombre]]
+    minutos = plan["segundos"] / 60
+    print(f"ℹ Planificador de memoria (GPU con {memoria_libre_gb:.1f} GB libres):")
+    print(f"  Configuración: {', '.join('--' + o for o in opciones) if opciones else 'todo en GPU'}")
+    print(f"  Tamaño: {plan['size']}, frames: {plan['frame_num']}")
+    print(f"  Pico de VRAM estimado: {plan['pico_gb']:.1f} GB")
+    print(f"  Tiempo estimado: {minutos:.1f} min")
+    if not plan["cabe"]:
+        print("⚠ Ni la configuración más ligera cabe según la estimación; puede haber OOM")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Estima memoria y tiempo de una generación con Wan 2.1")
+    parser.add_argument("--task", type=str, default="t2v-1.3B")
+    parser.add_argument("--size", type=str, default="832*480")
+    parser.add_argument("--frame_num", type=int, default=81)
+    parser.add_argument("--memoria_gb", type=float, default=None,
+                       help="Memoria libre de la GPU (default: detectarla)")
+    parser.add_argument("--calibracion", type=str, default=None,
+                       help="Archivo JSON con constantes de calibración")
+    args = parser.parse_args()
+
+    memoria = args.memoria_gb if args.memoria_gb is not None else memoria_libre_gpu()
+    if memoria is None:
+        print("✗ No se detectaron GPUs; indica --memoria_gb")
+        raise SystemExit(1)
+    calibracion = cargar_calibracion(args.calibracion)
+    imprimir_plan(planificar(args.task, args.size, args.frame_num, memoria, calibracion=calibracion), memoria)
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Máscara que sigue al producto a lo largo del video base.
+
+Con una máscara estática, un producto que se mueve (o una lata que gira)
+solo queda cubierto donde estaba en el primer frame. Este módulo propaga
+la máscara inicial a todos los frames del video base:
+    dis / farneback  flujo óptico denso (OpenCV) hacia atrás entre frames
+                     consecutivos; la máscara de cada frame es la del
+                     anterior deformada con ese flujo
+    plantilla        la región de la máscara en el primer frame se busca
+                     en cada frame con cv2.matchTemplate y la máscara se
+                     desplaza con ella (sin deriva, solo traslaciones)
+
+El flujo se calcula a media resolución, en tramos de frames repartidos
+entre un pool de procesos. El posproceso también va por tramos y trata
+cada tramo de la pila (T, alto, ancho) como una imagen de T canales, de
+modo que cada operación de OpenCV procesa todos sus frames en una sola
+llamada:
+    umbral       binariza (>= 50 %)
+    cierre       cierre morfológico (rellena huecos del flujo) y apertura
+                 (quita puntos sueltos), en píxeles
+    margen       dilatación extra alrededor del producto, en píxeles
+    difuminado   sigma del desenfoque gaussiano del borde (0 = binaria)
+
+Uso:
+    python seguimiento_mascara.py video_base.mp4 mascara.png --salida mascara_seguida.mp4
+    python seguimiento_mascara.py video_base.mp4 mascara.png --metodo plantilla
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+from fuente_frames import FuenteFrames
+from mascara_video import escribir_pila, leer_mascara, redimensionar_mascara
+
+
+METODOS_SEGUIMIENTO = ("dis", "farneback", "plantilla")
+
+# Escala de los frames con los que se sigue la máscara
+ESCALA_SEGUIMIENTO = 0.5
+
+# Canales máximos de una imagen de OpenCV (CV_CN_MAX): frames por tramo del posproceso
+MAXIMO_FRAMES_TRAMO = 512
+
+CIERRE_POR_DEFECTO = 7
+MARGEN_POR_DEFECTO = 0
+DIFUMINADO_POR_DEFECTO = 0.0
+
+
+def _tramos(total, procesos, maximo=MAXIMO_FRAMES_TRAMO):
+    """Límites (inicio, fin) de tramos de frames, uno por proceso como mínimo."""
+    por_tramo = min(maximo, max(1, -(-total // procesos)))
+    return [(i, min(i + por_tramo, total)) for i in range(0, total, por_tramo)]
+
+
+def _mapear(funcion, argumentos, procesos):
+    """pool.map sobre los tramos (en el propio proceso si solo hay uno)."""
+    if len(argumentos) == 1 or procesos == 1:
+        return [funcion(*a) for a in argumentos]
+    # multiprocessing se importa al usarlo: el wrapper lo importa al arrancar
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=min(procesos, len(argumentos))) as pool:
+        return list(pool.map(funcion, *zip(*argumentos)))
+
+
+def _flujos_atras(grises, metodo):
+    """
+    Flujo de cada frame hacia el anterior en un tramo de frames consecutivos.
+
+    Args:
+        grises: Array uint8 (M + 1, alto, ancho)
+        metodo: 'dis' o 'farneback'
+
+    Returns:
+        Array float16 (M, alto, ancho, 2): desplazamiento de cada píxel del
+        frame t + 1 a su posición en el frame t
+    """
+    import cv2
+    import numpy as np
+
+    cv2.setNumThreads(1)
+    if metodo == "dis":
+        dis = cv2.DISOpticalFlow_create(cv2.DISOPTICAL_FLOW_PRESET_MEDIUM)
+        calcular = lambda a, b: dis.calc(a, b, None)
+    else:
+        calcular = lambda a, b: cv2.calcOpticalFlowFarneback(a, b, None, 0.5, 3, 15, 3, 5, 1.2, 0)
+    return np.stack([calcular(b, a) for a, b in zip(grises[:-1], grises[1:])]).astype(np.float16)
+
+
+def _propagar_flujo(mascara, flujos):
+    """Deforma la máscara frame a frame con los flujos hacia atrás."""
+    import cv2
+    import numpy as np
+
+    alto, ancho = mascara.shape
+    malla = np.stack(np.meshgrid(np.arange(ancho, dtype=np.float32),
+                                 np.arange(alto, dtype=np.float32)), axis=-1)
+    pila = np.empty((len(flujos) + 1, alto, ancho), dtype=np.float32)
+    pila[0] = mascara
+    for t, flujo in enumerate(flujos, 1):
+        pila[t] = cv2.remap(pila[t - 1], malla + flujo.astype(np.float32), None,
+                            cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+    return pila
+
+
+def _buscar_plantilla(grises, plantilla):
+    """
+    Posición de la plantilla en cada frame de un tramo.
+
+    Returns:
+        Array int (M, 2) con la esquina (x, y) de la mejor coincidencia
+    """
+    import cv2
+    import numpy as np
+
+    cv2.setNumThreads(1)
+    posiciones = np.empty((len(grises), 2), dtype=np.int64)
+    for i, gris in enumerate(grises):
+        respuesta = cv2.matchTemplate(gris, plantilla, cv2.TM_CCOEFF_NORMED)
+        posiciones[i] = cv2.minMaxLoc(respuesta)[3]
+    return posiciones
+
+
+def _propagar_plantilla(mascara, desplazamientos):
+    """Desplaza la máscara del primer frame a cada frame."""
+    import cv2
+    import numpy as np
+
+    alto, ancho = mascara.shape
+    pila = np.empty((len(desplazamientos), alto, ancho), dtype=np.float32)
+    for t, (dx, dy) in enumerate(desplazamientos):
+        matriz = np.float32([[1, 0, dx], [0, 1, dy]])
+        pila[t] = cv2.warpAffine(mascara, matriz, (ancho, alto), flags=cv2.INTER_LINEAR,
+                                 borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+    return pila
+
+
+def _posprocesar_tramo(pila, ancho, alto, cierre, margen, difuminado):
+    """
+    Umbral, morfología y difuminado de un tramo de la pila.
+
+    Args:
+        pila: Array float32 (T, alto_seguimiento, ancho_seguimiento) en [0, 1]
+        ancho, alto: Tamaño final (el del video base)
+
+    Returns:
+        Array uint8 (T, alto, ancho)
+    """
+    import cv2
+    import numpy as np
+
+    cv2.setNumThreads(1)
+    # (alto, ancho, T): cada operación procesa todos los frames del tramo
+    canales = np.ascontiguousarray(pila.transpose(1, 2, 0))
+    canales = cv2.resize(canales, (ancho, alto), interpolation=cv2.INTER_LINEAR)
+    if canales.ndim == 2:
+        canales = canales[..., None]
+    canales = (canales >= 0.5).astype(np.uint8) * 255
+
+    if cierre > 0:
+        nucleo = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (cierre, cierre))
+        canales = cv2.morphologyEx(canales, cv2.MORPH_CLOSE, nucleo)
+        canales = cv2.morphologyEx(canales, cv2.MORPH_OPEN, nucleo)
+    if margen > 0:
+        nucleo = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * margen + 1, 2 * margen + 1))
+        canales = cv2.dilate(canales, nucleo)
+    if difuminado > 0:
+        canales = cv2.GaussianBlur(canales, (0, 0), difuminado)
+    if canales.ndim == 2:
+        canales = canales[..., None]
+    return np.ascontiguousarray(canales.transpose(2, 0, 1))
+
+
+def seguir_mascara(video, mascara, metodo="dis", procesos=None, cierre=CIERRE_POR_DEFECTO,
+                   margen=MARGEN_POR_DEFECTO, difuminado=DIFUMINADO_POR_DEFECTO):
+    """
+    Propaga una máscara del primer frame a todos los frames del video.
+
+    Args:
+        video: Ruta al video base
+        mascara: Ruta a la imagen de máscara o array uint8 (alto, ancho)
+            del primer frame (se redimensiona al tamaño del video)
+        metodo: 'dis', 'farneback' o 'plantilla'
+        procesos: Procesos del pool (default: número de CPUs)
+        cierre, margen, difuminado: Posproceso (ver el docstring del módulo)
+
+    Returns:
+        Tupla (pila uint8 (frames, alto, ancho), informe con frames,
+        segundos, frames_por_segundo, metodo y procesos)
+
+    Raises:
+        ValueError: Si el método no existe, el video no tiene frames o la
+            máscara está vacía
+    """
+    import cv2
+    import numpy as np
+
+    if metodo not in METODOS_SEGUIMIENTO:
+        raise ValueError(f"Método de seguimiento desconocido: {metodo}")
+    inicio = time.perf_counter()
+    procesos = procesos or os.cpu_count() or 1
+
+    fuente = FuenteFrames(video)
+    ancho, alto = fuente.tamano
+    reducido = (max(1, round(ancho * ESCALA_SEGUIMIENTO)), max(1, round(alto * ESCALA_SEGUIMIENTO)))
+    fuente = FuenteFrames(video, tamano=reducido)
+    grises = np.stack([cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) for frame in fuente])
+    if not len(grises):
+        raise ValueError(f"El video no tiene frames: {video}")
+
+    if not hasattr(mascara, "shape"):
+        mascara = leer_mascara(mascara)
+    inicial = redimensionar_mascara(mascara, *reducido).astype(np.float32) / 255.0
+    if not inicial.any():
+        raise ValueError("La máscara inicial está vacía")
+
+    frames = len(grises)
+    if metodo == "plantilla":
+        ys, xs = np.nonzero(inicial >= 0.5)
+        x0, y0, x1, y1 = xs.min(), ys.min(), xs.max() + 1, ys.max() + 1
+        plantilla = grises[0, y0:y1, x0:x1]
+        limites = _tramos(frames, procesos)
+        posiciones = np.concatenate(_mapear(
+            _buscar_plantilla, [(grises[a:b], plantilla) for a, b in limites], procesos))
+        pila = _propagar_plantilla(inicial, posiciones - (x0, y0))
+    else:
+        # Tramos solapados en un frame para que cada par quede en un solo tramo
+        limites = _tramos(frames - 1, procesos)
+        flujos = _mapear(_flujos_atras, [(grises[a:b + 1], metodo) for a, b in limites], procesos)
+        pila = _propagar_flujo(inicial, np.concatenate(flujos) if flujos else [])
+
+    pila = np.concatenate(_mapear(
+        _posprocesar_tramo,
+        [(pila[a:b], ancho, alto, cierre, margen, difuminado) for a, b in _tramos(frames, procesos)],
+        procesos))
+
+    segundos = time.perf_counter() - inicio
+    return pila, {
+        "frames": frames,
+        "segundos": segundos,
+        "frames_por_segundo": frames / segundos,
+        "metodo": metodo,
+        "procesos": procesos,
+    }
+
+
+def imprimir_informe(informe):
+    """Muestra el ritmo del seguimiento."""
+    print(f"✓ Máscara seguida en {informe['frames']} frames ({informe['metodo']}, "
+          f"{informe['procesos']} procesos): {informe['segundos']:.2f} s, "
+          f"{informe['frames_por_segundo']:.1f} frames/s")
+
+
+def main():
+    """Función principal del script."""
+    parser = argparse.ArgumentParser(
+        description="Propaga una máscara del primer frame a todo el video base"
+    )
+    parser.add_argument("video", type=str, help="Video base")
+    parser.add_argument("mascara", type=str, help="Máscara del primer frame (imagen)")
+    parser.add_argument("--salida", type=str, default=None,
+                       help="Video de máscara de salida (sin pérdidas)")
+    parser.add_argument("--metodo", type=str, default="dis", choices=METODOS_SEGUIMIENTO,
+                       help="Flujo óptico (dis, farneback) o búsqueda de plantilla")
+    parser.add_argument("--procesos", type=int, default=None,
+                       help="Procesos del pool (default: número de CPUs)")
+    parser.add_argument("--cierre", type=int, default=CIERRE_POR_DEFECTO,
+                       help="Tamaño (px) del cierre y la apertura morfológicos (0 = sin ellos)")
+    parser.add_argument("--margen", type=int, default=MARGEN_POR_DEFECTO,
+                       help="Píxeles que se amplía la máscara alrededor del producto")
+    parser.add_argument("--difuminado", type=float, default=DIFUMINADO_POR_DEFECTO,
+                       help="Sigma del difuminado del borde (0 = máscara binaria)")
+    args = parser.parse_args()
+
+    try:
+        pila, informe = seguir_mascara(args.video, args.mascara, args.metodo, args.procesos,
+                                       args.cierre, args.margen, args.difuminado)
+    except (OSError, ValueError) as e:
+        print(f"✗ Error: {e}")
+        sys.exit(1)
+    imprimir_informe(informe)
+
+    if args.salida:
+        fps = FuenteFrames(args.video).fps
+        ruta = escribir_pila(pila, Path(args.salida), fps)
+        print(f"✓ Video de máscara: {ruta}")
+
+
+if __name__ == "__main__":
+    main()
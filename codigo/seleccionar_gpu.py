@@ -10,74 +10,145 @@ import os
 import sys
 
 
-def obtener_info_gpus():
+def obtener_info_gpus(solo_visibles=True):
     """
     Obtiene información de todas las GPUs disponibles.
     
+    Se consulta nvidia-smi (o NVML si no está) en lugar de PyTorch: importar
+    torch tarda segundos y consultar la GPU con él crea un contexto CUDA que
+    ocupa cientos de MB de VRAM en este proceso durante toda la generación.
+    Los índices son los de nvidia-smi (orden de bus PCI), así que se fija
+    CUDA_DEVICE_ORDER=PCI_BUS_ID para que CUDA_VISIBLE_DEVICES los
+    interprete igual en los procesos hijos.
+    
+    nvidia-smi y NVML ven todas las GPUs de la máquina. Si
+    CUDA_VISIBLE_DEVICES está definida, por defecto solo se devuelven las
+    que CUDA dejará usar a este proceso, con los índices que les da CUDA
+    (ver filtrar_visibles).
+    
+    Args:
+        solo_visibles: Si False, se devuelven todas las GPUs con su índice
+            físico (para quien elige GPUs y fija CUDA_VISIBLE_DEVICES, como
+            planificador_gpu.py, servidor_http.py o docker-entrypoint.sh)
+    
     Returns:
         Lista de diccionarios con información de cada GPU
     """
+    os.environ.setdefault("CUDA_DEVICE_ORDER", "PCI_BUS_ID")
+    gpus = _gpus_fisicas()
+    if solo_visibles:
+        gpus = filtrar_visibles(gpus, os.environ.get("CUDA_VISIBLE_DEVICES"))
+    return gpus
+
+
+def _gpus_fisicas():
+    """Todas las GPUs de la máquina (nvidia-smi o NVML), o [] si no hay."""
+    try:
+        return _gpus_nvidia_smi()
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠ Error al obtener información de GPUs: {e}")
+        return []
+    
+    try:
+        return _gpus_nvml()
+    except Exception:
+        return []
+
+
+def filtrar_visibles(gpus, visibles):
+    """
+    GPUs que CUDA deja ver con un valor de CUDA_VISIBLE_DEVICES.
+    
+    Como CUDA, acepta índices físicos y UUIDs (o prefijos únicos de UUID,
+    'GPU-...'), conserva el orden de la variable y deja de leerla en la
+    primera entrada que no corresponde a ninguna GPU o que se repite.
+    
+    Args:
+        gpus: GPUs físicas (obtener_info_gpus(solo_visibles=False))
+        visibles: Valor de CUDA_VISIBLE_DEVICES (None = sin restricción)
+    
+    Returns:
+        Lista de GPUs visibles con 'id' renumerado a 0..N-1 (el índice
+        dentro del proceso) y el índice físico en 'id_fisico'
+    """
+    if visibles is None:
+        return gpus
+    
+    resultado = []
+    for entrada in visibles.split(","):
+        entrada = entrada.strip()
+        if entrada.isdigit():
+            candidatas = [g for g in gpus if g['id'] == int(entrada)]
+        elif entrada.startswith("GPU-"):
+            candidatas = [g for g in gpus if g.get('uuid', '').startswith(entrada)]
+        else:
+            candidatas = []
+        if len(candidatas) != 1 or any(g['id_fisico'] == candidatas[0]['id'] for g in resultado):
+            break
+        resultado.append(dict(candidatas[0], id=len(resultado), id_fisico=candidatas[0]['id']))
+    return resultado
+
+
+def _info_gpu(indice, uuid, nombre, total_mb, libre_mb):
+    """Diccionario de una GPU a partir de sus memorias en MB."""
+    return {
+        'id': indice,
+        'uuid': uuid,
+        'name': nombre,
+        'total_memory_gb': total_mb / 1024,
+        'free_memory_gb': libre_mb / 1024,
+        'reserved_memory_gb': (total_mb - libre_mb) / 1024,
+        'total_memory_mb': total_mb,
+    }
+
+
+def _gpus_nvidia_smi():
+    """GPUs según nvidia-smi (FileNotFoundError si no está instalado)."""
+    import subprocess
+    
+    result = subprocess.run(
+        ['nvidia-smi', '--query-gpu=index,uuid,name,memory.total,memory.free', 
+         '--format=csv,noheader,nounits'],
+        capture_output=True,
+        text=True
+    )
+    
+    if result.returncode != 0:
+        return []
+    
+    gpus = []
+    for line in result.stdout.strip().split('\n'):
+        if not line:
+            continue
+        parts = [p.strip() for p in line.split(',')]
+        if len(parts) >= 5:
+            gpus.append(_info_gpu(int(parts[0]), parts[1], parts[2], float(parts[3]), float(parts[4])))
+    
+    return gpus
+
+
+def _gpus_nvml():
+    """GPUs según NVML (paquete nvidia-ml-py), sin crear un contexto CUDA."""
+    import pynvml
+    
+    pynvml.nvmlInit()
     try:
-        import torch
-        
-        if not torch.cuda.is_available():
-            return []
-        
         gpus = []
-        for i in range(torch.cuda.device_count()):
-            props = torch.cuda.get_device_properties(i)
-            # Obtener memoria total y reservada
-            torch.cuda.set_device(i)
-            memoria_total = props.total_memory / (1024**3)  # GB
-            memoria_reservada = torch.cuda.memory_reserved(i) / (1024**3)  # GB
-            memoria_libre = memoria_total - memoria_reservada
-            
-            gpus.append({
-                'id': i,
-                'name': props.name,
-                'total_memory_gb': memoria_total,
-                'reserved_memory_gb': memoria_reservada,
-                'free_memory_gb': memoria_libre,
-                'total_memory_mb': props.total_memory / (1024**2),  # MB para nvidia-smi
-            })
-        
+        for i in range(pynvml.nvmlDeviceGetCount()):
+            dispositivo = pynvml.nvmlDeviceGetHandleByIndex(i)
+            nombre = pynvml.nvmlDeviceGetName(dispositivo)
+            uuid = pynvml.nvmlDeviceGetUUID(dispositivo)
+            if isinstance(nombre, bytes):
+                nombre = nombre.decode()
+            if isinstance(uuid, bytes):
+                uuid = uuid.decode()
+            memoria = pynvml.nvmlDeviceGetMemoryInfo(dispositivo)
+            gpus.append(_info_gpu(i, uuid, nombre, memoria.total / 1024**2, memoria.free / 1024**2))
         return gpus
-        
-    except ImportError:
-        # Si PyTorch no está disponible, usar nvidia-smi
-        try:
-            import subprocess
-            import json
-            
-            result = subprocess.run(
-                ['nvidia-smi', '--query-gpu=index,name,memory.total,memory.free', 
-                 '--format=csv,noheader,nounits'],
-                capture_output=True,
-                text=True
-            )
-            
-            if result.returncode != 0:
-                return []
-            
-            gpus = []
-            for line in result.stdout.strip().split('\n'):
-                if not line:
-                    continue
-                parts = [p.strip() for p in line.split(',')]
-                if len(parts) >= 4:
-                    gpus.append({
-                        'id': int(parts[0]),
-                        'name': parts[1],
-                        'total_memory_gb': float(parts[2]) / 1024,
-                        'free_memory_gb': float(parts[3]) / 1024,
-                        'reserved_memory_gb': (float(parts[2]) - float(parts[3])) / 1024,
-                    })
-            
-            return gpus
-            
-        except Exception as e:
-            print(f"⚠ Error al obtener información de GPUs: {e}")
-            return []
+    finally:
+        pynvml.nvmlShutdown()
 
 
 def seleccionar_mejor_gpu():
@@ -87,7 +158,7 @@ def seleccionar_mejor_gpu():
     Returns:
         ID de la GPU seleccionada, o None si no hay GPUs disponibles
     """
-    gpus = obtener_info_gpus()
+    gpus = obtener_info_gpus(solo_visibles=False)
     
     if not gpus:
         return None
@@ -117,7 +188,7 @@ def configurar_gpu():
     os.environ['CUDA_VISIBLE_DEVICES'] = str(gpu_id)
     
     # Obtener info de la GPU seleccionada
-    gpus = obtener_info_gpus()
+    gpus = obtener_info_gpus(solo_visibles=False)
     gpu_info = next((g for g in gpus if g['id'] == gpu_id), None)
     
     if gpu_info:
@@ -155,7 +226,7 @@ def main():
     
     args = parser.parse_args()
     
-    gpus = obtener_info_gpus()
+    gpus = obtener_info_gpus(solo_visibles=False)
     
     if not gpus:
         if args.solo_id:
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Servidor de generación persistente para Wan 2.1.
+
+Mantiene el modelo cargado en memoria (ver motor_wan.py) y atiende trabajos
+a través de un socket Unix local. De esta forma solo se paga la carga del
+checkpoint una vez, en lugar de en cada video.
+
+Protocolo: el cliente envía una línea JSON y recibe una línea JSON.
+    {"accion": "generar", "trabajo": {...}}  -> resultado del trabajo
+    {"accion": "estado"}                     -> checkpoint cargado
+    {"accion": "detener"}                    -> detiene el servidor
+
+Uso:
+    # Iniciar el servidor (precargando el checkpoint T2V 1.3B)
+    python servidor_generacion.py --socket /tmp/wan.sock \\
+        --task t2v-1.3B --ckpt_dir /app/models/Wan2.1-T2V-1.3B
+
+    # Los scripts de generación lo usan como clientes
+    python generar_video.py --modo t2v --prompt "..." --servidor /tmp/wan.sock
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from pathlib import Path
+
+
+# Socket por defecto (se puede cambiar con la variable de entorno WAN_SERVIDOR_SOCKET)
+SOCKET_POR_DEFECTO = "/tmp/wan_generacion.sock"
+
+
+def servidor_disponible(ruta_socket):
+    """
+    Comprueba si hay un servidor de generación escuchando en el socket.
+
+    Args:
+        ruta_socket: Ruta al socket Unix
+
+    Returns:
+        True si el servidor responde, False en caso contrario
+    """
+    return enviar_peticion(ruta_socket, {"accion": "estado"}, timeout=5) is not None
+
+
+def enviar_peticion(ruta_socket, peticion, timeout=None):
+    """
+    Envía una petición JSON al servidor y devuelve su respuesta.
+
+    Args:
+        ruta_socket: Ruta al socket Unix
+        peticion: Diccionario serializable a JSON
+        timeout: Segundos de espera (None = sin límite)
+
+    Returns:
+        Diccionario con la respuesta, o None si el servidor no está disponible
+    """
+    if not ruta_socket or not Path(ruta_socket).exists():
+        return None
+
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conexion:
+            conexion.settimeout(timeout)
+            conexion.connect(str(ruta_socket))
+            conexion.sendall(json.dumps(peticion).encode("utf-8") + b"\n")
+            with conexion.makefile("rb") as lector:
+                linea = lector.readline()
+        if not linea:
+            return None
+        return json.loads(linea)
+    except (OSError, ValueError):
+        return None
+
+
+def enviar_trabajo(ruta_socket, trabajo):
+    """
+    Envía un trabajo de generación al servidor y espera el resultado.
+
+    Las rutas del trabajo se convierten a absolutas, ya que el servidor
+    puede tener un directorio de trabajo distinto al del cliente.
+
+    Args:
+        ruta_socket: Ruta al socket Unix
+        trabajo: Diccionario del trabajo (ver motor_wan.py)
+
+    Returns:
+        Diccionario con el resultado, o None si el servidor no está disponible
+    """
+    trabajo = dict(trabajo)
+    for clave in ("salida", "imagen", "video_base", "mascara", "ckpt_dir"):
+        if trabajo.get(clave):
+            trabajo[clave] = str(Path(trabajo[clave]).resolve())
+
+    respuesta = enviar_peticion(ruta_socket, {"accion": "generar", "trabajo": trabajo})
+    if respuesta is None:
+        return None
+    return respuesta.get("resultado")
+
+
+def generar_en_servidor(ruta_socket, trabajo):
+    """
+    Ejecuta un trabajo en el servidor de generación e informa del resultado.
+
+    Args:
+        ruta_socket: Ruta al socket Unix del servidor
+        trabajo: Diccionario del trabajo (ver motor_wan.py)
+
+    Returns:
+        True/False según el resultado del trabajo, o None si el servidor no
+        está disponible (el llamador debe lanzar generate.py como siempre)
+    """
+    if not servidor_disponible(ruta_socket):
+        print(f"⚠ Servidor de generación no disponible en {ruta_socket}")
+        print("  Se lanzará generate.py en un proceso nuevo")
+        return None
+
+    print(f"\nEnviando trabajo al servidor de generación ({ruta_socket})...")
+    resultado = enviar_trabajo(ruta_socket, trabajo)
+    if resultado is None:
+        print("⚠ El servidor de generación no respondió")
+        print("  Se lanzará generate.py en un proceso nuevo")
+        return None
+
+    if not resultado["exito"]:
+        print("\n✗ Error durante la generación en el servidor")
+        print(f"  {resultado['error']}")
+        return False
+
+    print(f"\n✓ Video generado exitosamente")
+    if resultado["tiempo_carga"] > 0:
+        print(f"  Carga del modelo: {resultado['tiempo_carga']:.1f} s")
+    else:
+        print("  Carga del modelo: 0.0 s (ya estaba cargado)")
+    print(f"  Generación: {resultado['tiempo_trabajo']:.1f} s")
+    print(f"  Semilla: {resultado['semilla']}")
+    return True
+
+
+class _ManejadorPeticiones(socketserver.StreamRequestHandler):
+    """Atiende una conexión: lee una línea JSON y responde con otra."""
+
+    def handle(self):
+        linea = self.rfile.readline()
+        if not linea:
+            return
+
+        try:
+            peticion = json.loads(linea)
+        except ValueError:
+            self._responder({"error": "Petición JSON inválida"})
+            return
+
+        accion = peticion.get("accion")
+        servidor = self.server
+
+        if accion == "estado":
+            clave = servidor.motor.clave_cargada
+            self._responder({
+                "cargado": list(clave) if clave else None,
+                "tiempo_carga": servidor.motor.tiempo_carga,
+            })
+        elif accion == "generar":
+            trabajo = peticion.get("trabajo") or {}
+            print(f"\n→ Trabajo recibido: {trabajo.get('modo')} - {trabajo.get('prompt', '')[:60]}")
+            # Una sola GPU: los trabajos se ejecutan de uno en uno
+            with servidor.candado:
+                resultado = servidor.motor.generar(trabajo)
+            if resultado["exito"]:
+                print(f"✓ Trabajo completado en {resultado['tiempo_trabajo']:.1f} s: {resultado['salida']}")
+            self._responder({"resultado": resultado})
+        elif accion == "detener":
+            self._responder({"detenido": True})
+            threading.Thread(target=servidor.shutdown, daemon=True).start()
+        else:
+            self._responder({"error": f"Acción desconocida: {accion}"})
+
+    def _responder(self, datos):
+        self.wfile.write(json.dumps(datos).encode("utf-8") + b"\n")
+
+
+class ServidorGeneracion(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Servidor de socket Unix que comparte un MotorWan entre conexiones."""
+
+    daemon_threads = True
+
+    def __init__(self, ruta_socket, motor):
+        self.motor = motor
+        self.candado = threading.Lock()
+        super().__init__(str(ruta_socket), _ManejadorPeticiones)
+
+
+def main():
+    """Función principal del servidor."""
+    parser = argparse.ArgumentParser(
+        description="Servidor persistente de generación de video con Wan 2.1"
+    )
+    parser.add_argument("--socket", type=str,
+                       default=os.environ.get("WAN_SERVIDOR_SOCKET", SOCKET_POR_DEFECTO),
+                       help="Ruta del socket Unix en el que escuchar")
+    parser.add_argument("--task", type=str, default=None,
+                       help="Tarea a precargar (ej: t2v-1.3B, i2v-14B, vace-14B)")
+    parser.add_argument("--ckpt_dir", type=str, default=None,
+                       help="Checkpoint a precargar junto con --task")
+    parser.add_argument("--t5_cpu", action="store_true",
+                       help="Precargar con el encoder T5 en CPU")
+    parser.add_argument("--dir_cache", type=str, default=None,
+                       help="Directorio de las cachés de condicionamiento (default: WAN_CACHE_DIR, "
+                            "/app/.cache/wan_video o ~/.cache/wan_video)")
+    parser.add_argument("--sin_cache", action="store_true",
+                       help="No usar las cachés de condicionamiento")
+
+    args = parser.parse_args()
+
+    from cache_disco import directorio_cache_por_defecto
+    from generar_video import encontrar_repositorio_wan
+    from motor_wan import MotorWan
+
+    repo_path = encontrar_repositorio_wan()
+    if repo_path is None:
+        print("✗ Error: Repositorio Wan2.1 no encontrado.")
+        sys.exit(1)
+
+    dir_cache = None
+    if not args.sin_cache:
+        dir_cache = args.dir_cache or str(directorio_cache_por_defecto())
+
+    motor = MotorWan(repo_path, dir_cache=dir_cache)
+    if args.task and args.ckpt_dir:
+        motor.cargar(args.task, args.ckpt_dir, args.t5_cpu)
+
+    ruta_socket = Path(args.socket)
+    if ruta_socket.exists():
+        if servidor_disponible(ruta_socket):
+            print(f"✗ Error: Ya hay un servidor escuchando en {ruta_socket}")
+            sys.exit(1)
+        ruta_socket.unlink()
+
+    servidor = ServidorGeneracion(ruta_socket, motor)
+    print(f"✓ Servidor de generación escuchando en: {ruta_socket}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+        if ruta_socket.exists():
+            ruta_socket.unlink()
+        print("\n✓ Servidor detenido")
+
+
+if __name__ == "__main__":
+    main()
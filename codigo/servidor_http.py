@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+API HTTP local para encargar videos a Wan 2.1.
+
+Servicio asyncio (sin dependencias externas) que recibe trabajos t2v, i2v
+y mv2v, los guarda en una cola SQLite (cola_trabajos.py) y los ejecuta con
+generar_video.py y generar_video_con_mascara.py, cada uno en su propio
+proceso fijado a una GPU. Los trabajos sobreviven a un reinicio del
+contenedor: los que estaban en curso vuelven a la cola al arrancar.
+
+Endpoints:
+    POST /jobs                  Encola un trabajo (JSON) -> 202 {"id": ...}
+                                429 si la cola está llena
+    GET  /jobs/{id}             Estado del trabajo
+    GET  /jobs/{id}/resultado   Descarga el video (cuando está completado)
+    GET  /estado                Resumen de la cola y de las GPUs
+
+Ejemplo de trabajo:
+    {"modo": "i2v", "prompt": "A person drinking...",
+     "imagen_referencia": "/app/recursos/goldenergy.png"}
+
+Uso:
+    python servidor_http.py --puerto 8000
+    curl -X POST localhost:8000/jobs -d '{"modo": "t2v", "prompt": "..."}'
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sys
+from pathlib import Path
+
+from cola_trabajos import ColaTrabajos
+
+
+# Límite del cuerpo de una petición (los trabajos son JSON pequeños)
+MAX_CUERPO = 1024 * 1024
+
+# Tamaño de los bloques al enviar un video
+BLOQUE_DESCARGA = 1024 * 1024
+
+# Segundos que se espera a los trabajos en curso al parar antes de SIGKILL
+ESPERA_PARADA_S = 30
+
+RAZONES = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+    429: "Too Many Requests", 500: "Internal Server Error",
+}
+
+# Parámetros opcionales que se pasan tal cual a los scripts de generación
+OPCIONES = {
+    "resolucion": str,
+    "ckpt_dir": str,
+    "frame_num": int,
+    "sample_guide_scale": float,
+    "semilla": int,
+}
+BANDERAS = ("offload_model", "t5_cpu")
+
+# Opciones que generar_video_con_mascara.py no acepta
+OPCIONES_SIN_MV2V = ("frame_num", "sample_guide_scale")
+
+# Parámetros de ruta obligatorios según el modo
+ARCHIVOS_POR_MODO = {
+    "t2v": (),
+    "i2v": ("imagen_referencia",),
+    "mv2v": ("video_base", "mascara"),
+}
+
+
+def validar_trabajo(datos):
+    """
+    Valida el cuerpo de POST /jobs.
+
+    Args:
+        datos: Diccionario recibido
+
+    Returns:
+        Tupla (modo, parametros)
+
+    Raises:
+        ValueError: Si el trabajo no es válido
+    """
+    if not isinstance(datos, dict):
+        raise ValueError("El cuerpo debe ser un objeto JSON")
+
+    modo = datos.get("modo")
+    if modo not in ARCHIVOS_POR_MODO:
+        raise ValueError(f"Modo inválido: {modo!r} (usa {', '.join(ARCHIVOS_POR_MODO)})")
+    if not isinstance(datos.get("prompt"), str) or not datos["prompt"].strip():
+        raise ValueError("Falta el prompt")
+
+    parametros = {"prompt": datos["prompt"]}
+    for clave in ARCHIVOS_POR_MODO[modo]:
+        ruta = datos.get(clave)
+        if not ruta or not Path(ruta).exists():
+            raise ValueError(f"{clave} no encontrado: {ruta}")
+        parametros[clave] = str(Path(ruta).resolve())
+
+    for clave, tipo in OPCIONES.items():
+        if datos.get(clave) is not None:
+            if modo == "mv2v" and clave in OPCIONES_SIN_MV2V:
+                raise ValueError(f"{clave} no está disponible en el modo mv2v")
+            try:
+                parametros[clave] = tipo(datos[clave])
+            except (TypeError, ValueError):
+                raise ValueError(f"Valor inválido para {clave}: {datos[clave]!r}")
+    if parametros.get("resolucion", "832x480") not in ("832x480", "1280x720"):
+        raise ValueError(f"Resolución inválida: {parametros['resolucion']}")
+    for clave in BANDERAS:
+        if datos.get(clave):
+            parametros[clave] = True
+
+    return modo, parametros
+
+
+def construir_comando(modo, parametros, salida):
+    """
+    Construye el comando de generar_video.py o generar_video_con_mascara.py.
+
+    Args:
+        modo: 't2v', 'i2v' o 'mv2v'
+        parametros: Parámetros validados con validar_trabajo
+        salida: Ruta del video
+
+    Returns:
+        Lista con el comando
+    """
+    directorio = Path(__file__).resolve().parent
+    if modo == "mv2v":
+        comando = [sys.executable, str(directorio / "generar_video_con_mascara.py"),
+                   "--video_base", parametros["video_base"], "--mascara", parametros["mascara"]]
+    else:
+        comando = [sys.executable, str(directorio / "generar_video.py"), "--modo", modo]
+        if modo == "i2v":
+            comando.extend(["--imagen_referencia", parametros["imagen_referencia"]])
+
+    comando.extend(["--prompt", parametros["prompt"], "--salida", str(salida)])
+    for clave in OPCIONES:
+        if clave in parametros:
+            comando.extend([f"--{clave}", str(parametros[clave])])
+    for clave in BANDERAS:
+        if parametros.get(clave):
+            comando.append(f"--{clave}")
+    return comando
+
+
+def ultimas_lineas(ruta, n=20):
+    """Devuelve las últimas líneas de un archivo de log (o '' si no existe)."""
+    try:
+        with open(ruta, encoding="utf-8", errors="replace") as f:
+            return "".join(f.readlines()[-n:])
+    except OSError:
+        return ""
+
+
+class ServicioHTTP:
+    """Servidor HTTP y trabajadores que consumen la cola de SQLite."""
+
+    def __init__(self, cola, dir_resultados, gpus, trabajos_por_gpu=1, max_cola=20,
+                 memoria_por_trabajo_gb=None):
+        """
+        Args:
+            cola: ColaTrabajos
+            dir_resultados: Directorio donde se guardan videos y logs
+            gpus: Lista de GPUs (ids para CUDA_VISIBLE_DEVICES, o [None] para no fijarla)
+            trabajos_por_gpu: Trabajos simultáneos en cada GPU
+            max_cola: Máximo de trabajos pendientes antes de responder 429
+            memoria_por_trabajo_gb: Memoria que puede usar cada trabajo
+                (WAN_MEMORIA_GB del planificador de memoria; None = toda la GPU)
+        """
+        self.cola = cola
+        self.dir_resultados = Path(dir_resultados)
+        self.dir_resultados.mkdir(parents=True, exist_ok=True)
+        self.gpus = list(gpus)
+        self.trabajos_por_gpu = trabajos_por_gpu
+        self.max_cola = max_cola
+        self.memoria_por_trabajo_gb = memoria_por_trabajo_gb
+        self.procesos = set()
+        self._hay_trabajo = None
+        self._parar = None
+
+    async def ejecutar(self, host, puerto):
+        """Atiende peticiones y ejecuta trabajos hasta recibir SIGINT/SIGTERM."""
+        self._hay_trabajo = asyncio.Event()
+        self._parar = asyncio.Event()
+        bucle = asyncio.get_running_loop()
+        for senal in (signal.SIGINT, signal.SIGTERM):
+            bucle.add_signal_handler(senal, self._parar.set)
+
+        recuperados = self.cola.recuperar_interrumpidos()
+        if recuperados:
+            print(f"ℹ {recuperados} trabajo(s) interrumpido(s) vuelven a la cola")
+        if self.cola.contar("pendiente"):
+            self._hay_trabajo.set()
+
+        servidor = await asyncio.start_server(self._atender, host, puerto)
+        trabajadores = [
+            asyncio.create_task(self._trabajador(gpu))
+            for gpu in self.gpus for _ in range(self.trabajos_por_gpu)
+        ]
+        print(f"✓ API escuchando en http://{host}:{puerto}")
+        print(f"  GPUs: {', '.join('todas' if g is None else str(g) for g in self.gpus)} "
+              f"({self.trabajos_por_gpu} trabajo(s) por GPU, cola máxima {self.max_cola})")
+
+        async with servidor:
+            await self._parar.wait()
+
+        print("\nDeteniendo la API...")
+        await self._detener_procesos()
+        for tarea in trabajadores:
+            tarea.cancel()
+        await asyncio.gather(*trabajadores, return_exceptions=True)
+        # Los trabajos que estaban en curso se reanudan al volver a arrancar
+        self.cola.cerrar()
+
+    async def _detener_procesos(self):
+        """
+        Termina los trabajos en curso con todos sus descendientes.
+
+        Cada trabajo es líder de su propio grupo de procesos, así que la
+        señal llega también a generate.py (y a torchrun y sus rangos), que
+        si no quedaría huérfano ocupando la GPU. Si un grupo no termina en
+        ESPERA_PARADA_S se mata con SIGKILL.
+        """
+        procesos = [p for p in self.procesos if p.returncode is None]
+        for proceso in procesos:
+            _senal_grupo(proceso, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(asyncio.gather(*(p.wait() for p in procesos)), ESPERA_PARADA_S)
+        except asyncio.TimeoutError:
+            for proceso in procesos:
+                _senal_grupo(proceso, signal.SIGKILL)
+            await asyncio.gather(*(p.wait() for p in procesos))
+
+    async def _trabajador(self, gpu):
+        """Toma trabajos de la cola y los ejecuta en una GPU, uno detrás de otro."""
+        while True:
+            trabajo = self.cola.tomar_siguiente(gpu)
+            if trabajo is None:
+                self._hay_trabajo.clear()
+                await self._hay_trabajo.wait()
+                continue
+            await self._ejecutar_trabajo(trabajo, gpu)
+
+    async def _ejecutar_trabajo(self, trabajo, gpu):
+        salida = self.dir_resultados / f"{trabajo['id']}.mp4"
+        log = self.dir_resultados / f"{trabajo['id']}.log"
+        comando = construir_comando(trabajo["modo"], trabajo["parametros"], salida)
+
+        env = os.environ.copy()
+        if gpu is not None:
+            env["CUDA_VISIBLE_DEVICES"] = str(gpu)
+        if self.memoria_por_trabajo_gb is not None:
+            env["WAN_MEMORIA_GB"] = f"{self.memoria_por_trabajo_gb:.2f}"
+
+        print(f"→ Trabajo {trabajo['id']} ({trabajo['modo']}) en GPU {'-' if gpu is None else gpu}")
+        with open(log, "ab") as archivo_log:
+            proceso = await asyncio.create_subprocess_exec(
+                *comando, stdout=archivo_log, stderr=asyncio.subprocess.STDOUT,
+                stdin=asyncio.subprocess.DEVNULL, env=env,
+                # Grupo de procesos propio para poder parar también a generate.py
+                start_new_session=True,
+            )
+            self.procesos.add(proceso)
+            try:
+                codigo = await proceso.wait()
+            finally:
+                self.procesos.discard(proceso)
+
+        if self._parar.is_set():
+            return
+        if codigo == 0 and salida.exists():
+            self.cola.completar(trabajo["id"], salida)
+            print(f"✓ Trabajo {trabajo['id']} completado")
+        else:
+            self.cola.fallar(trabajo["id"], f"Código de salida {codigo}\n{ultimas_lineas(log)}")
+            print(f"✗ Trabajo {trabajo['id']} falló (código {codigo})")
+
+    async def _atender(self, lector, escritor):
+        """Atiende una conexión HTTP (una petición por conexión)."""
+        try:
+            try:
+                metodo, ruta, cuerpo = await self._leer_peticion(lector)
+            except ValueError as e:
+                await self._responder_json(escritor, 400, {"error": str(e)})
+                return
+            except OverflowError:
+                await self._responder_json(escritor, 413, {"error": "Petición demasiado grande"})
+                return
+            await self._enrutar(escritor, metodo, ruta, cuerpo)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            await self._responder_json(escritor, 500, {"error": str(e)})
+        finally:
+            escritor.close()
+
+    @staticmethod
+    async def _leer_peticion(lector):
+        linea = await lector.readline()
+        partes = linea.decode("latin-1").split()
+        if len(partes) != 3:
+            raise ValueError("Línea de petición inválida")
+        metodo, ruta, _ = partes
+
+        cabeceras = {}
+        while True:
+            linea = await lector.readline()
+            if linea in (b"\r\n", b"\n", b""):
+                break
+            nombre, _, valor = linea.decode("latin-1").partition(":")
+            cabeceras[nombre.strip().lower()] = valor.strip()
+
+        longitud = int(cabeceras.get("content-length", "0") or 0)
+        if longitud > MAX_CUERPO:
+            raise OverflowError
+        cuerpo = await lector.readexactly(longitud) if longitud else b""
+        return metodo, ruta.split("?", 1)[0], cuerpo
+
+    async def _enrutar(self, escritor, metodo, ruta, cuerpo):
+        partes = [p for p in ruta.split("/") if p]
+
+        if partes == ["estado"] and metodo == "GET":
+            await self._responder_json(escritor, 200, {
+                estado: self.cola.contar(estado)
+                for estado in ("pendiente", "en_curso", "completado", "error")
+            } | {"gpus": self.gpus, "trabajos_por_gpu": self.trabajos_por_gpu,
+                 "max_cola": self.max_cola})
+            return
+
+        if partes == ["jobs"]:
+            if metodo != "POST":
+                await self._responder_json(escritor, 405, {"error": "Usa POST /jobs"})
+                return
+            await self._crear_trabajo(escritor, cuerpo)
+            return
+
+        if len(partes) in (2, 3) and partes[0] == "jobs" and metodo == "GET":
+            trabajo = self.cola.obtener(partes[1])
+            if trabajo is None:
+                await self._responder_json(escritor, 404, {"error": "Trabajo no encontrado"})
+            elif len(partes) == 2:
+                await self._responder_json(escritor, 200, self._describir(trabajo))
+            elif partes[2] == "resultado":
+                await self._enviar_resultado(escritor, trabajo)
+            else:
+                await self._responder_json(escritor, 404, {"error": "Ruta no encontrada"})
+            return
+
+        await self._responder_json(escritor, 404, {"error": "Ruta no encontrada"})
+
+    async def _crear_trabajo(self, escritor, cuerpo):
+        try:
+            modo, parametros = validar_trabajo(json.loads(cuerpo or b"null"))
+        except ValueError as e:
+            await self._responder_json(escritor, 400, {"error": str(e)})
+            return
+
+        # Contrapresión: no aceptar más trabajos de los que la cola puede absorber
+        if self.cola.contar("pendiente") >= self.max_cola:
+            await self._responder_json(escritor, 429, {"error": "Cola llena, reintenta más tarde"},
+                                       {"Retry-After": "60"})
+            return
+
+        id_trabajo = self.cola.crear(modo, parametros)
+        self._hay_trabajo.set()
+        await self._responder_json(escritor, 202, {
+            "id": id_trabajo, "estado": "pendiente", "url": f"/jobs/{id_trabajo}",
+        }, {"Location": f"/jobs/{id_trabajo}"})
+
+    def _describir(self, trabajo):
+        descripcion = {clave: trabajo[clave] for clave in
+                       ("id", "estado", "modo", "parametros", "error", "gpu", "intentos",
+                        "creado", "iniciado", "terminado")}
+        if trabajo["estado"] == "completado":
+            descripcion["resultado"] = f"/jobs/{trabajo['id']}/resultado"
+        return descripcion
+
+    async def _enviar_resultado(self, escritor, trabajo):
+        if trabajo["estado"] != "completado":
+            await self._responder_json(escritor, 409, {"error": f"El trabajo está {trabajo['estado']}"})
+            return
+        ruta = Path(trabajo["salida"])
+        if not ruta.exists():
+            await self._responder_json(escritor, 404, {"error": "El video ya no existe"})
+            return
+
+        self._escribir_cabecera(escritor, 200, {
+            "Content-Type": "video/mp4",
+            "Content-Length": str(ruta.stat().st_size),
+            "Content-Disposition": f'attachment; filename="{trabajo["id"]}.mp4"',
+        })
+        with open(ruta, "rb") as f:
+            while bloque := f.read(BLOQUE_DESCARGA):
+                escritor.write(bloque)
+                await escritor.drain()
+
+    @staticmethod
+    def _escribir_cabecera(escritor, estado, cabeceras):
+        lineas = [f"HTTP/1.1 {estado} {RAZONES.get(estado, '')}", "Connection: close"]
+        lineas.extend(f"{nombre}: {valor}" for nombre, valor in cabeceras.items())
+        escritor.write(("\r\n".join(lineas) + "\r\n\r\n").encode("latin-1"))
+
+    async def _responder_json(self, escritor, estado, datos, cabeceras=None):
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+        self._escribir_cabecera(escritor, estado, {
+            "Content-Type": "application/json; charset=utf-8",
+            "Content-Length": str(len(cuerpo)),
+            **(cabeceras or {}),
+        })
+        escritor.write(cuerpo)
+        await escritor.drain()
+
+
+def _senal_grupo(proceso, senal):
+    """Envía una señal al grupo de procesos de un trabajo (si sigue vivo)."""
+    try:
+        os.killpg(proceso.pid, senal)
+    except ProcessLookupError:
+        pass
+
+
+def detectar_gpus():
+    """
+    Devuelve los ids de las GPUs disponibles, o [None] si no se detecta ninguna.
+    """
+    from seleccionar_gpu import obtener_info_gpus
+
+    gpus = [g["id"] for g in obtener_info_gpus(solo_visibles=False)]
+    return gpus or [None]
+
+
+def main():
+    """Función principal de la API."""
+    parser = argparse.ArgumentParser(description="API HTTP con cola persistente para generar videos con Wan 2.1")
+    parser.add_argument("--host", type=str, default="0.0.0.0")
+    parser.add_argument("--puerto", type=int, default=8000)
+    parser.add_argument("--db", type=str, default="/app/resultados/api/trabajos.db",
+                       help="Base de datos SQLite de la cola")
+    parser.add_argument("--dir_resultados", type=str, default="/app/resultados/api",
+                       help="Directorio de los videos y logs de cada trabajo")
+    parser.add_argument("--gpus", type=str, default=None,
+                       help="GPUs a usar, separadas por comas (default: todas las detectadas)")
+    parser.add_argument("--trabajos_por_gpu", type=int, default=1,
+                       help="Trabajos simultáneos en cada GPU")
+    parser.add_argument("--max_cola", type=int, default=20,
+                       help="Trabajos pendientes a partir de los cuales se responde 429")
+    parser.add_argument("--memoria_por_trabajo_gb", type=float, default=None,
+                       help="Memoria GPU que puede usar cada trabajo (útil con --trabajos_por_gpu > 1)")
+
+    args = parser.parse_args()
+
+    gpus = [g.strip() for g in args.gpus.split(",")] if args.gpus else detectar_gpus()
+    cola = ColaTrabajos(args.db)
+    servicio = ServicioHTTP(cola, args.dir_resultados, gpus, args.trabajos_por_gpu,
+                            args.max_cola, args.memoria_por_trabajo_gb)
+    asyncio.run(servicio.ejecutar(args.host, args.puerto))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Metadatos de un video (frames, fps, tamaño y duración) sin decodificarlo.
+
+Los datos se leen de los metadatos del contenedor:
+    ffprobe  nb_frames, avg_frame_rate, width/height y duration del primer
+             stream de video; si el contenedor no guarda nb_frames se
+             cuentan los paquetes (-count_packets), que solo demultiplexa
+    OpenCV   si no hay ffprobe: CAP_PROP_FRAME_COUNT y, si no lo da, se
+             cuentan los frames con grab() (sin convertir a BGR)
+
+Los resultados se memorizan por (ruta, tamaño, fecha de modificación), así
+que sondear varias veces el mismo archivo en un proceso no vuelve a
+abrirlo, y un archivo reescrito se vuelve a sondear.
+
+Uso:
+    from sonda_video import sondear_video
+    info = sondear_video("video.mp4")   # {"frames": 81, "fps": 16.0, ...}
+
+    python sonda_video.py video.mp4 [otro.mp4 ...]
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+from fractions import Fraction
+from pathlib import Path
+
+
+# Entradas de la memoria de sondeos (las más antiguas se descartan)
+MAXIMO_ENTRADAS = 256
+
+_sondeos = OrderedDict()
+_cerrojo = threading.Lock()
+
+
+def _fraccion(texto):
+    """Convierte '16/1' o '30000/1001' en float (0.0 si no es válido)."""
+    try:
+        valor = Fraction(texto)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return 0.0
+    return float(valor)
+
+
+def _numero(texto):
+    """Convierte un campo numérico de ffprobe ('N/A' o ausente = None)."""
+    try:
+        return float(texto)
+    except (TypeError, ValueError):
+        return None
+
+
+def _ffprobe(ruta, contar_paquetes=False):
+    """Ejecuta ffprobe sobre el primer stream de video y devuelve su JSON."""
+    campos = "nb_read_packets" if contar_paquetes else "nb_frames,avg_frame_rate,r_frame_rate,width,height,duration"
+    comando = ["ffprobe", "-v", "error", "-select_streams", "v:0",
+               "-show_entries", f"stream={campos}:format=duration", "-of", "json"]
+    if contar_paquetes:
+        comando.insert(1, "-count_packets")
+    resultado = subprocess.run(comando + [str(ruta)], capture_output=True, text=True)
+    if resultado.returncode != 0:
+        raise ValueError(f"ffprobe no pudo leer {ruta}: {resultado.stderr.strip()}")
+    datos = json.loads(resultado.stdout or "{}")
+    if not datos.get("streams"):
+        raise ValueError(f"El archivo no tiene stream de video: {ruta}")
+    return datos
+
+
+def _sondear_ffprobe(ruta):
+    """Metadatos con ffprobe (cuenta paquetes si falta nb_frames)."""
+    datos = _ffprobe(ruta)
+    stream = datos["streams"][0]
+    fps = _fraccion(stream.get("avg_frame_rate")) or _fraccion(stream.get("r_frame_rate"))
+    duracion = _numero(stream.get("duration")) or _numero(datos.get("format", {}).get("duration"))
+
+    frames = _numero(stream.get("nb_frames"))
+    origen = "ffprobe"
+    if not frames:
+        paquetes = _ffprobe(ruta, contar_paquetes=True)["streams"][0]
+        frames = _numero(paquetes.get("nb_read_packets"))
+        origen = "ffprobe_paquetes"
+
+    return {
+        "frames": int(frames or 0),
+        "fps": fps,
+        "ancho": int(stream.get("width", 0)),
+        "alto": int(stream.get("height", 0)),
+        "duracion": duracion,
+        "origen": origen,
+    }
+
+
+def _sondear_opencv(ruta):
+    """Metadatos con OpenCV (cuenta frames con grab() si el contenedor no los da)."""
+    import cv2
+
+    captura = cv2.VideoCapture(str(ruta))
+    if not captura.isOpened():
+        raise ValueError(f"No se pudo abrir el video: {ruta}")
+    try:
+        fps = captura.get(cv2.CAP_PROP_FPS)
+        ancho = int(captura.get(cv2.CAP_PROP_FRAME_WIDTH))
+        alto = int(captura.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        frames = int(captura.get(cv2.CAP_PROP_FRAME_COUNT))
+        origen = "opencv"
+        if frames <= 0:
+            frames = 0
+            while captura.grab():
+                frames += 1
+            origen = "opencv_grab"
+    finally:
+        captura.release()
+
+    return {
+        "frames": frames,
+        "fps": fps,
+        "ancho": ancho,
+        "alto": alto,
+        "duracion": None,
+        "origen": origen,
+    }
+
+
+def sondear_video(ruta):
+    """
+    Frames, fps, tamaño y duración de un video, sin decodificarlo.
+
+    Args:
+        ruta: Ruta al video
+
+    Returns:
+        Diccionario con frames, fps, ancho, alto, duracion (segundos) y
+        origen (de dónde salió el número de frames). No se debe modificar:
+        es el mismo objeto en sondeos repetidos del mismo archivo
+
+    Raises:
+        FileNotFoundError: Si el video no existe
+        ValueError: Si el archivo no se puede leer como video
+    """
+    ruta = Path(ruta).resolve()
+    estado = ruta.stat()
+    clave = (str(ruta), estado.st_size, estado.st_mtime_ns)
+
+    with _cerrojo:
+        if clave in _sondeos:
+            _sondeos.move_to_end(clave)
+            return _sondeos[clave]
+
+    if shutil.which("ffprobe"):
+        info = _sondear_ffprobe(ruta)
+    else:
+        info = _sondear_opencv(ruta)
+    if not info["duracion"]:
+        info["duracion"] = info["frames"] / info["fps"] if info["fps"] > 0 else None
+
+    with _cerrojo:
+        _sondeos[clave] = info
+        while len(_sondeos) > MAXIMO_ENTRADAS:
+            _sondeos.popitem(last=False)
+    return info
+
+
+def main():
+    """Muestra los metadatos de uno o varios videos."""
+    parser = argparse.ArgumentParser(
+        description="Frames, fps, tamaño y duración de videos sin decodificarlos"
+    )
+    parser.add_argument("videos", nargs="+", help="Videos a sondear")
+    args = parser.parse_args()
+
+    errores = 0
+    for video in args.videos:
+        inicio = time.perf_counter()
+        try:
+            info = sondear_video(video)
+        except (OSError, ValueError) as e:
+            print(f"✗ {video}: {e}")
+            errores += 1
+            continue
+        milisegundos = (time.perf_counter() - inicio) * 1000
+        duracion = f"{info['duracion']:.2f} s" if info["duracion"] else "?"
+        print(f"✓ {video}: {info['frames']} frames, {info['ancho']}x{info['alto']}, "
+              f"{info['fps']:g} fps, {duracion} ({info['origen']}, {milisegundos:.1f} ms)")
+    sys.exit(1 if errores else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Telemetría por etapas de una generación con Wan 2.1.
+
+Dentro del proceso que ejecuta el pipeline (lanzador_generate.py o
+motor_wan.py) el contexto telemetria() envuelve los puntos de entrada de
+cada etapa y emite un evento al terminar cada una:
+    carga_modelo      constructor del pipeline (WanT2V, WanI2V, WanVace...)
+    codificar_texto   encoder umt5-xxl (o su caché)
+    codificar_imagen  CLIP de I2V (o su caché)
+    codificar_vae     VAE.encode (imagen de I2V, video fuente de VACE)
+    paso              cada paso de denoising (scheduler.step)
+    decodificar_vae   VAE.decode (incluye escribir el MP4 con vae_por_tramos)
+    guardar           cache_video
+
+Cuando generate.py corre en un subproceso, los eventos se escriben como
+líneas JSON en el archivo indicado por la variable de entorno WAN_EVENTOS
+y el proceso padre los sigue mientras se generan (seguir_eventos). Tanto
+los mensajes de progreso (imprimir_evento) como el registro final
+(RegistroTelemetria.resumen, que se guarda en <salida>_telemetria.json)
+son consumidores de esos eventos.
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import importlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+
+
+VARIABLE_EVENTOS = "WAN_EVENTOS"
+VERSION_REGISTRO = 1
+
+# Nombre legible de cada etapa, en el orden en que ocurren
+ETAPAS = {
+    "carga_modelo": "Carga del modelo",
+    "codificar_texto": "Codificación del texto",
+    "codificar_imagen": "Codificación de la imagen (CLIP)",
+    "codificar_vae": "Codificación VAE",
+    "denoising": "Denoising",
+    "decodificar_vae": "Decodificación VAE",
+    "guardar": "Guardado del video",
+}
+
+# (módulo, clase, método, etapa) que se envuelven; los que no existen se ignoran
+PUNTOS_DE_MEDIDA = [
+    ("wan", "WanT2V", "__init__", "carga_modelo"),
+    ("wan", "WanI2V", "__init__", "carga_modelo"),
+    ("wan", "WanFLF2V", "__init__", "carga_modelo"),
+    ("wan", "WanVace", "__init__", "carga_modelo"),
+    ("wan.modules.t5", "T5EncoderModel", "__call__", "codificar_texto"),
+    ("cache_condicionamiento", "T5Diferido", "__call__", "codificar_texto"),
+    ("wan.modules.clip", "CLIPModel", "visual", "codificar_imagen"),
+    ("cache_condicionamiento", "CLIPDiferido", "visual", "codificar_imagen"),
+    ("wan.modules.vae", "WanVAE", "encode", "codificar_vae"),
+    ("cache_condicionamiento", "VAEConCache", "encode", "codificar_vae"),
+    ("wan.modules.vae", "WanVAE", "decode", "decodificar_vae"),
+]
+
+SCHEDULERS = [
+    ("wan.utils.fm_solvers_unipc", "FlowUniPCMultistepScheduler"),
+    ("wan.utils.fm_solvers", "FlowDPMSolverMultistepScheduler"),
+]
+
+
+def ruta_telemetria(salida):
+    """Ruta del registro de telemetría de un video: <stem>_telemetria.json."""
+    salida = Path(salida)
+    return salida.with_name(f"{salida.stem}_telemetria.json")
+
+
+def _clase(nombre_modulo, nombre_clase):
+    """Devuelve una clase de un módulo o None si no se puede importar."""
+    try:
+        modulo = importlib.import_module(nombre_modulo)
+    except ImportError:
+        return None
+    return getattr(modulo, nombre_clase, None)
+
+
+@contextmanager
+def telemetria(emitir):
+    """
+    Emite eventos de cada etapa de Wan2.1 ejecutada dentro del bloque.
+
+    Hay que entrar en este contexto después de los demás parches
+    (cachés, vae_por_tramos) para medir la implementación que se usa.
+    Las llamadas anidadas de una misma etapa (p. ej. la caché de T5 que
+    llama al encoder real) se cuentan una sola vez.
+
+    Args:
+        emitir: Función que recibe cada evento (diccionario)
+
+    Yields:
+        None
+    """
+    activas = set()
+    originales = []
+    pasos = {}
+
+    def medir(funcion, etapa):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if etapa in activas:
+                return funcion(*args, **kwargs)
+            activas.add(etapa)
+            emitir({"tipo": "etapa", "etapa": etapa, "estado": "inicio", "marca": time.time()})
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            finally:
+                activas.discard(etapa)
+                emitir({"tipo": "etapa", "etapa": etapa, "estado": "fin", "marca": time.time(),
+                        "segundos": time.perf_counter() - inicio})
+        return envoltura
+
+    def medir_set_timesteps(funcion):
+        @wraps(funcion)
+        def envoltura(self, *args, **kwargs):
+            resultado = funcion(self, *args, **kwargs)
+            pasos[id(self)] = [0, len(self.timesteps), time.perf_counter()]
+            return resultado
+        return envoltura
+
+    def medir_step(funcion):
+        @wraps(funcion)
+        def envoltura(self, *args, **kwargs):
+            resultado = funcion(self, *args, **kwargs)
+            estado = pasos.get(id(self))
+            if estado is not None:
+                ahora = time.perf_counter()
+                estado[0] += 1
+                emitir({"tipo": "paso", "paso": estado[0], "total": estado[1],
+                        "marca": time.time(), "segundos": ahora - estado[2]})
+                estado[2] = ahora
+            return resultado
+        return envoltura
+
+    def parchear(objeto, nombre, nuevo):
+        originales.append((objeto, nombre, objeto.__dict__[nombre]))
+        setattr(objeto, nombre, nuevo)
+
+    for nombre_modulo, nombre_clase, metodo, etapa in PUNTOS_DE_MEDIDA:
+        clase = _clase(nombre_modulo, nombre_clase)
+        if clase is not None and metodo in clase.__dict__:
+            parchear(clase, metodo, medir(clase.__dict__[metodo], etapa))
+
+    for nombre_modulo, nombre_clase in SCHEDULERS:
+        clase = _clase(nombre_modulo, nombre_clase)
+        if clase is not None:
+            parchear(clase, "set_timesteps", medir_set_timesteps(clase.__dict__["set_timesteps"]))
+            parchear(clase, "step", medir_step(clase.__dict__["step"]))
+
+    # generate.py importa cache_video al ejecutarse, así que basta con el módulo
+    try:
+        utilidades = importlib.import_module("wan.utils.utils")
+    except ImportError:
+        utilidades = None
+    if utilidades is not None:
+        parchear(utilidades, "cache_video", medir(utilidades.cache_video, "guardar"))
+
+    try:
+        yield
+    finally:
+        for objeto, nombre, original in reversed(originales):
+            setattr(objeto, nombre, original)
+
+
+def emisor_archivo(ruta):
+    """
+    Devuelve una función emitir() que añade cada evento como línea JSON.
+
+    Args:
+        ruta: Archivo de eventos (WAN_EVENTOS)
+
+    Returns:
+        Función emitir(evento)
+    """
+    archivo = open(ruta, "a", encoding="utf-8", buffering=1)
+
+    def emitir(evento):
+        archivo.write(json.dumps(evento) + "\n")
+        archivo.flush()
+
+    return emitir
+
+
+class RegistroTelemetria:
+    """
+    Recibe los eventos de una generación, los reenvía a sus consumidores
+    y construye el registro JSON con el tiempo de cada etapa.
+    """
+
+    def __init__(self, consumidores=()):
+        """
+        Args:
+            consumidores: Funciones que reciben cada evento según llega
+        """
+        self.inicio = time.time()
+        self.eventos = []
+        self.consumidores = list(consumidores)
+
+    def emitir(self, evento):
+        """Registra un evento y lo pasa a los consumidores."""
+        evento.setdefault("marca", time.time())
+        evento["t"] = round(evento["marca"] - self.inicio, 3)
+        self.eventos.append(evento)
+        for consumidor in self.consumidores:
+            consumidor(evento)
+
+    def resumen(self):
+        """
+        Returns:
+            Diccionario con segundos_totales, etapas (segundos por etapa),
+            pasos (segundos de cada paso), pasos_por_segundo y eventos
+        """
+        etapas = {}
+        for evento in self.eventos:
+            if evento["tipo"] == "etapa" and evento["estado"] == "fin":
+                etapas[evento["etapa"]] = etapas.get(evento["etapa"], 0.0) + evento["segundos"]
+        pasos = [evento["segundos"] for evento in self.eventos if evento["tipo"] == "paso"]
+        if pasos:
+            etapas["denoising"] = sum(pasos)
+
+        return {
+            "version": VERSION_REGISTRO,
+            "segundos_totales": time.time() - self.inicio,
+            "etapas": {nombre: round(segundos, 3) for nombre, segundos in etapas.items()},
+            "pasos": [round(segundos, 3) for segundos in pasos],
+            "pasos_por_segundo": len(pasos) / sum(pasos) if pasos and sum(pasos) > 0 else None,
+            "eventos": [{k: v for k, v in evento.items() if k != "marca"} for evento in self.eventos],
+        }
+
+    def guardar(self, ruta, **datos):
+        """
+        Escribe el registro JSON (resumen más los datos dados) de forma atómica.
+
+        Args:
+            ruta: Archivo de destino
+            **datos: Campos adicionales (salida, comando, exito...)
+
+        Returns:
+            El registro escrito
+        """
+        registro = dict(datos, **self.resumen())
+        ruta = Path(ruta)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_name(f".{ruta.name}.tmp-{os.getpid()}")
+        temporal.write_text(json.dumps(registro, indent=2, ensure_ascii=False), encoding="utf-8")
+        os.replace(temporal, ruta)
+        return registro
+
+
+@contextmanager
+def seguir_eventos(ruta, emitir, intervalo=0.2):
+    """
+    Sigue el archivo de eventos de un subproceso mientras dura el bloque.
+
+    Args:
+        ruta: Archivo de eventos que escribe el subproceso
+        emitir: Función que recibe cada evento leído
+        intervalo: Segundos entre lecturas
+
+    Yields:
+        None
+    """
+    parar = threading.Event()
+    pendiente = [""]
+
+    def leer(archivo):
+        pendiente[0] += archivo.read()
+        *lineas, pendiente[0] = pendiente[0].split("\n")
+        for linea in lineas:
+            if linea.strip():
+                emitir(json.loads(linea))
+
+    def bucle():
+        archivo = None
+        while True:
+            detenido = parar.wait(intervalo)
+            if archivo is None and Path(ruta).exists():
+                archivo = open(ruta, encoding="utf-8")
+            if archivo is not None:
+                leer(archivo)
+            if detenido:
+                break
+        if archivo is not None:
+            archivo.close()
+
+    hilo = threading.Thread(target=bucle, daemon=True)
+    hilo.start()
+    try:
+        yield
+    finally:
+        parar.set()
+        hilo.join()
+
+
+def imprimir_evento(evento):
+    """Consumidor que muestra el progreso de una generación por consola."""
+    tipo = evento["tipo"]
+    if tipo == "inicio":
+        print("\nEjecutando generación (esto puede tomar varios minutos)...")
+        print(f"Comando: {' '.join(evento['comando'])}")
+    elif tipo == "etapa" and evento["estado"] == "fin":
+        print(f"  ✓ {ETAPAS.get(evento['etapa'], evento['etapa'])}: {evento['segundos']:.1f} s")
+    elif tipo == "paso":
+        paso, total = evento["paso"], evento["total"]
+        if paso == total or paso % max(1, total // 10) == 0:
+            restante = (total - paso) * evento["segundos"]
+            print(f"  Paso {paso}/{total} · {evento['segundos']:.2f} s/paso · quedan ~{restante:.0f} s")
+    elif tipo == "fin":
+        if evento["exito"]:
+            print(f"\n✓ Video generado exitosamente: {evento['salida']}")
+        else:
+            print(f"\n✗ {evento['error']}")
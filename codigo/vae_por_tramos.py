@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Decodificación y codificación del VAE de Wan 2.1 por tramos temporales.
+
+WanVAE.decode ya recorre el latente frame a frame con la caché causal del
+decoder, pero concatena cada tramo en un único tensor de todo el clip
+(3 x 81 x 720 x 1280 en float32 son ~900 MB) que además se guarda entero
+antes de escribir el MP4 con cache_video. Aquí cada tramo decodificado se
+convierte a uint8 y se envía directamente al escritor de imageio (el mismo
+libx264 que usa cache_video), así que la memoria de la GPU y del host no
+crece con la longitud del clip. Los píxeles escritos son idénticos a los
+de cache_video.
+
+La decodificación devuelve un VideoEnStreaming en lugar del tensor; la
+cache_video parcheada solo mueve el archivo ya escrito a su destino.
+
+La codificación (fuente de VACE, condicionamiento de I2V) sigue el mismo
+recorrido causal de WanVAE.encode, pero cada tramo de 4 frames se mueve
+al dispositivo del VAE justo antes de codificarlo y los latentes se
+concatenan una sola vez al final.
+
+Uso:
+    with vae_por_tramos(directorio_salida):
+        video = pipeline.generate(...)   # VideoEnStreaming
+
+    # Comparación de memoria pico en CPU con un VAE pequeño
+    python vae_por_tramos.py --repo /app/Wan2.1
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+from ejecucion_wan import publicar_salida, ruta_temporal
+
+
+FPS_WAN = 16
+
+
+class VideoEnStreaming:
+    """
+    Sustituye al tensor de video decodificado cuando ya está escrito en disco.
+
+    generate.py llama a cache_video(tensor=video[None], ...): el índice
+    devuelve el mismo objeto para que la llamada llegue intacta a la
+    cache_video parcheada.
+    """
+
+    def __init__(self, ruta, frames):
+        self.ruta = Path(ruta)
+        self.frames = frames
+
+    def __getitem__(self, indice):
+        return self
+
+    def __repr__(self):
+        return f"VideoEnStreaming({self.ruta}, {self.frames} frames)"
+
+
+def _autocast(vae, dispositivo):
+    """Mismo autocast que WanVAE.encode/decode (solo tiene efecto en CUDA)."""
+    import torch
+    if dispositivo.type != "cuda":
+        return nullcontext()
+    return torch.autocast(device_type="cuda", dtype=vae.dtype)
+
+
+def _escalar_latente(modelo, z, escala, inversa=False):
+    """Normaliza (encode) o desnormaliza (decode) un latente como WanVAE_."""
+    import torch
+    if isinstance(escala[0], torch.Tensor):
+        media = escala[0].view(1, modelo.z_dim, 1, 1, 1)
+        factor = escala[1].view(1, modelo.z_dim, 1, 1, 1)
+    else:
+        media, factor = escala
+    if inversa:
+        return z / factor + media
+    return (z - media) * factor
+
+
+def decodificar_por_tramos(vae, z):
+    """
+    Decodifica un latente tramo a tramo con la caché causal del decoder.
+
+    Args:
+        vae: wan.modules.vae.WanVAE
+        z: Latente [C, T, h, w]
+
+    Yields:
+        Tensores [3, t, H, W] en [-1, 1] (1 frame el primero, 4 los siguientes)
+    """
+    import torch
+
+    modelo = vae.model
+    dispositivo = z.device
+    modelo.clear_cache()
+    try:
+        with torch.no_grad(), _autocast(vae, dispositivo):
+            x = modelo.conv2(_escalar_latente(modelo, z.unsqueeze(0), vae.scale, inversa=True))
+        for i in range(x.shape[2]):
+            modelo._conv_idx = [0]
+            with torch.no_grad(), _autocast(vae, dispositivo):
+                tramo = modelo.decoder(x[:, :, i:i + 1], feat_cache=modelo._feat_map,
+                                       feat_idx=modelo._conv_idx)
+            yield tramo.float().clamp_(-1, 1).squeeze(0)
+    finally:
+        modelo.clear_cache()
+
+
+def codificar_por_tramos(vae, video):
+    """
+    Codifica un video tramo a tramo con la caché causal del encoder.
+
+    Args:
+        vae: wan.modules.vae.WanVAE
+        video: Video [3, T, H, W] en [-1, 1] (puede estar en CPU)
+
+    Returns:
+        Latente [C, 1 + (T - 1) // 4, h, w] en el dispositivo del VAE
+    """
+    import torch
+
+    modelo = vae.model
+    dispositivo = next(modelo.parameters()).device
+    t = video.shape[1]
+    limites = [(0, 1)] + [(1 + 4 * (i - 1), 1 + 4 * i) for i in range(1, 1 + (t - 1) // 4)]
+
+    modelo.clear_cache()
+    try:
+        salidas = []
+        for inicio, fin in limites:
+            modelo._enc_conv_idx = [0]
+            tramo = video[:, inicio:fin].unsqueeze(0).to(dispositivo, non_blocking=True)
+            with torch.no_grad(), _autocast(vae, dispositivo):
+                salidas.append(modelo.encoder(tramo, feat_cache=modelo._enc_feat_map,
+                                              feat_idx=modelo._enc_conv_idx))
+            del tramo
+        with torch.no_grad(), _autocast(vae, dispositivo):
+            mu, _ = modelo.conv1(torch.cat(salidas, 2)).chunk(2, dim=1)
+            mu = _escalar_latente(modelo, mu, vae.scale)
+    finally:
+        modelo.clear_cache()
+    return mu.float().squeeze(0)
+
+
+def escribir_tramos(tramos, destino, fps=FPS_WAN):
+    """
+    Escribe los tramos decodificados en un MP4 a medida que llegan.
+
+    La conversión a uint8 es la de cache_video: (x + 1) / 2 * 255 truncado.
+
+    Args:
+        tramos: Iterable de tensores [3, t, H, W] en [-1, 1]
+        destino: Ruta del MP4
+        fps: Frames por segundo
+
+    Returns:
+        Número de frames escritos
+    """
+    import imageio
+    import torch
+
+    frames = 0
+    escritor = imageio.get_writer(str(destino), fps=fps, codec="libx264", quality=8)
+    try:
+        for tramo in tramos:
+            datos = ((tramo + 1) / 2 * 255).type(torch.uint8).permute(1, 2, 3, 0).cpu().numpy()
+            for frame in datos:
+                escritor.append_data(frame)
+            frames += len(datos)
+    finally:
+        escritor.close()
+    return frames
+
+
+@contextmanager
+def vae_por_tramos(directorio, fps=FPS_WAN):
+    """
+    Hace que WanVAE decodifique y codifique por tramos dentro del bloque.
+
+    Args:
+        directorio: Directorio donde escribir los videos decodificados
+            (el de la salida final, para que el rename sea atómico)
+        fps: Frames por segundo de los videos (16 en Wan2.1)
+
+    Yields:
+        Lista de los VideoEnStreaming escritos dentro del bloque
+    """
+    import wan.utils.utils as utilidades
+    from wan.modules.vae import WanVAE
+
+    escritos = []
+    decode_original = WanVAE.decode
+    encode_original = WanVAE.encode
+    cache_video_original = utilidades.cache_video
+
+    def decode(self, zs):
+        # Un VAE sin la caché causal (otra versión de Wan2.1), o una imagen (t2i, que
+        # se guarda con cache_image): se usa el decode original
+        if not hasattr(getattr(self, "model", None), "_feat_map") or any(z.shape[1] == 1 for z in zs):
+            return decode_original(self, zs)
+        videos = []
+        for z in zs:
+            destino = ruta_temporal(Path(directorio) / "vae.mp4")
+            frames = escribir_tramos(decodificar_por_tramos(self, z), destino, fps)
+            videos.append(VideoEnStreaming(destino, frames))
+            escritos.append(videos[-1])
+        return videos
+
+    def encode(self, videos):
+        if not hasattr(getattr(self, "model", None), "_enc_feat_map"):
+            return encode_original(self, videos)
+        return [codificar_por_tramos(self, u) for u in videos]
+
+    def cache_video(tensor, save_file=None, *args, **kwargs):
+        if not isinstance(tensor, VideoEnStreaming):
+            return cache_video_original(tensor, save_file, *args, **kwargs)
+        if save_file is None:
+            return str(tensor.ruta)
+        if not publicar_salida(tensor.ruta, save_file):
+            return None
+        return save_file
+
+    WanVAE.decode = decode
+    WanVAE.encode = encode
+    utilidades.cache_video = cache_video
+    try:
+        yield escritos
+    finally:
+        WanVAE.decode = decode_original
+        WanVAE.encode = encode_original
+        utilidades.cache_video = cache_video_original
+        for video in escritos:
+            if video.ruta.exists():
+                video.ruta.unlink()
+
+
+def _pico_memoria_mb():
+    """Memoria residente máxima del proceso en MB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _medir_decodificacion(repo, modo, frames_latentes, alto, ancho, cola):
+    """Decodifica un latente aleatorio en un proceso limpio y mide su memoria pico."""
+    sys.path.insert(0, str(Path(repo).resolve()))
+    import tempfile
+    import torch
+    import wan.utils.utils as utilidades
+    from wan.modules.vae import WanVAE, WanVAE_
+
+    torch.manual_seed(0)
+    z_dim = 16
+    vae = object.__new__(WanVAE)
+    vae.dtype = torch.float
+    vae.device = "cpu"
+    vae.mean = torch.zeros(z_dim)
+    vae.std = torch.ones(z_dim)
+    vae.scale = [vae.mean, 1.0 / vae.std]
+    vae.model = WanVAE_(dim=16, z_dim=z_dim, dim_mult=[1, 2, 2, 2], num_res_blocks=1,
+                        attn_scales=[], temperal_downsample=[False, True, True]).eval().requires_grad_(False)
+    z = torch.randn(z_dim, frames_latentes, alto // 8, ancho // 8)
+
+    base = _pico_memoria_mb()
+    inicio = time.perf_counter()
+    with tempfile.TemporaryDirectory() as directorio:
+        salida = Path(directorio) / "video.mp4"
+        if modo == "completo":
+            with torch.no_grad():
+                video = vae.decode([z])[0]
+            utilidades.cache_video(tensor=video[None], save_file=str(salida), fps=FPS_WAN,
+                                   nrow=1, normalize=True, value_range=(-1, 1))
+        else:
+            with vae_por_tramos(directorio):
+                video = vae.decode([z])[0]
+                utilidades.cache_video(tensor=video[None], save_file=str(salida), fps=FPS_WAN,
+                                       nrow=1, normalize=True, value_range=(-1, 1))
+    cola.put((_pico_memoria_mb() - base, time.perf_counter() - inicio))
+
+
+def demo(repo, alto=240, ancho=416, frames=(21, 41, 81)):
+    """
+    Compara la memoria pico de la decodificación completa y por tramos en CPU.
+
+    Cada medida se hace en un proceso nuevo para que el pico no se mezcle.
+
+    Args:
+        repo: Ruta al repositorio Wan2.1
+        alto, ancho: Tamaño de los frames decodificados
+        frames: Longitudes de clip a probar (4n+1)
+
+    Returns:
+        Lista de diccionarios con frames, modo, pico_mb y segundos
+    """
+    contexto = multiprocessing.get_context("spawn")
+    resultados = []
+    print(f"VAE pequeño en CPU, {ancho}x{alto}")
+    print(f"  {'Frames':>6}  {'Modo':<10} {'Pico (MB)':>10} {'Tiempo (s)':>11}")
+    for n in frames:
+        for modo in ("completo", "por_tramos"):
+            cola = contexto.Queue()
+            proceso = contexto.Process(target=_medir_decodificacion,
+                                       args=(repo, modo, 1 + (n - 1) // 4, alto, ancho, cola))
+            proceso.start()
+            proceso.join()
+            if proceso.exitcode != 0:
+                raise RuntimeError(f"La medida '{modo}' con {n} frames terminó con código {proceso.exitcode}")
+            pico_mb, segundos = cola.get()
+            resultados.append({"frames": n, "modo": modo, "pico_mb": pico_mb, "segundos": segundos})
+            print(f"  {n:>6}  {modo:<10} {pico_mb:>10.0f} {segundos:>11.1f}")
+    return resultados
+
+
+def main():
+    """Demo en CPU de la memoria pico de la decodificación por tramos."""
+    parser = argparse.ArgumentParser(
+        description="Compara la memoria pico de la decodificación del VAE completa y por tramos (CPU)"
+    )
+    parser.add_argument("--repo", type=str, default="/app/Wan2.1",
+                       help="Ruta al repositorio Wan2.1")
+    parser.add_argument("--alto", type=int, default=240, help="Alto de los frames")
+    parser.add_argument("--ancho", type=int, default=416, help="Ancho de los frames")
+    args = parser.parse_args()
+
+    demo(args.repo, args.alto, args.ancho)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Barrido de semillas: varias variaciones del mismo prompt en un solo proceso.
+
+Para encontrar una toma limpia (sin logos deformados como "GONLEENgy") se
+renderiza el mismo prompt con muchas semillas. Lanzar generate.py por
+cada semilla repite la carga del modelo y la codificación T5/CLIP. Aquí el
+pipeline se carga una vez (motor_wan.MotorWan) y:
+
+    - T2V: el prompt y el prompt negativo se codifican una sola vez y las
+      trayectorias de denoising de varias semillas se ejecutan juntas en el
+      mismo forward del DiT (lotes de latentes), tantas como quepan en
+      memoria según planificador_memoria.py.
+    - I2V: las semillas se generan una tras otra con el mismo pipeline; el
+      T5, el CLIP y el latente de la imagen salen de la caché de
+      condicionamiento tras la primera semilla.
+
+Cada variación se escribe en <salida>_seed<N>.mp4 y los tiempos por
+semilla se guardan en <salida>_semillas.json.
+
+Autor: Práctica académica - Generación de Video con Wan 2.1
+"""
+
+import json
+import math
+import random
+import time
+from pathlib import Path
+
+
+def parsear_semillas(texto):
+    """
+    Convierte "1,2,3" (o "10-14") en una lista de semillas.
+
+    Args:
+        texto: Semillas separadas por comas; se admiten rangos inclusivos a-b
+
+    Returns:
+        Lista de enteros sin repetidos, en el orden dado
+    """
+    semillas = []
+    for parte in texto.split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        if "-" in parte:
+            inicio, fin = parte.split("-", 1)
+            semillas.extend(range(int(inicio), int(fin) + 1))
+        else:
+            semillas.append(int(parte))
+    if not semillas:
+        raise ValueError(f"No se indicaron semillas: {texto!r}")
+    return list(dict.fromkeys(semillas))
+
+
+def generar_semillas(num_variaciones, semilla_base=None):
+    """
+    Semillas consecutivas a partir de una base (aleatoria si no se indica).
+
+    Args:
+        num_variaciones: Número de semillas
+        semilla_base: Primera semilla
+
+    Returns:
+        Lista de semillas
+    """
+    if num_variaciones < 1:
+        raise ValueError("--num_variaciones debe ser al menos 1")
+    if semilla_base is None or semilla_base < 0:
+        semilla_base = random.randint(0, 2**31 - 1)
+    return [semilla_base + i for i in range(num_variaciones)]
+
+
+def ruta_variacion(salida, semilla):
+    """Ruta de la variación de una semilla: <salida>_seed<N><extensión>."""
+    salida = Path(salida)
+    return salida.with_name(f"{salida.stem}_seed{semilla}{salida.suffix or '.mp4'}")
+
+
+def codificar_texto(pipeline, prompt, n_prompt, offload_model):
+    """
+    Codifica prompt y prompt negativo con el T5 del pipeline, como WanT2V.generate.
+
+    Returns:
+        Tupla (contexto, contexto_nulo): listas con un tensor cada una
+    """
+    import torch
+
+    if not pipeline.t5_cpu:
+        pipeline.text_encoder.model.to(pipeline.device)
+        contexto = pipeline.text_encoder([prompt], pipeline.device)
+        contexto_nulo = pipeline.text_encoder([n_prompt], pipeline.device)
+        if offload_model:
+            pipeline.text_encoder.model.cpu()
+    else:
+        cpu = torch.device("cpu")
+        contexto = [t.to(pipeline.device) for t in pipeline.text_encoder([prompt], cpu)]
+        contexto_nulo = [t.to(pipeline.device) for t in pipeline.text_encoder([n_prompt], cpu)]
+    return contexto, contexto_nulo
+
+
+def muestrear_t2v_por_lotes(pipeline, contexto, contexto_nulo, size, frame_num, semillas,
+                            shift=5.0, sample_solver="unipc", sampling_steps=50,
+                            guide_scale=5.0, offload_model=False):
+    """
+    Ejecuta el denoising T2V de varias semillas en el mismo forward del DiT.
+
+    Reproduce el bucle de WanT2V.generate con una lista de latentes: el
+    ruido inicial de cada semilla es el mismo que usaría generate(), y el
+    scheduler (UniPC o DPM++) opera elemento a elemento sobre el lote.
+
+    Args:
+        pipeline: wan.WanT2V ya cargado
+        contexto, contexto_nulo: Salida de codificar_texto
+        size: Tupla (ancho, alto)
+        frame_num: Número de frames
+        semillas: Lista de semillas del lote
+        shift, sample_solver, sampling_steps, guide_scale: Parámetros de muestreo
+        offload_model: Si True, el DiT se mueve a CPU al terminar
+
+    Returns:
+        Lista de latentes finales, uno por semilla
+    """
+    import torch
+    from wan.utils.fm_solvers import (FlowDPMSolverMultistepScheduler,
+                                      get_sampling_sigmas, retrieve_timesteps)
+    from wan.utils.fm_solvers_unipc import FlowUniPCMultistepScheduler
+
+    p = pipeline
+    dispositivo = p.device
+    forma = (p.vae.model.z_dim, (frame_num - 1) // p.vae_stride[0] + 1,
+             size[1] // p.vae_stride[1], size[0] // p.vae_stride[2])
+    seq_len = math.ceil((forma[2] * forma[3]) / (p.patch_size[1] * p.patch_size[2])
+                        * forma[1] / p.sp_size) * p.sp_size
+
+    ruido = []
+    for semilla in semillas:
+        generador = torch.Generator(device=dispositivo)
+        generador.manual_seed(semilla)
+        ruido.append(torch.randn(*forma, dtype=torch.float32, device=dispositivo, generator=generador))
+
+    n = len(semillas)
+    with torch.autocast(device_type="cuda", dtype=p.param_dtype), torch.no_grad():
+        if sample_solver == "unipc":
+            scheduler = FlowUniPCMultistepScheduler(
+                num_train_timesteps=p.num_train_timesteps, shift=1, use_dynamic_shifting=False)
+            scheduler.set_timesteps(sampling_steps, device=dispositivo, shift=shift)
+            timesteps = scheduler.timesteps
+        elif sample_solver == "dpm++":
+            scheduler = FlowDPMSolverMultistepScheduler(
+                num_train_timesteps=p.num_train_timesteps, shift=1, use_dynamic_shifting=False)
+            sigmas = get_sampling_sigmas(sampling_steps, shift)
+            timesteps, _ = retrieve_timesteps(scheduler, device=dispositivo, sigmas=sigmas)
+        else:
+            raise ValueError(f"Solver no soportado: {sample_solver}")
+
+        latentes = torch.stack(ruido)
+        arg_c = {"context": contexto * n, "seq_len": seq_len}
+        arg_null = {"context": contexto_nulo * n, "seq_len": seq_len}
+
+        p.model.to(dispositivo)
+        for t in timesteps:
+            entrada = list(latentes.unbind(0))
+            paso = torch.stack([t] * n)
+            cond = torch.stack(p.model(entrada, t=paso, **arg_c))
+            incond = torch.stack(p.model(entrada, t=paso, **arg_null))
+            prediccion = incond + guide_scale * (cond - incond)
+            latentes = scheduler.step(prediccion, t, latentes, return_dict=False)[0]
+
+        if offload_model:
+            p.model.cpu()
+            torch.cuda.empty_cache()
+
+    return list(latentes.unbind(0))
+
+
+def generar_variaciones(trabajo, semillas, repo_path, dir_cache=None, semillas_por_lote=None):
+    """
+    Genera una variación por semilla reutilizando modelo y condicionamiento.
+
+    Args:
+        trabajo: Diccionario del trabajo (ver motor_wan.py); su salida es la base
+            de los nombres <salida>_seed<N>.mp4
+        semillas: Lista de semillas
+        repo_path: Repositorio Wan2.1
+        dir_cache: Directorio raíz de las cachés (None = sin caché)
+        semillas_por_lote: Semillas por forward en T2V (None = según la memoria libre)
+
+    Returns:
+        Lista de resultados por semilla (semilla, salida, exito, tiempos)
+    """
+    from cache_resultados import CacheResultados
+    from motor_wan import MotorWan, valores_por_defecto
+
+    trabajo = valores_por_defecto(dict(trabajo, semilla=semillas[0]))
+    motor = MotorWan(repo_path, dir_cache=dir_cache)
+    cache_resultados = CacheResultados(Path(dir_cache) / "resultados") if dir_cache else None
+    resultados = []
+
+    # Las semillas ya generadas con los mismos ajustes salen de la caché de resultados
+    pendientes = []
+    for semilla in semillas:
+        variacion = dict(trabajo, semilla=semilla, salida=str(ruta_variacion(trabajo["salida"], semilla)))
+        if cache_resultados and cache_resultados.recuperar(variacion, variacion["salida"]):
+            resultados.append({"semilla": semilla, "salida": variacion["salida"], "exito": True,
+                               "cache": True, "tiempo_total": 0.0})
+        else:
+            pendientes.append(variacion)
+
+    if pendientes:
+        tiempo_carga = motor.cargar(trabajo["task"], trabajo["ckpt_dir"], trabajo["t5_cpu"])
+        print(f"\nVariaciones: {len(pendientes)} semilla(s) por generar "
+              f"(carga del modelo: {tiempo_carga:.1f} s)")
+        if trabajo["modo"] == "t2v":
+            resultados += _variaciones_t2v(motor, trabajo, pendientes, semillas_por_lote)
+        else:
+            resultados += _variaciones_secuenciales(motor, pendientes)
+        for resultado, variacion in zip(resultados[-len(pendientes):], pendientes):
+            if resultado["exito"] and cache_resultados:
+                cache_resultados.almacenar(variacion, variacion["salida"])
+    motor.liberar()
+
+    resultados.sort(key=lambda r: semillas.index(r["semilla"]))
+    ruta_informe = Path(trabajo["salida"]).with_name(f"{Path(trabajo['salida']).stem}_semillas.json")
+    ruta_informe.parent.mkdir(parents=True, exist_ok=True)
+    ruta_informe.write_text(json.dumps({
+        "prompt": trabajo["prompt"], "task": trabajo["task"], "size": trabajo["size"],
+        "frame_num": trabajo["frame_num"], "resultados": resultados,
+    }, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print("\nSemilla        Tiempo    Video")
+    for r in resultados:
+        estado = "caché" if r.get("cache") else f"{r['tiempo_total']:6.1f} s"
+        print(f"  {r['semilla']:<12} {estado:>8}  {r['salida'] if r['exito'] else '✗ ' + str(r.get('error'))}")
+    print(f"  Informe: {ruta_informe}")
+    return resultados
+
+
+def _variaciones_t2v(motor, trabajo, variaciones, semillas_por_lote):
+    """T2V: codificación de texto única y denoising por lotes de semillas."""
+    from wan.configs import SIZE_CONFIGS
+
+    pipeline = motor.pipeline
+    size = SIZE_CONFIGS[trabajo["size"]]
+    if semillas_por_lote is None:
+        from planificador_memoria import memoria_libre_gpu, muestras_por_lote
+        memoria = memoria_libre_gpu()
+        semillas_por_lote = 1 if memoria is None else muestras_por_lote(
+            trabajo["task"], trabajo["size"], trabajo["frame_num"], memoria,
+            trabajo["offload_model"], trabajo["t5_cpu"], maximo=len(variaciones))
+    semillas_por_lote = max(1, min(semillas_por_lote, len(variaciones)))
+
+    inicio = time.perf_counter()
+    contexto, contexto_nulo = codificar_texto(
+        pipeline, trabajo["prompt"], pipeline.sample_neg_prompt, trabajo["offload_model"])
+    tiempo_texto = time.perf_counter() - inicio
+    print(f"✓ Prompt codificado una vez en {tiempo_texto:.1f} s; "
+          f"{semillas_por_lote} semilla(s) por forward")
+
+    resultados = []
+    for i in range(0, len(variaciones), semillas_por_lote):
+        grupo = variaciones[i:i + semillas_por_lote]
+        semillas = [v["semilla"] for v in grupo]
+        print(f"\n→ Semillas {', '.join(map(str, semillas))}")
+        inicio = time.perf_counter()
+        try:
+            latentes = muestrear_t2v_por_lotes(
+                pipeline, contexto, contexto_nulo, size, trabajo["frame_num"], semillas,
+                shift=trabajo["sample_shift"], sample_solver=trabajo["sample_solver"],
+                sampling_steps=trabajo["sample_steps"], guide_scale=trabajo["sample_guide_scale"],
+                offload_model=trabajo["offload_model"])
+        except Exception as e:
+            resultados += [{"semilla": v["semilla"], "salida": v["salida"], "exito": False,
+                            "error": str(e), "tiempo_total": 0.0} for v in grupo]
+            continue
+        tiempo_denoising = time.perf_counter() - inicio
+
+        for variacion, latente in zip(grupo, latentes):
+            inicio = time.perf_counter()
+            try:
+                video = pipeline.vae.decode([latente])[0]
+                motor._guardar(video, variacion["salida"])
+                exito, error = True, None
+            except Exception as e:
+                exito, error = False, str(e)
+            tiempo_decodificacion = time.perf_counter() - inicio
+            resultados.append({
+                "semilla": variacion["semilla"], "salida": variacion["salida"], "exito": exito,
+                "error": error, "tamano_lote": len(grupo),
+                "tiempo_denoising_lote": tiempo_denoising,
+                "tiempo_decodificacion": tiempo_decodificacion,
+                "tiempo_total": tiempo_denoising / len(grupo) + tiempo_decodificacion,
+            })
+    return resultados
+
+
+def _variaciones_secuenciales(motor, variaciones):
+    """I2V/VACE: una semilla tras otra con el pipeline y la caché de condicionamiento."""
+    resultados = []
+    for variacion in variaciones:
+        print(f"\n→ Semilla {variacion['semilla']}")
+        resultado = motor.generar(variacion)
+        resultados.append({
+            "semilla": variacion["semilla"], "salida": variacion["salida"],
+            "exito": resultado["exito"], "error": resultado["error"],
+            "tiempo_total": resultado["tiempo_trabajo"],
+        })
+    return resultados